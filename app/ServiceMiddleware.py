@@ -1,23 +1,25 @@
 # app/core/di.py
 from aiogram import BaseMiddleware
-from app.database import Database
-from app.service import UserService, ConversationService, AnalyticService, WarehouseService, MarketingService, DocumentAnalyzer
+from app.service.container import ServiceContainer
 
 
 class ServiceMiddleware(BaseMiddleware):
-    def __init__(self):
-        self.db = None
+    """Подставляет в обработчик только те сервисы, которые он объявил в сигнатуре.
+
+    Регистрируется как inner-middleware на message/callback_query: к этому моменту
+    в data["handler"] уже лежит выбранный обработчик с набором его параметров.
+    """
+
+    def __init__(self, container: ServiceContainer):
+        self.container = container
 
     async def __call__(self, handler, event, data):
-        if self.db is None:
-            self.db = Database()
-            await self.db.init()
+        handler_object = data.get("handler")
+        if handler_object is None or handler_object.varkw:
+            names = self.container.names
+        else:
+            names = handler_object.params.intersection(self.container.names)
 
-        # Создаем сервисы
-        data["user_service"] = UserService(self.db)
-        data["conversation_service"] = ConversationService(self.db)
-        data["analytic_service"] = AnalyticService(self.db)
-        data["warehouse_service"] = WarehouseService(self.db)
-        data["marketing_idea_service"] = MarketingService(self.db)
-        data["document_service"] = DocumentAnalyzer(self.db)
+        for name in names:
+            data[name] = self.container.get(name)
         return await handler(event, data)
\ No newline at end of file
@@ -9,6 +9,6 @@ __version__ = "0.1.0"
 # Инициализация приложения
 async def initialize():
     """Инициализация всего приложения"""
-    from .database import db
-    await db.init()
+    from .database import get_database
+    await get_database().init()
     print("✅ Приложение инициализировано")
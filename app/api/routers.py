@@ -1,6 +1,13 @@
-from fastapi import APIRouter, Request
+import asyncio
+import os
+import shutil
+import tempfile
 
-from app.service import UserService
+from fastapi import APIRouter, Request, Depends, File, Form, HTTPException, UploadFile
+
+from app.database import get_database
+from app.dependencies import get_sales_import_service
+from app.service import UserService, SalesImportService, get_service_container
 
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -8,12 +15,42 @@ telegram_router = APIRouter(prefix="/telegram", tags=["telegram"])
 
 health_router = APIRouter(tags=["health"])
 
+sales_router = APIRouter(prefix="/sales", tags=["sales"])
+
 
 @health_router.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@health_router.get("/health/db")
+async def health_db():
+    """Состояние пула соединений: для подбора pool_size под max_connections"""
+    return get_database().pool_status()
+
+
+@health_router.get("/health/cache")
+async def health_cache():
+    """Счетчики кэша отчетов: попадания, промахи, вытеснения"""
+    return get_service_container().report_cache.stats()
+
+
+@health_router.get("/health/users")
+async def health_users():
+    """Кэш профилей пользователей и буфер записи last_active"""
+    container = get_service_container()
+    return {
+        "profiles": container.get("user_service").cache_stats(),
+        "activity": container.get("activity_buffer").stats(),
+    }
+
+
+@health_router.get("/health/llm")
+async def health_llm():
+    """Задержки генерации LLM по местам вызова"""
+    return get_service_container().get("llm_service").stats()
+
+
 @telegram_router.post("/webhook")
 async def telegram_webhook(update: dict, request: Request):
     chat_id = update["message"]["chat"]["id"]
@@ -40,3 +77,25 @@ async def chat_api(body: dict):
         "reply": reply,
         "scenario": scenario
     }
+
+
+@sales_router.post("/import")
+async def import_sales(
+        user_id: int = Form(...),
+        file: UploadFile = File(...),
+        sales_import_service: SalesImportService = Depends(get_sales_import_service)
+):
+    """Массовый импорт продаж из CSV/XLSX"""
+    file_type = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if file_type not in ("csv", "xlsx", "xlsm"):
+        raise HTTPException(status_code=400, detail="Поддерживаются только файлы CSV и XLSX")
+
+    fd, path = tempfile.mkstemp(suffix=f".{file_type}")
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, destination)
+        return await sales_import_service.import_file(user_id, path, file_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
@@ -1,6 +1,7 @@
-from .db import Database
-from .models import (Base, User, Conversation, BusinessData, Template, QuickAction, Document,
-                     Insight, Product, Sale, StockMovement)
+from .db import Database, get_database
+from .models import (Base, User, Conversation, ConversationMessage, BusinessData, Template, QuickAction,
+                     Document, Insight, Product, Sale, StockMovement, DailySalesRollup,
+                     LLMCacheEntry, Job)
 from .repository import (
     UserRepository,
     ConversationRepository,
@@ -11,15 +12,21 @@ from .repository import (
     InsightRepository,
     ProductRepository,
     SaleRepository,
-    StockMovementRepository
+    StockMovementRepository,
+    SalesRollupRepository,
+    LLMCacheRepository,
+    JobRepository
 )
 from .unit_of_work import UnitOfWork
+from .routing import ReplicaRouter
 
 __all__ = [
     'Database',
+    'get_database',
     'Base',
     'User',
     'Conversation',
+    'ConversationMessage',
     'BusinessData',
     'Template',
     'QuickAction',
@@ -28,6 +35,9 @@ __all__ = [
     'Product',
     'Sale',
     'StockMovement',
+    'DailySalesRollup',
+    'LLMCacheEntry',
+    'Job',
     'UserRepository',
     'ConversationRepository',
     'BusinessDataRepository',
@@ -36,7 +46,11 @@ __all__ = [
     'DocumentRepository',
     'InsightRepository',
     'UnitOfWork',
+    'ReplicaRouter',
     'ProductRepository',
     'SaleRepository',
-    'StockMovementRepository'
+    'StockMovementRepository',
+    'SalesRollupRepository',
+    'LLMCacheRepository',
+    'JobRepository'
 ]
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Пересчет дневной сводки продаж (daily_sales_rollup) из таблицы sales.
+
+Запуск: python -m app.database.backfill [--user-id ID]
+"""
+import argparse
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from .db import get_database
+
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_sales_rollup(user_id: int = None) -> int:
+    """Пересобрать сводку в одной транзакции; возвращает число строк сводки"""
+    db = get_database()
+    try:
+        async with db.get_uow() as uow:
+            rows = await uow.sales_rollup.rebuild(user_id)
+        logger.info(f"daily_sales_rollup пересчитана: {rows} строк")
+        return rows
+    finally:
+        await db.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет daily_sales_rollup из таблицы sales")
+    parser.add_argument("--user-id", type=int, default=None, help="пересчитать только одного пользователя")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_sales_rollup(args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,43 @@
 import os
 import logging
+from typing import Optional, Dict, Any
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import text
 from .models import Base
+from .pool_metrics import PoolMetrics, MeteredQueuePool
+from .routing import ReplicaRouter
 from .unit_of_work import UnitOfWork
 
 
 logger = logging.getLogger(__name__)
 
 
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Database:
-    def __init__(self, database_url: str = None):
+    def __init__(
+            self,
+            database_url: str = None,
+            echo: Optional[bool] = None,
+            pool_size: Optional[int] = None,
+            max_overflow: Optional[int] = None,
+            pool_timeout: Optional[int] = None,
+            pool_pre_ping: Optional[bool] = None,
+            statement_cache_size: Optional[int] = None,
+            replica_url: Optional[str] = None,
+            routing_policy: Optional[ReplicaRouter] = None
+    ):
 
         self.database_url = database_url or os.getenv("DATABASE_URL")
         if not self.database_url:
@@ -18,11 +45,64 @@ class Database:
         if self.database_url.startswith("postgresql://"):
             self.database_url = self.database_url.replace("postgresql://", "postgresql+asyncpg://")
 
-        self.engine = create_async_engine(self.database_url, echo=True)  # echo=True для отладки SQL
+        # Параметры пула: явные аргументы важнее переменных окружения.
+        # pool_size + max_overflow на всех процессах должны укладываться в max_connections Postgres.
+        self.echo = echo if echo is not None else _env_bool("DB_ECHO", False)
+        self.pool_size = pool_size if pool_size is not None else _env_int("DB_POOL_SIZE", 10)
+        self.max_overflow = max_overflow if max_overflow is not None else _env_int("DB_MAX_OVERFLOW", 5)
+        self.pool_timeout = pool_timeout if pool_timeout is not None else _env_int("DB_POOL_TIMEOUT", 30)
+        self.pool_pre_ping = pool_pre_ping if pool_pre_ping is not None else _env_bool("DB_POOL_PRE_PING", True)
+        self.statement_cache_size = (
+            statement_cache_size if statement_cache_size is not None
+            else _env_int("DB_STATEMENT_CACHE_SIZE", 100)
+        )
+
+        self.pool_metrics = PoolMetrics()
+        self.engine = self._create_engine(self.database_url, self.pool_metrics)
         self.async_session = async_sessionmaker(
             self.engine, class_=AsyncSession, expire_on_commit=False
         )
 
+        # Необязательная реплика для отчетов: read-only UoW с replica=True идут на нее,
+        # пока routing_policy считает отставание допустимым
+        self.replica_url = replica_url or os.getenv("DATABASE_REPLICA_URL")
+        self.replica_engine = None
+        self.replica_session = None
+        self.replica_pool_metrics = None
+        self.routing_policy = None
+        if self.replica_url:
+            if self.replica_url.startswith("postgresql://"):
+                self.replica_url = self.replica_url.replace("postgresql://", "postgresql+asyncpg://")
+            self.replica_pool_metrics = PoolMetrics()
+            self.replica_engine = self._create_engine(self.replica_url, self.replica_pool_metrics)
+            self.replica_session = async_sessionmaker(
+                self.replica_engine, class_=AsyncSession, expire_on_commit=False
+            )
+            self.routing_policy = routing_policy or ReplicaRouter(
+                max_lag_seconds=float(os.getenv("DB_REPLICA_MAX_LAG", "5")),
+                check_interval=float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+            )
+            self.routing_policy.replica_engine = self.replica_engine
+
+    def _create_engine(self, url: str, metrics: PoolMetrics):
+        connect_args = {}
+        if "+asyncpg" in url:
+            # Кэш подготовленных выражений asyncpg; 0 — для pgbouncer в режиме transaction
+            connect_args["statement_cache_size"] = self.statement_cache_size
+
+        engine = create_async_engine(
+            url,
+            echo=self.echo,
+            poolclass=MeteredQueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=self.pool_pre_ping,
+            connect_args=connect_args
+        )
+        engine.pool.metrics = metrics
+        return engine
+
     async def init(self):
         """Создание таблиц в PostgreSQL"""
         try:
@@ -33,6 +113,13 @@ class Database:
             logger.error(f"Ошибка создания таблиц: {e}")
             raise
 
+    async def dispose(self):
+        """Закрытие всех соединений пула"""
+        await self.engine.dispose()
+        if self.replica_engine is not None:
+            await self.replica_engine.dispose()
+        logger.info("Пул соединений PostgreSQL закрыт")
+
     async def test_connection(self):
         """Тест подключения к PostgreSQL"""
         try:
@@ -45,7 +132,50 @@ class Database:
             logger.error(f"Ошибка подключения к PostgreSQL: {e}")
             return False
 
-    def get_uow(self):
-        """Возвращает UnitOfWork (юнит работы) для сервисов"""
-        return UnitOfWork(self.async_session)
+    def pool_status(self) -> Dict[str, Any]:
+        """Состояние пула соединений и метрики ожидания"""
+        status = self._engine_pool_status(self.engine, self.pool_metrics)
+        if self.replica_engine is not None:
+            status["replica"] = {
+                **self._engine_pool_status(self.replica_engine, self.replica_pool_metrics),
+                **self.routing_policy.status()
+            }
+        return status
+
+    def _engine_pool_status(self, engine, metrics: PoolMetrics) -> Dict[str, Any]:
+        pool = engine.pool
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": self.max_overflow,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **metrics.snapshot()
+        }
+
+    def get_uow(self, read_only: bool = False, replica: bool = False):
+        """Возвращает UnitOfWork (юнит работы) для сервисов.
+
+        read_only=True — транзакция READ ONLY без commit, для отчетов и чтения.
+        replica=True — то же, но с чтением с реплики, если она настроена и не отстает;
+        для данных, которые допускают небольшую задержку (отчеты, аналитика).
+        """
+        if replica and self.replica_session is not None:
+            return UnitOfWork(self._route_read_session, read_only=True)
+        return UnitOfWork(self.async_session, read_only=read_only or replica)
+
+    async def _route_read_session(self) -> AsyncSession:
+        if await self.routing_policy.use_replica():
+            return self.replica_session()
+        return self.async_session()
+
+
+_database: Optional[Database] = None
+
 
+def get_database() -> Database:
+    """Общий для бота и API экземпляр Database (один движок и пул на процесс)"""
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
@@ -1,8 +1,8 @@
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Text, DateTime,
-    Boolean, JSON, ForeignKey, TIMESTAMP, func, Float
+    Boolean, JSON, ForeignKey, TIMESTAMP, func, Float, Index, Date
 )
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import declarative_base, relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -62,8 +62,11 @@ class Conversation(Base):
     user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"))
 
     category = Column(String(50))
-    user_message = Column(Text)
-    bot_response = Column(Text)
+    # Тексты не грузятся вместе со строкой: списки и аналитика читают проекции (find_summaries_by_user_id).
+    # Нужен текст — options(undefer(...)); случайное обращение к незагруженному полю — ошибка, а не скрытый запрос.
+    # Новые диалоги сюда не пишут: реплики, включая первую, хранятся в conversation_messages
+    user_message = deferred(Column(Text), raiseload=True)
+    bot_response = deferred(Column(Text), raiseload=True)
     message_length = Column(Integer)
     response_time_ms = Column(Integer)
     last_message_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -71,6 +74,18 @@ class Conversation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="conversations")
+    messages = relationship(
+        "ConversationMessage",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index("ix_conversations_user_id_last_message_at", "user_id", "last_message_at"),
+        # Ключ постраничной истории (created_at, id); покрывает и выборки по диапазону created_at
+        Index("ix_conversations_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     def __repr__(self):
         return f"<Conversation id={self.id} user_id={self.user_id} category='{self.category}'>"
@@ -80,6 +95,28 @@ class Conversation(Base):
         return f"Диалог #{self.id}: [{self.category}] — {created}"
 
 
+class ConversationMessage(Base):
+    """Одна реплика диалога (вопрос пользователя и ответ бота)"""
+    __tablename__ = "conversation_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+
+    user_message = Column(Text)
+    bot_response = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        Index("ix_conversation_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<ConversationMessage id={self.id} conversation_id={self.conversation_id}>"
+
+
 class BusinessData(Base):
     __tablename__ = "business_data"
 
@@ -96,6 +133,10 @@ class BusinessData(Base):
 
     user = relationship("User", back_populates="business_data")
 
+    __table_args__ = (
+        Index("ix_business_data_user_id_data_type_created_at", "user_id", "data_type", "created_at"),
+    )
+
     def __repr__(self):
         return f"<BusinessData id={self.id} user_id={self.user_id} type='{self.data_type}'>"
 
@@ -149,6 +190,7 @@ class Document(Base):
     filename = Column(String(255))
     file_type = Column(String(20))  # pdf, docx, jpg...
     content_text = Column(Text)  # распознанный/вытащенный текст
+    content_hash = Column(String(64))  # sha256 байтов загруженного файла; у сгенерированных — NULL
     size_bytes = Column(Integer)
 
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -156,6 +198,11 @@ class Document(Base):
     user = relationship("User")
     insights = relationship("Insight", back_populates="document", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Повторная загрузка того же файла пользователем находит существующий документ
+        Index("uq_documents_user_id_content_hash", "user_id", "content_hash", unique=True),
+    )
+
     def __repr__(self):
         return f"<Document id={self.id} file='{self.filename}' user_id={self.user_id}>"
 
@@ -222,6 +269,10 @@ class MarketingIdeas(Base):
 
     created_at = Column(TIMESTAMP)
 
+    __table_args__ = (
+        Index("ix_marketing_ideas_user_id_created_at", "user_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<MarketingIdeas id={self.id} user_id={self.user_id}>"
 
@@ -246,6 +297,13 @@ class Product(Base):
     sales = relationship("Sale", back_populates="product", cascade="all, delete-orphan")
     stock_movements = relationship("StockMovement", back_populates="product", cascade="all, delete-orphan")
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_products_user_id_name", "user_id", "name"),
+        # Частичный индекс под выборку товаров с низким запасом
+        Index("ix_products_user_id_low_stock", "user_id", postgresql_where=stock_quantity <= min_stock),
+    )
+
     def __repr__(self):
         return f"<Product id={self.id} name='{self.name}'>"
 
@@ -266,10 +324,89 @@ class Sale(Base):
     # Связи
     product = relationship("Product", back_populates="sales")
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_sales_user_id_sale_date", "user_id", "sale_date"),
+    )
+
     def __repr__(self):
         return f"<Sale id={self.id} product_id={self.product_id} amount={self.total_amount}>"
 
 
+class DailySalesRollup(Base):
+    """Продажи, агрегированные по дню и товару; обновляется в одной транзакции с продажей"""
+    __tablename__ = "daily_sales_rollup"
+
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    cost = Column(Float, nullable=False, default=0.0)  # по закупочной цене на момент продажи
+    sales_count = Column(Integer, nullable=False, default=0)
+
+    product = relationship("Product")
+
+    def __repr__(self):
+        return f"<DailySalesRollup user_id={self.user_id} day={self.day} product_id={self.product_id}>"
+
+
+class LLMCacheEntry(Base):
+    """Сохраненный ответ LLM по ключу (хэш нормализованного промпта + модель + параметры)"""
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)
+    call_site = Column(String(100))
+    model = Column(String(100))
+    prompt = Column(Text, nullable=False)  # нормализованный промпт
+    inputs = Column(Text, nullable=True)  # JSON переменных частей промпта, для поиска похожих
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_llm_cache_last_hit_at", "last_hit_at"),
+    )
+
+    def __repr__(self):
+        return f"<LLMCacheEntry key={self.key[:12]} call_site={self.call_site}>"
+
+
+class Job(Base):
+    """Фоновая задача (генерация документов, анализ); очередь читается через FOR UPDATE SKIP LOCKED"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    chat_id = Column(BigInteger)  # куда отправить результат
+    message_id = Column(Integer)  # сообщение-заглушка, которое обновляется по ходу работы
+
+    type = Column(String(50), nullable=False)
+    payload = Column(JSON, default=dict)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    priority = Column(Integer, nullable=False, default=0)  # больше — раньше
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    locked_until = Column(DateTime)  # пока не истекло, задачу выполняет воркер
+
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_jobs_status_priority_run_after", "status", "priority", "run_after"),
+    )
+
+    def __repr__(self):
+        return f"<Job id={self.id} type={self.type} status={self.status}>"
+
+
 class StockMovement(Base):
     __tablename__ = "stock_movements"
 
@@ -284,5 +421,10 @@ class StockMovement(Base):
     # Связи
     product = relationship("Product", back_populates="stock_movements")
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_stock_movements_user_id_date", "user_id", "date"),
+    )
+
     def __repr__(self):
         return f"<StockMovement id={self.id} product_id={self.product_id} type={self.type}>"
\ No newline at end of file
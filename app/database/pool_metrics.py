@@ -0,0 +1,59 @@
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.utils.latency import LatencyHistogram
+
+
+class PoolMetrics:
+    """Счетчики выдачи соединений из пула и времени ожидания"""
+
+    # Границы корзин гистограммы ожидания, в миллисекундах
+    WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self):
+        # Таймаут выдачи соединения учитывается как ошибка
+        self.wait = LatencyHistogram(self.WAIT_BUCKETS_MS)
+
+    def record_checkout(self, wait_seconds: float):
+        self.wait.observe(wait_seconds)
+
+    def record_timeout(self, wait_seconds: float):
+        self.wait.observe(wait_seconds, error=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        wait = self.wait.snapshot()
+        return {
+            "checkouts": wait["count"] - wait["errors"],
+            "timeouts": wait["errors"],
+            "avg_wait_ms": wait["avg_ms"],
+            "max_wait_ms": wait["max_ms"],
+            "wait_histogram_ms": wait["histogram_ms"],
+        }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания свободного соединения"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        if self.metrics is None:
+            return super().connect()
+
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
@@ -1,7 +1,10 @@
-from sqlalchemy import select
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update, func, and_, literal_column, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Conversation
+from app.database.models import Conversation, ConversationMessage
 
 
 class ConversationRepository:
@@ -28,6 +31,116 @@ class ConversationRepository:
         )
         return result.scalars().first()
 
+    async def find_last_active_id(self, user_id: int, since) -> Optional[int]:
+        """ID активного диалога без загрузки текстов"""
+        result = await self.session.execute(
+            select(Conversation.id)
+            .where(
+                Conversation.user_id == user_id,
+                Conversation.last_message_at >= since
+            )
+            .order_by(Conversation.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def touch(self, conversation_id: int, when: datetime):
+        """Обновить время последнего сообщения диалога"""
+        await self.session.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(last_message_at=when)
+        )
+
+    async def add_message(self, message: ConversationMessage) -> ConversationMessage:
+        """Добавить реплику в диалог: один INSERT, не зависящий от длины диалога"""
+        self.session.add(message)
+        return message
+
+    async def find_messages(
+            self,
+            conversation_id: int,
+            after_id: Optional[int] = None,
+            limit: int = 20
+    ) -> Sequence[ConversationMessage]:
+        """Реплики диалога по порядку, постранично по ключу (id > after_id)"""
+        query = select(ConversationMessage).where(ConversationMessage.conversation_id == conversation_id)
+        if after_id is not None:
+            query = query.where(ConversationMessage.id > after_id)
+
+        result = await self.session.execute(
+            query.order_by(ConversationMessage.id).limit(limit)
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    def _first_turn(column=ConversationMessage.user_message):
+        """Текст первой реплики диалога: коррелированный подзапрос по индексу (conversation_id, id)"""
+        return (
+            select(column)
+            .where(ConversationMessage.conversation_id == Conversation.id)
+            .order_by(ConversationMessage.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    @classmethod
+    def _summary_columns(cls, preview_length: int):
+        first_question = cls._first_turn()
+        return (
+            Conversation.id,
+            Conversation.category,
+            Conversation.created_at,
+            Conversation.last_message_at,
+            func.coalesce(func.length(first_question), 0).label("message_length"),
+            func.coalesce(func.length(cls._first_turn(ConversationMessage.bot_response)), 0).label("response_length"),
+            func.coalesce(func.substr(first_question, 1, preview_length), "").label("preview")
+        )
+
+    async def find_summaries_by_user_id(self, user_id: int, limit: int = 10, preview_length: int = 80):
+        """Последние диалоги без текстов: id, category, created_at, last_message_at,
+        message_length / response_length и preview — начало первого вопроса, обрезанное в SQL
+        """
+        result = await self.session.execute(
+            select(*self._summary_columns(preview_length))
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+            .limit(limit)
+        )
+        return result.all()
+
+    async def find_summaries_page(
+            self,
+            user_id: int,
+            limit: int = 10,
+            older_than: Optional[Tuple[datetime, int]] = None,
+            newer_than: Optional[Tuple[datetime, int]] = None,
+            preview_length: int = 80
+    ) -> Tuple[list, bool]:
+        """Страница истории (новые сначала) по ключу (created_at, id) и признак, есть ли еще строки в ту же сторону.
+
+        Условие по ключу вместо OFFSET: индекс (user_id, created_at, id) сразу находит
+        начало страницы, поэтому любая страница стоит столько же, сколько первая.
+        """
+        key = tuple_(Conversation.created_at, Conversation.id)
+        query = select(*self._summary_columns(preview_length)).where(Conversation.user_id == user_id)
+
+        if newer_than is not None:
+            # Назад к новым: идем по возрастанию от курсора и разворачиваем страницу
+            query = query.where(key > tuple_(*newer_than)).order_by(Conversation.created_at, Conversation.id)
+        else:
+            if older_than is not None:
+                query = query.where(key < tuple_(*older_than))
+            query = query.order_by(Conversation.created_at.desc(), Conversation.id.desc())
+
+        result = await self.session.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newer_than is not None:
+            rows.reverse()
+        return rows, has_more
+
     async def find_by_user_id(self, user_id: int, limit: int = 10):
         result = await self.session.execute(
             select(Conversation)
@@ -42,3 +155,89 @@ class ConversationRepository:
             select(Conversation).where(Conversation.id == conversation_id)
         )
         return result.scalars().first()
+
+    async def count_by_day(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[date, int]]:
+        """Число консультаций по дням окна [start, end]; дни без консультаций — с нулем (generate_series)"""
+        day = func.date_trunc("day", Conversation.created_at)
+        days = (
+            func.generate_series(func.date_trunc("day", start), func.date_trunc("day", end), timedelta(days=1))
+            .table_valued("day")
+            .render_derived(name="days")
+        )
+        result = await self.session.execute(
+            select(days.c.day, func.count(Conversation.id))
+            .select_from(days)
+            .outerjoin(Conversation, and_(
+                Conversation.user_id == user_id,
+                Conversation.created_at >= start,
+                Conversation.created_at <= end,
+                day == days.c.day
+            ))
+            .group_by(days.c.day)
+            .order_by(days.c.day)
+        )
+        return [(row[0].date(), row[1]) for row in result.all()]
+
+    async def count_by_category(
+            self,
+            user_id: int,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            examples: int = 3,
+            example_length: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Число консультаций и последняя дата по категориям, с несколькими обрезанными примерами вопросов.
+
+        Тексты целиком не читаются: примеры обрезаются в SQL, а на категорию берется
+        не больше examples последних (row_number по категории).
+        """
+        # Литерал, а не параметр: иначе выражения в SELECT и GROUP BY получат разные $n
+        category = func.coalesce(Conversation.category, literal_column("'general'")).label("category")
+        window = [Conversation.user_id == user_id]
+        if start is not None:
+            window.append(Conversation.created_at >= start)
+        if end is not None:
+            window.append(Conversation.created_at <= end)
+
+        totals = await self.session.execute(
+            select(category, func.count(Conversation.id), func.max(Conversation.created_at))
+            .where(*window)
+            .group_by(category)
+            .order_by(func.count(Conversation.id).desc())
+        )
+        stats = {
+            row[0]: {"category": row[0], "count": row[1], "last_used": row[2], "examples": []}
+            for row in totals.all()
+        }
+        if not stats or examples <= 0:
+            return list(stats.values())
+
+        ranked = (
+            select(
+                category,
+                func.substr(self._first_turn(), 1, example_length).label("example"),
+                func.row_number().over(
+                    partition_by=category, order_by=Conversation.created_at.desc()
+                ).label("position")
+            )
+            .where(*window)
+            .subquery()
+        )
+        samples = await self.session.execute(
+            select(ranked.c.category, ranked.c.example)
+            .where(ranked.c.position <= examples)
+            .order_by(ranked.c.category, ranked.c.position)
+        )
+        for name, example in samples.all():
+            if example:
+                stats[name]["examples"].append(example)
+        return list(stats.values())
+
+    async def activity_summary(self, user_id: int) -> Dict[str, Any]:
+        """Всего консультаций, первая и последняя — одним агрегатом"""
+        result = await self.session.execute(
+            select(func.count(Conversation.id), func.min(Conversation.created_at), func.max(Conversation.created_at))
+            .where(Conversation.user_id == user_id)
+        )
+        total, first, last = result.one()
+        return {"total": total, "first": first, "last": last}
@@ -3,6 +3,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.models import Document, Insight
 from sqlalchemy import select
+from typing import Optional
 
 
 class DocumentRepository:
@@ -15,13 +16,15 @@ class DocumentRepository:
             filename: str,
             file_type: str,
             content: str,
-            size: int
+            size: int,
+            content_hash: Optional[str] = None
     ) -> Document:
         doc = Document(
             user_id=user_id,
             filename=filename,
             file_type=file_type,
             content_text=content,
+            content_hash=content_hash,
             size_bytes=size
         )
         self.session.add(doc)
@@ -41,3 +44,22 @@ class DocumentRepository:
         )
         return result.scalars().all()
 
+    async def get_by_hash(self, user_id: int, content_hash: str) -> Optional[Document]:
+        """Документ пользователя с теми же байтами файла"""
+        result = await self.session.execute(
+            select(Document).where(Document.user_id == user_id, Document.content_hash == content_hash)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_text_by_hash(self, user_id: int, content_hash: str) -> Optional[str]:
+        """Извлеченный текст документа пользователя с тем же хэшем: одинаковые байты дают одинаковый текст"""
+        result = await self.session.execute(
+            select(Document.content_text)
+            .where(
+                Document.user_id == user_id,
+                Document.content_hash == content_hash,
+                Document.content_text.isnot(None)
+            )
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
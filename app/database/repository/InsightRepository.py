@@ -1,7 +1,7 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Insight
+from app.database.models import Document, Insight
 
 
 class InsightRepository:
@@ -29,7 +29,22 @@ class InsightRepository:
         return insight
 
     async def get_by_document_id(self, document_id: int) -> Insight:
+        # Последний анализ документа, если их несколько
         result = await self.session.execute(
-            select(Insight).where(Insight.document_id == document_id)
+            select(Insight)
+            .where(Insight.document_id == document_id)
+            .order_by(Insight.id.desc())
+            .limit(1)
         )
-        return result.scalar_one_or_none()
\ No newline at end of file
+        return result.scalar_one_or_none()
+
+    async def get_by_content_hash(self, user_id: int, content_hash: str) -> Insight:
+        """Последний анализ документа пользователя с теми же байтами (одинаковый текст — одинаковый разбор)"""
+        result = await self.session.execute(
+            select(Insight)
+            .join(Document, Insight.document_id == Document.id)
+            .where(Document.user_id == user_id, Document.content_hash == content_hash)
+            .order_by(Insight.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_
+
+from app.database.models import Job
+
+
+class JobRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, job_data: dict) -> Job:
+        """Поставить задачу в очередь"""
+        job = Job(**job_data)
+        self.session.add(job)
+        await self.session.flush()
+        return job
+
+    async def claim(self, lock_seconds: float, limit: int = 1) -> List[Job]:
+        """Забрать готовые к выполнению задачи с блокировкой на lock_seconds.
+
+        Берутся задачи в очереди с наступившим run_after и "running" с истекшей
+        блокировкой (воркер упал). SKIP LOCKED: параллельные воркеры и процессы
+        не ждут друг друга и не получают одну задачу дважды.
+        """
+        now = datetime.utcnow()
+        ready = (
+            select(Job.id)
+            .where(or_(
+                and_(Job.status == "queued", Job.run_after <= now),
+                and_(Job.status == "running", Job.locked_until < now)
+            ))
+            .order_by(Job.priority.desc(), Job.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(Job)
+            .where(Job.id.in_(ready))
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                locked_until=now + timedelta(seconds=lock_seconds),
+                updated_at=now
+            )
+            .returning(Job)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    def _claimed(job_id: int, attempts: int):
+        """Условие "задача все еще за этой попыткой": после истечения блокировки ее мог
+        перехватить другой воркер (attempts увеличился) или она уже завершена"""
+        return and_(Job.id == job_id, Job.status == "running", Job.attempts == attempts)
+
+    async def complete(self, job_id: int, attempts: int, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Отметить задачу выполненной. False — попытка attempts больше не владеет задачей"""
+        updated = await self.session.execute(
+            update(Job)
+            .where(self._claimed(job_id, attempts))
+            .values(status="done", result=result, error=None, locked_until=None, updated_at=datetime.utcnow())
+        )
+        return updated.rowcount > 0
+
+    async def fail(self, job_id: int, attempts: int, error: str, retry_in: Optional[float] = None) -> bool:
+        """Ошибка выполнения: retry_in задан — вернуть в очередь с задержкой, иначе окончательный отказ.
+        False — попытка attempts больше не владеет задачей"""
+        now = datetime.utcnow()
+        values = {"error": error, "locked_until": None, "updated_at": now}
+        if retry_in is not None:
+            values.update(status="queued", run_after=now + timedelta(seconds=retry_in))
+        else:
+            values.update(status="failed")
+        updated = await self.session.execute(
+            update(Job).where(self._claimed(job_id, attempts)).values(**values)
+        )
+        return updated.rowcount > 0
+
+    async def get_by_id(self, job_id: int, user_id: int) -> Optional[Job]:
+        """Задача пользователя по ID"""
+        result = await self.session.execute(
+            select(Job).where(Job.id == job_id, Job.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, update, delete, func, values, column, bindparam, Integer, String, DateTime
+
+from app.database.models import LLMCacheEntry
+
+
+class LLMCacheRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, key: str, created_after: Optional[datetime] = None) -> Optional[str]:
+        """Ответ по ключу (только чтение: попадания пишет add_hits пачками)"""
+        stmt = select(LLMCacheEntry.response).where(LLMCacheEntry.key == key)
+        if created_after is not None:
+            stmt = stmt.where(LLMCacheEntry.created_at >= created_after)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def add_hits(self, hits: Dict[str, Tuple[int, datetime]], batch_size: int = 5000) -> int:
+        """Добавить накопленные попадания: ключ -> (число попаданий, время последнего)"""
+        items = [(key, count, hit_at) for key, (count, hit_at) in hits.items()]
+        updated = 0
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if self.session.bind.dialect.name == "postgresql":
+                # Один UPDATE ... FROM (VALUES ...) на пачку вместо UPDATE на каждый ключ
+                rows = values(
+                    column("key", String), column("hits", Integer), column("last_hit_at", DateTime), name="cache_hits"
+                ).data(batch)
+                result = await self.session.execute(
+                    update(LLMCacheEntry)
+                    .where(LLMCacheEntry.key == rows.c.key)
+                    .values(hits=LLMCacheEntry.hits + rows.c.hits,
+                            last_hit_at=func.greatest(LLMCacheEntry.last_hit_at, rows.c.last_hit_at))
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                # SQLite (локальный запуск) не поддерживает список колонок у VALUES — executemany
+                entries = LLMCacheEntry.__table__
+                connection = await self.session.connection()
+                result = await connection.execute(
+                    update(entries)
+                    .where(entries.c.key == bindparam("entry_key"))
+                    .values(hits=entries.c.hits + bindparam("new_hits"), last_hit_at=bindparam("hit_at")),
+                    [{"entry_key": key, "new_hits": count, "hit_at": hit_at} for key, count, hit_at in batch]
+                )
+            updated += result.rowcount
+        return updated
+
+    async def put(self, key: str, call_site: str, model: str, prompt: str, response: str,
+                  inputs: Optional[str] = None) -> None:
+        """Сохранить ответ; повторная запись того же ключа обновляет ответ"""
+        now = datetime.utcnow()
+        stmt = insert(LLMCacheEntry).values(
+            key=key,
+            call_site=call_site,
+            model=model,
+            prompt=prompt,
+            inputs=inputs,
+            response=response,
+            hits=0,
+            created_at=now,
+            last_hit_at=now
+        )
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[LLMCacheEntry.key],
+                set_={"response": stmt.excluded.response, "inputs": stmt.excluded.inputs,
+                      "created_at": now, "last_hit_at": now}
+            )
+        )
+
+    async def get_recent(self, call_site: str, model: str, limit: int) -> List[LLMCacheEntry]:
+        """Последние использованные записи места вызова с inputs — для прогрева поиска похожих промптов"""
+        result = await self.session.execute(
+            select(LLMCacheEntry)
+            .where(
+                LLMCacheEntry.call_site == call_site,
+                LLMCacheEntry.model == model,
+                LLMCacheEntry.inputs.is_not(None)
+            )
+            .order_by(LLMCacheEntry.last_hit_at.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def prune(self, max_rows: int, created_before: Optional[datetime] = None) -> int:
+        """Удалить устаревшие записи и давно не использованные сверх max_rows"""
+        deleted = 0
+        if created_before is not None:
+            result = await self.session.execute(
+                delete(LLMCacheEntry).where(LLMCacheEntry.created_at < created_before)
+            )
+            deleted += result.rowcount
+
+        keep = (
+            select(LLMCacheEntry.key)
+            .order_by(LLMCacheEntry.last_hit_at.desc())
+            .limit(max_rows)
+        )
+        result = await self.session.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.key.not_in(keep))
+        )
+        return deleted + result.rowcount
+
+    async def count(self) -> int:
+        result = await self.session.execute(select(func.count()).select_from(LLMCacheEntry))
+        return result.scalar() or 0
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from typing import List, Optional
+from sqlalchemy import select, update, values, column, Integer
+from typing import List, Optional, Dict, Iterable, Set
 from app.database.models import Product
 from datetime import datetime
 
@@ -36,6 +36,21 @@ class ProductRepository:
         )
         return result.scalars().all()
 
+    async def get_by_names(self, names: Iterable[str], user_id: int, lock: bool = False) -> Dict[str, Product]:
+        """Найти товары пользователя по списку названий одним запросом.
+
+        lock=True — строки блокируются до конца транзакции (FOR UPDATE) в порядке id,
+        чтобы два параллельных импорта не заблокировали друг друга.
+        """
+        query = select(Product).where(
+            Product.user_id == user_id,
+            Product.name.in_(list(names))
+        )
+        if lock:
+            query = query.order_by(Product.id).with_for_update()
+        result = await self.session.execute(query)
+        return {product.name: product for product in result.scalars().all()}
+
     async def create(self, product_data: dict) -> Product:
         """Создать товар"""
         product = Product(**product_data)
@@ -46,11 +61,103 @@ class ProductRepository:
 
     async def update_stock(self, product_id: int, user_id: int, new_quantity: int) -> Optional[Product]:
         """Обновить количество товара"""
-        product = await self.get_by_id(product_id, user_id)
-        if product:
-            product.stock_quantity = new_quantity
-            await self.session.commit()
-        return product
+        result = await self.session.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.user_id == user_id)
+            .values(stock_quantity=new_quantity)
+            .returning(Product)
+        )
+        return result.scalar_one_or_none()
+
+    async def decrement_stock(self, product_id: int, user_id: int, quantity: int) -> Optional[Product]:
+        """Атомарно списать товар, если его достаточно.
+
+        Проверка остатка и списание — один условный UPDATE, поэтому параллельные продажи
+        не могут уйти в минус. None — товар не найден или остатка не хватает.
+        """
+        result = await self.session.execute(
+            update(Product)
+            .where(
+                Product.id == product_id,
+                Product.user_id == user_id,
+                Product.stock_quantity >= quantity
+            )
+            .values(stock_quantity=Product.stock_quantity - quantity)
+            .returning(Product)
+        )
+        return result.scalar_one_or_none()
+
+    async def adjust_stock(self, product_id: int, user_id: int, delta: int) -> Optional[Product]:
+        """Атомарно изменить остаток на delta (без чтения товара перед записью).
+
+        Списание (delta < 0) — с тем же условием, что и в decrement_stock: остаток не уходит в минус.
+        None — товар не найден или остатка не хватает.
+        """
+        conditions = [Product.id == product_id, Product.user_id == user_id]
+        if delta < 0:
+            conditions.append(Product.stock_quantity >= -delta)
+        result = await self.session.execute(
+            update(Product)
+            .where(*conditions)
+            .values(stock_quantity=Product.stock_quantity + delta)
+            .returning(Product)
+        )
+        return result.scalar_one_or_none()
+
+    async def bulk_decrement_stock(self, user_id: int, quantities: Dict[int, int]) -> Set[int]:
+        """Списать остатки по нескольким товарам с тем же условием, что и decrement_stock.
+
+        Возвращает ID товаров, по которым списание прошло; товары, которых не хватило
+        (или которых нет), не меняются, и вызывающий код сам решает, что делать с их строками.
+        """
+        if not quantities:
+            return set()
+        if self.session.bind.dialect.name == "postgresql":
+            # Один UPDATE ... FROM (VALUES ...) RETURNING на все товары
+            rows = values(
+                column("product_id", Integer), column("quantity", Integer), name="sold"
+            ).data(list(quantities.items()))
+            result = await self.session.execute(
+                update(Product)
+                .where(
+                    Product.id == rows.c.product_id,
+                    Product.user_id == user_id,
+                    Product.stock_quantity >= rows.c.quantity
+                )
+                .values(stock_quantity=Product.stock_quantity - rows.c.quantity)
+                .returning(Product.id)
+                .execution_options(synchronize_session=False)
+            )
+            return set(result.scalars().all())
+
+        # SQLite (локальный запуск) не поддерживает список колонок у VALUES — по запросу на товар,
+        # через таблицу, а не ORM: без синхронизации всех товаров сессии на каждый UPDATE
+        products = Product.__table__
+        decremented = set()
+        for product_id, quantity in quantities.items():
+            result = await self.session.execute(
+                update(products)
+                .where(
+                    products.c.id == product_id,
+                    products.c.user_id == user_id,
+                    products.c.stock_quantity >= quantity
+                )
+                .values(stock_quantity=products.c.stock_quantity - quantity)
+                .returning(products.c.id)
+            )
+            if result.scalar_one_or_none() is not None:
+                decremented.add(product_id)
+        return decremented
+
+    async def get_stock_quantity(self, product_id: int, user_id: int) -> Optional[int]:
+        """Текущий остаток товара; None — товар не найден"""
+        result = await self.session.execute(
+            select(Product.stock_quantity).where(
+                Product.id == product_id,
+                Product.user_id == user_id
+            )
+        )
+        return result.scalar_one_or_none()
 
     async def get_low_stock(self, user_id: int) -> List[Product]:
         """Получить товары с низким запасом"""
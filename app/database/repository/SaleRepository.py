@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
-from app.database.models import Sale
+from sqlalchemy import select, func, insert
+from typing import List, Optional, Dict, Any, Tuple
+from app.database.models import Sale, Product
 from datetime import datetime
 
 
@@ -13,10 +13,15 @@ class SaleRepository:
         """Создать продажу"""
         sale = Sale(**sale_data)
         self.session.add(sale)
+        # INSERT ... RETURNING id; остальные поля уже заполнены на клиенте, refresh не нужен
         await self.session.flush()
-        await self.session.refresh(sale)
         return sale
 
+    async def bulk_create(self, rows: List[dict]) -> None:
+        """Вставить пачку продаж одним executemany (без загрузки объектов обратно)"""
+        if rows:
+            await self.session.execute(insert(Sale), rows)
+
     async def get_by_period(self, user_id: int, start_date: datetime, end_date: datetime) -> List[Sale]:
         """Получить продажи за период"""
         result = await self.session.execute(
@@ -72,4 +77,27 @@ class SaleRepository:
                 Sale.sale_date.between(start_date, end_date)
             )
         )
-        return result.scalar() or 0
\ No newline at end of file
+        return result.scalar() or 0
+
+    async def get_recent_with_product_names(self, user_id: int, start_date: datetime, end_date: datetime,
+                                            limit: int = 10) -> List[Dict[str, Any]]:
+        """Последние продажи за период с названиями товаров, в хронологическом порядке"""
+        result = await self.session.execute(
+            select(Sale.sale_date, Product.name, Sale.quantity, Sale.total_amount)
+            .join(Product, Sale.product_id == Product.id)
+            .where(
+                Sale.user_id == user_id,
+                Sale.sale_date.between(start_date, end_date)
+            )
+            .order_by(Sale.sale_date.desc(), Sale.id.desc())
+            .limit(limit)
+        )
+        rows = result.all()
+        return [
+            {
+                "date": sale_date.strftime("%Y-%m-%d %H:%M"),
+                "product": name,
+                "quantity": quantity,
+                "amount": amount
+            } for sale_date, name, quantity, amount in reversed(rows)
+        ]
\ No newline at end of file
@@ -0,0 +1,155 @@
+from collections import defaultdict
+from datetime import date
+from typing import List, Dict, Any, Tuple, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, delete, func, cast, Date
+
+from app.database.models import DailySalesRollup, Product, Sale
+
+
+class SalesRollupRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, user_id: int, day: date, product_id: int, quantity: int,
+                  revenue: float, cost: float, sales_count: int = 1) -> None:
+        """Прибавить продажу к дневному агрегату товара"""
+        await self.add_many([{
+            "user_id": user_id,
+            "day": day,
+            "product_id": product_id,
+            "quantity": quantity,
+            "revenue": revenue,
+            "cost": cost,
+            "sales_count": sales_count,
+        }])
+
+    async def add_many(self, rows: Iterable[dict]) -> None:
+        """Прибавить пачку продаж к агрегатам одним INSERT ... ON CONFLICT DO UPDATE"""
+        # Один ключ не может встретиться в одном upsert дважды — сначала сворачиваем пачку
+        totals = defaultdict(lambda: {"quantity": 0, "revenue": 0.0, "cost": 0.0, "sales_count": 0})
+        for row in rows:
+            total = totals[(row["user_id"], row["day"], row["product_id"])]
+            total["quantity"] += row["quantity"]
+            total["revenue"] += row["revenue"]
+            total["cost"] += row["cost"]
+            total["sales_count"] += row.get("sales_count", 1)
+
+        if not totals:
+            return
+
+        # ON CONFLICT DO UPDATE есть и в SQLite — на нем работают локальные проверки и нагрузочные скрипты
+        upsert = sqlite.insert if self.session.bind.dialect.name == "sqlite" else insert
+        stmt = upsert(DailySalesRollup)
+        table = DailySalesRollup.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day, table.c.product_id],
+            set_={
+                "quantity": table.c.quantity + stmt.excluded.quantity,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+                "cost": table.c.cost + stmt.excluded.cost,
+                "sales_count": table.c.sales_count + stmt.excluded.sales_count,
+            }
+        )
+        # executemany, а не VALUES на все строки: выражение компилируется один раз и берется из кэша
+        await self.session.execute(stmt, [
+            {"user_id": user_id, "day": day, "product_id": product_id, **total}
+            for (user_id, day, product_id), total in totals.items()
+        ])
+
+    async def rebuild(self, user_id: Optional[int] = None) -> int:
+        """Пересчитать сводку из таблицы продаж (всю или одного пользователя); возвращает число строк"""
+        deleted = delete(DailySalesRollup)
+        if user_id is not None:
+            deleted = deleted.where(DailySalesRollup.user_id == user_id)
+        await self.session.execute(deleted)
+
+        day = cast(Sale.sale_date, Date)
+        source = (
+            select(
+                Sale.user_id,
+                day,
+                Sale.product_id,
+                func.sum(Sale.quantity),
+                func.sum(Sale.total_amount),
+                func.sum(Sale.quantity * func.coalesce(Product.purchase_price, 0.0)),
+                func.count(Sale.id)
+            )
+            .join(Product, Sale.product_id == Product.id)
+            .group_by(Sale.user_id, day, Sale.product_id)
+        )
+        if user_id is not None:
+            source = source.where(Sale.user_id == user_id)
+
+        result = await self.session.execute(
+            insert(DailySalesRollup).from_select(
+                ["user_id", "day", "product_id", "quantity", "revenue", "cost", "sales_count"],
+                source
+            )
+        )
+        return result.rowcount
+
+    async def get_period_totals(self, user_id: int, start_day: date, end_day: date) -> Dict[str, Any]:
+        """Выручка, себестоимость, количество и число продаж за период"""
+        result = await self.session.execute(
+            select(
+                func.coalesce(func.sum(DailySalesRollup.revenue), 0.0),
+                func.coalesce(func.sum(DailySalesRollup.cost), 0.0),
+                func.coalesce(func.sum(DailySalesRollup.quantity), 0),
+                func.coalesce(func.sum(DailySalesRollup.sales_count), 0)
+            ).where(
+                DailySalesRollup.user_id == user_id,
+                DailySalesRollup.day.between(start_day, end_day)
+            )
+        )
+        revenue, cost, quantity, count = result.one()
+        return {"revenue": float(revenue), "cost": float(cost), "quantity": int(quantity), "count": int(count)}
+
+    async def get_top_products(self, user_id: int, start_day: date, end_day: date,
+                               limit: int = 5) -> List[Tuple[Product, int, float]]:
+        """Топ товаров по выручке за период: (товар, количество, выручка)"""
+        revenue = func.sum(DailySalesRollup.revenue).label("revenue")
+        result = await self.session.execute(
+            select(Product, func.sum(DailySalesRollup.quantity), revenue)
+            .join(DailySalesRollup, DailySalesRollup.product_id == Product.id)
+            .where(
+                DailySalesRollup.user_id == user_id,
+                DailySalesRollup.day.between(start_day, end_day)
+            )
+            .group_by(Product.id)
+            .order_by(revenue.desc())
+            .limit(limit)
+        )
+        return [(product, int(quantity), float(total)) for product, quantity, total in result.all()]
+
+    async def get_daily_revenue(self, user_id: int, start_day: date, end_day: date) -> Dict[str, float]:
+        """Выручка по дням за период"""
+        result = await self.session.execute(
+            select(DailySalesRollup.day, func.sum(DailySalesRollup.revenue))
+            .where(
+                DailySalesRollup.user_id == user_id,
+                DailySalesRollup.day.between(start_day, end_day)
+            )
+            .group_by(DailySalesRollup.day)
+            .order_by(DailySalesRollup.day)
+        )
+        return {day.strftime("%Y-%m-%d"): float(total) for day, total in result.all()}
+
+    async def get_category_totals(self, user_id: int, start_day: date, end_day: date) -> Dict[str, Dict[str, float]]:
+        """Выручка, себестоимость и прибыль по категориям товаров за период"""
+        result = await self.session.execute(
+            select(Product.category, func.sum(DailySalesRollup.revenue), func.sum(DailySalesRollup.cost))
+            .join(Product, DailySalesRollup.product_id == Product.id)
+            .where(
+                DailySalesRollup.user_id == user_id,
+                DailySalesRollup.day.between(start_day, end_day)
+            )
+            .group_by(Product.category)
+        )
+        return {
+            category: {"revenue": float(revenue), "cost": float(cost), "profit": float(revenue - cost)}
+            for category, revenue, cost in result.all()
+        }
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
 
 from app.database.models import StockMovement
 
@@ -18,6 +18,11 @@ class StockMovementRepository:
         await self.session.refresh(movement)
         return movement
 
+    async def bulk_create(self, rows: List[dict]) -> None:
+        """Вставить пачку движений одним executemany"""
+        if rows:
+            await self.session.execute(insert(StockMovement), rows)
+
     async def get_by_product(self, product_id: int, user_id: int) -> List[StockMovement]:
         """Получить движения по товару"""
         result = await self.session.execute(
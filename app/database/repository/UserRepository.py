@@ -1,7 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, values, column, bindparam, or_, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User
@@ -18,6 +19,33 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
 
+    async def upsert(self, user_id: int, username: Optional[str] = None, first_name: Optional[str] = None,
+                     last_name: Optional[str] = None) -> User:
+        """Создать пользователя или обновить имя и активность — один запрос, без гонки find/insert.
+
+        Пустые значения из апдейта не затирают сохраненные. DO UPDATE выполняется всегда
+        (не DO NOTHING), иначе RETURNING не вернул бы существующую строку.
+        """
+        now = datetime.now()
+        stmt = insert(User).values(
+            id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            last_active=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={
+                "username": func.coalesce(stmt.excluded.username, User.username),
+                "first_name": func.coalesce(stmt.excluded.first_name, User.first_name),
+                "last_name": func.coalesce(stmt.excluded.last_name, User.last_name),
+                "last_active": now,
+            }
+        ).returning(User)
+        result = await self.session.execute(stmt, execution_options={"populate_existing": True})
+        return result.scalar_one()
+
     async def save(self, user: User) -> User:
         """Сохранить пользователя (аналог JPA save)"""
         self.session.add(user)
@@ -46,4 +74,36 @@ class UserRepository:
         user = await self.find_by_id(user_id)
         if user:
             user.last_active = datetime.now()
-            await self.session.commit()
\ No newline at end of file
+            await self.session.commit()
+
+    async def bulk_update_last_active(self, activity: Dict[int, datetime], batch_size: int = 5000) -> int:
+        """Записать время активности многих пользователей; более раннее время не затирает позднее"""
+        items = list(activity.items())
+        updated = 0
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if self.session.bind.dialect.name == "postgresql":
+                # Один UPDATE ... FROM (VALUES ...) на пачку вместо UPDATE на каждого пользователя
+                rows = values(
+                    column("id", BigInteger), column("last_active", DateTime), name="activity"
+                ).data(batch)
+                result = await self.session.execute(
+                    update(User)
+                    .where(User.id == rows.c.id)
+                    .where(or_(User.last_active.is_(None), User.last_active < rows.c.last_active))
+                    .values(last_active=rows.c.last_active)
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                # SQLite (локальный запуск) не поддерживает список колонок у VALUES — executemany
+                users = User.__table__
+                connection = await self.session.connection()
+                result = await connection.execute(
+                    update(users)
+                    .where(users.c.id == bindparam("user_id"))
+                    .where(or_(users.c.last_active.is_(None), users.c.last_active < bindparam("seen_at")))
+                    .values(last_active=bindparam("seen_at")),
+                    [{"user_id": user_id, "seen_at": seen_at} for user_id, seen_at in batch]
+                )
+            updated += result.rowcount
+        return updated
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах; 0, если все полученные WAL уже применены
+REPLICA_LAG_SQL = text(
+    "SELECT CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class ReplicaRouter:
+    """Политика маршрутизации read-only UoW: реплика, пока ее отставание в пределах нормы.
+
+    Отставание проверяется не чаще раза в check_interval секунд; если реплика недоступна
+    или отстает больше max_lag_seconds, чтение уходит на primary.
+    """
+
+    def __init__(self, max_lag_seconds: float = 5.0, check_interval: float = 5.0,
+                 replica_engine: Optional[AsyncEngine] = None):
+        self.replica_engine = replica_engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+
+        self.lag: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def use_replica(self) -> bool:
+        """Можно ли сейчас читать с реплики"""
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    await self._refresh_lag()
+
+        if self.lag is not None and self.lag <= self.max_lag_seconds:
+            self.replica_reads += 1
+            return True
+
+        self.primary_fallbacks += 1
+        return False
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    async def _refresh_lag(self):
+        try:
+            async with self.replica_engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    self.lag = float(await conn.scalar(REPLICA_LAG_SQL))
+                else:
+                    # Не-Postgres реплика (например, SQLite в тестах): проверяем только доступность
+                    await conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+        except Exception as e:
+            logger.warning(f"Реплика недоступна, чтение идет на primary: {e}")
+            self.lag = None
+        finally:
+            self._checked_at = time.monotonic()
+
+    def status(self):
+        return {
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag_seconds,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
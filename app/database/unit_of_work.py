@@ -1,3 +1,5 @@
+import inspect
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .repository.MarketingIdeaRepository import MarketingIdeaRepository
@@ -11,33 +13,62 @@ from .repository.DocumentRepository import DocumentRepository
 from .repository.ProductRepository import ProductRepository
 from .repository.SaleRepository import SaleRepository
 from .repository.StockMovementRepository import StockMovementRepository
+from .repository.SalesRollupRepository import SalesRollupRepository
+from .repository.LLMCacheRepository import LLMCacheRepository
+from .repository.JobRepository import JobRepository
 
 class UnitOfWork:
-    def __init__(self, session_factory):
+    # Имя атрибута -> класс репозитория; репозитории создаются при первом обращении
+    REPOSITORIES = {
+        "users": UserRepository,
+        "conversations": ConversationRepository,
+        "business_data": BusinessDataRepository,
+        "templates": TemplateRepository,
+        "quick_actions": QuickActionRepository,
+        "documents": DocumentRepository,
+        "insights": InsightRepository,
+        "products": ProductRepository,
+        "sales": SaleRepository,
+        "stock_movements": StockMovementRepository,
+        "sales_rollup": SalesRollupRepository,
+        "llm_cache": LLMCacheRepository,
+        "jobs": JobRepository,
+        "marketing_ideas": MarketingIdeaRepository,
+    }
+
+    def __init__(self, session_factory, read_only: bool = False):
         self.session_factory = session_factory
+        self.read_only = read_only
         self.session: AsyncSession | None = None
 
+    def __getattr__(self, name):
+        repository_class = UnitOfWork.REPOSITORIES.get(name)
+        if repository_class is None or self.session is None:
+            raise AttributeError(name)
+
+        repository = repository_class(self.session)
+        setattr(self, name, repository)
+        return repository
+
     async def __aenter__(self):
-        self.session = self.session_factory()
-
-        self.users = UserRepository(self.session)
-        self.conversations = ConversationRepository(self.session)
-        self.business_data = BusinessDataRepository(self.session)
-        self.templates = TemplateRepository(self.session)
-        self.quick_actions = QuickActionRepository(self.session)
-        self.documents = DocumentRepository(self.session)
-        self.insights = InsightRepository(self.session)
-        self.products = ProductRepository(self.session)
-        self.sales = SaleRepository(self.session)
-        self.stock_movements = StockMovementRepository(self.session)
-        self.marketing_ideas = MarketingIdeaRepository(self.session)
+        session = self.session_factory()
+        # Фабрика может быть асинхронной: например, выбор между primary и репликой
+        if inspect.isawaitable(session):
+            session = await session
+        self.session = session
+
+        if self.read_only:
+            # Транзакция открывается как BEGIN READ ONLY без отдельного запроса;
+            # соединение возвращается в пул со сброшенным флагом
+            await self.session.connection(execution_options={"postgresql_readonly": True})
 
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if exc_type is not None:
             await self.session.rollback()
-        else:
+        elif not self.read_only:
             await self.session.commit()
 
+        # Для read-only UoW commit не нужен: close() просто завершает транзакцию
         await self.session.close()
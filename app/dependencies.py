@@ -1,26 +1,40 @@
 # app/core/dependencies.py
-from fastapi import Depends
+from contextlib import asynccontextmanager
 
-from app.database import Database, UnitOfWork
+from fastapi import Depends, FastAPI
+
+from app.database import Database, UnitOfWork, get_database
 from app.database.repository import (
     UserRepository,
     ConversationRepository,
     DocumentRepository,
     InsightRepository
 )
-from app.service import WarehouseService, MarketingService
+from app.service import WarehouseService, MarketingService, get_service_container
 from app.service.user_service import UserService
 from app.service.conversation_service import ConversationService
 from app.service.analytic_service import AnalyticService
 from app.service.document_analyzer import DocumentAnalyzer
 from app.service.llm_service import LLMService
+from app.service.sales_import_service import SalesImportService
+from app.service.job_service import JobQueue
+from app.service.document_ingestion import DocumentIngestionService
 
 
-async def get_db() -> Database:
-    """Возвращает экземпляр базы данных"""
-    db = Database()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация общего пула соединений при старте API и его закрытие при остановке"""
+    db = get_database()
     await db.init()
-    return db
+    app.state.db = db
+    yield
+    await get_service_container().close()
+    await db.dispose()
+
+
+async def get_db() -> Database:
+    """Возвращает общий экземпляр базы данных"""
+    return get_database()
 
 
 async def get_uow(db: Database = Depends(get_db)) -> UnitOfWork:
@@ -45,30 +59,41 @@ async def get_insight_repository(uow: UnitOfWork = Depends(get_uow)) -> InsightR
 
 
 async def get_llm_service() -> LLMService:
-    """Возвращает LLM сервис"""
-    return LLMService()  # добавь конфигурацию если нужно
+    """Возвращает общий для процесса LLM сервис"""
+    return get_service_container().get("llm_service")
+
+
+async def get_user_service() -> UserService:
+    return get_service_container().get("user_service")
+
+
+async def get_conversation_service() -> ConversationService:
+    return get_service_container().get("conversation_service")
+
+
+async def get_analytic_service() -> AnalyticService:
+    return get_service_container().get("analytic_service")
 
 
-async def get_user_service(db: Database = Depends(get_db)) -> UserService:
-    return UserService(db)
+async def get_warehouse_service() -> WarehouseService:
+    return get_service_container().get("warehouse_service")
 
 
-async def get_conversation_service(db: Database = Depends(get_db)) -> ConversationService:
-    return ConversationService(db)
+async def get_marketing_service() -> MarketingService:
+    return get_service_container().get("marketing_idea_service")
 
 
-async def get_analytic_service(db: Database = Depends(get_db)) -> AnalyticService:
-    return AnalyticService(db)
+async def get_document_service() -> DocumentAnalyzer:
+    return get_service_container().get("document_service")
 
 
-async def get_warehouse_service(db: Database = Depends(get_db)) -> WarehouseService:
-    return WarehouseService(db)
+async def get_sales_import_service() -> SalesImportService:
+    return get_service_container().get("sales_import_service")
 
 
-async def get_marketing_service(db: Database = Depends(get_db)) -> MarketingService:
-    return MarketingService(db)
+async def get_job_queue() -> JobQueue:
+    return get_service_container().get("job_queue")
 
 
-async def get_document_service(
-        db: Database = Depends(get_db)) -> DocumentAnalyzer:
-    return DocumentAnalyzer(db)
+async def get_document_ingestion_service() -> DocumentIngestionService:
+    return get_service_container().get("document_ingestion_service")
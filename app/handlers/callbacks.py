@@ -115,8 +115,9 @@ async def start_act_creation(call: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "doc:analyze")
-async def doc_analyze(call: CallbackQuery):
-    await call.message.answer("🔍 Отправьте файл PDF/DOCX.")
+async def doc_analyze(call: CallbackQuery, state: FSMContext):
+    await call.message.answer("🔍 Отправьте файл PDF/DOCX или фото документа.")
+    await state.set_state(States.waiting_document_file)
     await call.answer()
 
 
@@ -239,39 +240,83 @@ async def handle_financial_overview(callback: CallbackQuery,
         await callback.answer(f"❌ Ошибка: {str(e)}", show_alert=True)
 
 
+@router.callback_query(F.data == "an:import")
+async def start_sales_import(call: CallbackQuery, state: FSMContext):
+    await call.message.answer(
+        "📥 <b>Импорт продаж</b>\n\n"
+        "Отправьте файл CSV или XLSX с колонками:\n"
+        "• товар (название, как в складе)\n• количество\n"
+        "• цена, дата, оплата, клиент — необязательно",
+        reply_markup=None
+    )
+    await state.set_state(States.waiting_sales_file)
+    await call.answer()
+
+
 # --------- Profile ----------
+def render_history_page(page) -> str:
+    """Текст страницы истории диалогов"""
+    text = "📝 История диалогов:\n\n"
+    for conv in page["items"]:
+        # Начало первого сообщения пользователя в диалоге, обрезанное базой
+        preview = conv.preview + ("..." if conv.message_length > len(conv.preview) else "")
+        text += (
+            f"🗂 #{conv.id} | {conv.category or '—'} | {conv.created_at.strftime('%d.%m %H:%M')}\n"
+            f"💬 {preview}\n\n"
+        )
+    return text
+
+
 @router.callback_query(F.data == "profile:history")
 async def profile_history(
         call: CallbackQuery,
         conversation_service: ConversationService = Depends(get_conversation_service)
 ):
     """
-    Обработчик истории сообщений
+    Обработчик истории сообщений: первая (самая новая) страница
     """
-    conversations = await conversation_service.get_user_conversations(call.from_user.id)
+    page = await conversation_service.get_conversation_page(call.from_user.id)
 
-    if not conversations:
+    if not page["items"]:
         await call.message.answer("📝 У вас пока нет сохранённых диалогов.")
         await call.answer()
         return
 
-    text = "📝 История диалогов:\n\n"
-    for conv in conversations:
-        last_msg = conv.user_message.split("\n\n")[-1]  # последнее сообщение пользователя
-        preview = last_msg[:80] + ("..." if len(last_msg) > 80 else "")
-        text += (
-            f"🗂 #{conv.id} | {conv.category or '—'} | {conv.created_at.strftime('%d.%m %H:%M')}\n"
-            f"💬 {preview}\n\n"
-        )
-
     await call.message.answer(
-        text,
-        reply_markup=conversation_buttons(conversations)
+        render_history_page(page),
+        reply_markup=conversation_buttons(page["items"], page["older_cursor"], page["newer_cursor"])
     )
 
     await call.answer()
 
 
+@router.callback_query(F.data.startswith("history:"))
+async def history_page(
+        call: CallbackQuery,
+        conversation_service: ConversationService = Depends(get_conversation_service)
+):
+    """
+    Переход по страницам истории: history:<older|newer>:<курсор>, сообщение редактируется на месте
+    """
+    _, direction, cursor = call.data.split(":", 2)
+    try:
+        page = await conversation_service.get_conversation_page(call.from_user.id, cursor, direction)
+    except ValueError:
+        await call.answer("Не удалось открыть страницу, откройте историю заново.", show_alert=True)
+        return
+
+    if not page["items"]:
+        await call.message.edit_text("📝 У вас пока нет сохранённых диалогов.")
+        await call.answer()
+        return
+
+    await call.message.edit_text(
+        render_history_page(page),
+        reply_markup=conversation_buttons(page["items"], page["older_cursor"], page["newer_cursor"])
+    )
+    await call.answer()
+
+
 @router.callback_query(F.data == "profile:analytics")
 async def profile_analytics(
         call: CallbackQuery,
@@ -551,31 +596,63 @@ async def view_business_profile(
     await call.answer()
 
 
+# Реплик на одну страницу диалога и бюджет текста: сообщение Telegram — не больше 4096 символов
+DIALOG_PAGE_TURNS = 10
+DIALOG_PAGE_CHARS = 3500
+
+
 @router.callback_query(F.data.startswith("open_dialog:"))
 async def open_dialog(
         callback: CallbackQuery,
         conversation_service: ConversationService = Depends(get_conversation_service)
 ):
-    conversation_id = int(callback.data.split(":")[1])
+    """
+    Диалог целиком, по страницам: open_dialog:<id>[:<id последней показанной реплики>]
+    """
+    parts = callback.data.split(":")
+    conversation_id = int(parts[1])
+    after_id = int(parts[2]) if len(parts) > 2 else None
     conv = await conversation_service.get_conversation(conversation_id)
 
-    if not conv:
+    if not conv or conv.user_id != callback.from_user.id:
         await callback.message.answer("❌ Этот диалог не найден или был удалён.")
         await callback.answer()
         return
 
-    user_lines = conv.user_message.split("\n\n")
-    bot_lines = conv.bot_response.split("\n\n")
-    messages = []
-    for u, b in zip(user_lines, bot_lines):
-        messages.append(f"🧑 {u}\n🤖 {b}")
-
+    # Одна реплика сверх страницы — чтобы знать, есть ли продолжение
+    turns = await conversation_service.get_conversation_messages(
+        conversation_id, after_id, limit=DIALOG_PAGE_TURNS + 1
+    )
+    messages, budget, last_shown_id = [], DIALOG_PAGE_CHARS, after_id
+    for turn in turns[:DIALOG_PAGE_TURNS]:
+        message = f"🧑 {turn.user_message or ''}\n🤖 {turn.bot_response or ''}"
+        if messages and len(message) > budget:
+            break
+        if len(message) > budget:
+            # Одна реплика длиннее страницы: показываем начало, а не роняем отправку
+            message = message[:budget] + "…"
+        messages.append(message)
+        budget -= len(message) + 2
+        last_shown_id = turn.id
+
+    has_more = len(turns) > len(messages)
     full_text = (
             f"🗂 <b>Диалог #{conv.id}</b>\n"
             f"Категория: {conv.category or '—'}\n"
             f"Создан: {conv.created_at:%d.%m %H:%M}\n\n"
-            + "\n\n".join(messages)
+            + ("\n\n".join(messages) if messages else "Реплик нет.")
     )
 
-    await callback.message.edit_text(full_text)
+    navigation = []
+    if after_id is not None:
+        navigation.append(InlineKeyboardButton(text="⏮ В начало", callback_data=f"open_dialog:{conv.id}"))
+    if has_more:
+        navigation.append(
+            InlineKeyboardButton(text="Дальше ➡️", callback_data=f"open_dialog:{conv.id}:{last_shown_id}")
+        )
+
+    await callback.message.edit_text(
+        full_text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[navigation]) if navigation else None
+    )
     await callback.answer()
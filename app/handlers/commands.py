@@ -105,7 +105,7 @@ async def cmd_history(
 
     history_text = "📝 **Последние консультации:**\n\n"
     for i, conv in enumerate(conversations, 1):
-        preview = conv.user_message[:30] + "..." if len(conv.user_message) > 30 else conv.user_message
+        preview = conv.preview[:30] + "..." if conv.message_length > 30 else conv.preview
         history_text += f"{i}. {conv.category or 'Общее'} - {conv.created_at.strftime('%d.%m %H:%M')}\n"
         history_text += f"   💬 {preview}\n\n"
 
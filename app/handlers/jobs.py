@@ -0,0 +1,166 @@
+from typing import Any, Dict
+
+from aiogram import Bot
+
+from app.database.models import Job
+from app.service.container import ServiceContainer
+from app.service.job_service import JobWorkerPool
+from app.service.llm_service import LLMService
+from app.utils.message_stream import ThrottledMessageEditor
+
+
+# Тип задачи -> текст сообщения-заглушки, которое задача дополняет и заменяет результатом
+JOB_HEADERS = {
+    "document.contract": "⚖️ Генерирую договор...",
+    "document.act": "🧾 Генерирую акт...",
+    "document.check": "📑 Проверяю документ...",
+}
+
+
+def register_job_handlers(pool: JobWorkerPool, bot: Bot, container: ServiceContainer):
+    """Обработчики фоновых задач документов и доставка их результатов в чат"""
+
+    def progress_editor(job: Job, header: str) -> ThrottledMessageEditor:
+        return ThrottledMessageEditor.for_message_id(bot, job.chat_id, job.message_id, text=header)
+
+    async def create_contract(job: Job) -> Dict[str, Any]:
+        header = JOB_HEADERS[job.type]
+        editor = progress_editor(job, header)
+
+        async def show_progress(text: str):
+            # Текст договора появляется в сообщении по мере генерации
+            content = LLMService.partial_json_field(text, "content")
+            if content:
+                await editor.update(f"{header}\n\n{content}")
+
+        return await container.get("document_service").create_contract(
+            user_id=job.user_id,
+            contract_details=job.payload["text"],
+            on_progress=show_progress if job.message_id else None
+        )
+
+    async def create_act(job: Job) -> Dict[str, Any]:
+        header = JOB_HEADERS[job.type]
+        editor = progress_editor(job, header)
+
+        async def show_progress(text: str):
+            content = LLMService.partial_json_field(text, "content")
+            if content:
+                await editor.update(f"{header}\n\n{content}")
+
+        return await container.get("document_service").create_act(
+            user_id=job.user_id,
+            act_data=job.payload["text"],
+            on_progress=show_progress if job.message_id else None
+        )
+
+    async def check_document(job: Job) -> Dict[str, Any]:
+        if "document_id" in job.payload:
+            # Загруженный файл: текст уже извлечен и лежит в documents
+            return await container.get("document_service").check_stored_document(
+                user_id=job.user_id,
+                document_id=job.payload["document_id"]
+            )
+        return await container.get("document_service").check_document(
+            user_id=job.user_id,
+            document_text=job.payload["text"]
+        )
+
+    async def deliver(job: Job, result: Dict[str, Any]):
+        if job.chat_id is None:
+            return
+        if job.type == "document.contract":
+            await deliver_contract(job, result)
+        elif job.type == "document.act":
+            await deliver_act(job, result)
+        elif job.type == "document.check":
+            await deliver_check(job, result)
+
+    async def show_summary(job: Job, text: str):
+        if job.message_id:
+            await progress_editor(job, JOB_HEADERS.get(job.type)).finish(text)
+        else:
+            await bot.send_message(job.chat_id, text)
+
+    async def deliver_contract(job: Job, result: Dict[str, Any]):
+        response = f"📄 ДОГОВОР СОЗДАН (задача #{job.id})\n\n"
+        response += f"📌 Тип:{result.get('document_type', 'договор')}\n"
+        response += f"🏷️ Название: {result.get('title', 'Договор')}\n\n"
+        await show_summary(job, response)
+
+        if result.get('key_points'):
+            points_text = "🔑 КЛЮЧЕВЫЕ ПУНКТЫ:\n"
+            for point in result.get('key_points', [])[:5]:
+                points_text += f"• {point}\n"
+            await bot.send_message(job.chat_id, points_text)
+        risks_text = f"⚠️ РИСКИ:\n{result.get('risks', 'Не выявлено')}\n\n"
+        risks_text += f"💡 РЕКОМЕНДАЦИИ:\n{result.get('recommendations', 'Нет рекомендаций')}"
+        await bot.send_message(job.chat_id, risks_text)
+
+        content = result.get('content', '')
+        if len(content) > 4000:
+            await bot.send_message(job.chat_id, "📋 Текст договора слишком длинный для сообщения.\nИспользуйте функцию экспорта.")
+        else:
+            await bot.send_message(job.chat_id, f"📝 ТЕКСТ ДОГОВОРА:\n\n{content}")
+
+    async def deliver_act(job: Job, result: Dict[str, Any]):
+        response = f"🧾 АКТ СОЗДАН (задача #{job.id})\n\n"
+        response += f"📌 Тип: {result.get('document_type', 'акт')}\n"
+        response += f"🏷️ Название:{result.get('title', 'Акт')}\n\n"
+        await show_summary(job, response)
+
+        # Обязательные поля
+        if result.get('required_fields'):
+            fields_text = "📋 ОБЯЗАТЕЛЬНЫЕ ПОЛЯ:\n"
+            for field in result.get('required_fields', [])[:5]:
+                fields_text += f"• {field}\n"
+            await bot.send_message(job.chat_id, fields_text)
+
+        # Чек-лист
+        if result.get('checklist'):
+            await bot.send_message(job.chat_id, f"✅ ЧЕК-ЛИСТ:\n{result.get('checklist', '')}")
+
+        # Текст акта
+        content = result.get('content', '')
+        if len(content) > 4000:
+            await bot.send_message(job.chat_id, "📋 Текст акта слишком длинный для сообщения.")
+        else:
+            await bot.send_message(job.chat_id, f"📝 ТЕКСТ АКТА:\n\n{content}")
+
+    async def deliver_check(job: Job, result: Dict[str, Any]):
+        status_emojis = {
+            "ok": "✅",
+            "risky": "⚠️",
+            "critical": "❌",
+            "unavailable": "🚫"
+        }
+
+        status = result.get('status', 'ok')
+        emoji = status_emojis.get(status, '📄')
+
+        response = f"{emoji} РЕЗУЛЬТАТ ПРОВЕРКИ (задача #{job.id})\n\n"
+        response += f"📊 Статус: {status.upper()}\n"
+        response += f"📝 Общая оценка: {(result.get('summary') or 'Не указана')[:1500]}\n\n"
+        await show_summary(job, response)
+
+        # Пункты, собранные со всех частей документа
+        for field, title in (("errors", "❌ ОШИБКИ"), ("risks", "⚠️ РИСКИ"), ("recommendations", "💡 РЕКОМЕНДАЦИИ")):
+            items = result.get(field) or []
+            if isinstance(items, str):
+                items = [items]
+            if items:
+                text = f"{title}:\n" + "".join(f"• {item}\n" for item in items[:10])
+                if len(items) > 10:
+                    text += f"… и еще {len(items) - 10}\n"
+                await bot.send_message(job.chat_id, text[:4000])
+
+    async def report_failure(job: Job, error: str):
+        if job.chat_id is None:
+            return
+        await show_summary(job, f"❌ Задача #{job.id} не выполнена. Попробуйте позже.")
+
+    pool.register("document.contract", create_contract)
+    pool.register("document.act", create_act)
+    pool.register("document.check", check_document)
+    pool.on_success = deliver
+    pool.on_failure = report_failure
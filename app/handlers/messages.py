@@ -1,13 +1,20 @@
+import os
+import tempfile
+
 from aiogram import Router, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from fastapi import Depends
 
-from app.dependencies import get_user_service, get_marketing_service, get_document_service
+from app.dependencies import (get_user_service, get_marketing_service, get_sales_import_service, get_job_queue,
+                              get_document_ingestion_service)
 from app.handlers.states import States
 from app.keyboards.menus import get_platforms_keyboard, get_post_styles_keyboard, get_content_themes_keyboard
-from app.service import UserService, MarketingService, DocumentAnalyzer
+from app.service import (UserService, MarketingService, SalesImportService, LLMService, JobQueue,
+                         DocumentIngestionService)
+from app.service.document_extraction import ExtractionError, SUPPORTED_TYPES
+from app.utils.message_stream import ThrottledMessageEditor
 
 router = Router()
 
@@ -186,14 +193,25 @@ async def process_custom_request(message: Message, state: FSMContext,
     user_data = await state.get_data()
     custom_request = message.text if message.text.lower() != "нет" else None
 
-    await message.answer("🚀 Генерирую маркетинговую стратегию...")
+    placeholder = await message.answer("🚀 Генерирую маркетинговую стратегию...")
+    editor = ThrottledMessageEditor(placeholder)
+
+    async def show_progress(text: str):
+        # Показываем поля стратегии по мере того, как модель их дописывает
+        preview = "🚀 Генерирую маркетинговую стратегию...\n\n"
+        for label, field in (("📌", "title"), ("🔍", "problem"), ("💡", "solution")):
+            value = LLMService.partial_json_field(text, field)
+            if value:
+                preview += f"{label} {value}\n\n"
+        await editor.update(preview)
 
     idea = await marketing_idea_service.generate_marketing_idea(
         user_id=message.from_user.id,
         niche=user_data['niche'],
         goal=user_data['goal'],
         platform=user_data['platform'],
-        custom_request=custom_request
+        custom_request=custom_request,
+        on_progress=show_progress
     )
 
     response = f"🎯 МАРКЕТИНГОВАЯ СТРАТЕГИЯ\n\n"
@@ -204,7 +222,7 @@ async def process_custom_request(message: Message, state: FSMContext,
     for step in idea.get('action_plan', [])[:3]:
         response += f"• {step}\n"
 
-    await message.answer(response)
+    await editor.finish(response)
 
     if idea.get('content_ideas'):
         content_text = "📝 ИДЕИ ДЛЯ КОНТЕНТА:\n"
@@ -310,122 +328,134 @@ async def process_content_theme(call: CallbackQuery, state: FSMContext,
 
 @router.message(States.waiting_contract_details)
 async def process_contract_details(message: Message, state: FSMContext,
-                                   document_service: DocumentAnalyzer = Depends(get_document_service)):
-    contract_details = message.text
-
-    await message.answer("⚖️ Генерирую договор...")
-
-    result = await document_service.create_contract(
-        user_id=message.from_user.id,
-        contract_details=contract_details
-    )
-
-    response = f"📄 ДОГОВОР СОЗДАН\n\n"
-    response += f"📌 Тип:{result.get('document_type', 'договор')}\n"
-    response += f"🏷️ Название: {result.get('title', 'Договор')}\n\n"
-
-    await message.answer(response)
-
-    if result.get('key_points'):
-        points_text = "🔑 КЛЮЧЕВЫЕ ПУНКТЫ:\n"
-        for point in result.get('key_points', [])[:5]:
-            points_text += f"• {point}\n"
-        await message.answer(points_text)
-    risks_text = f"⚠️ РИСКИ:\n{result.get('risks', 'Не выявлено')}\n\n"
-    risks_text += f"💡 РЕКОМЕНДАЦИИ:\n{result.get('recommendations', 'Нет рекомендаций')}"
-    await message.answer(risks_text)
-
-    content = result.get('content', '')
-    if len(content) > 4000:
-        await message.answer("📋 Текст договора слишком длинный для сообщения.\nИспользуйте функцию экспорта.")
-    else:
-        await message.answer(f"📝 ТЕКСТ ДОГОВОРА:\n\n{content}")
-
-    await state.clear()
+                                   job_queue: JobQueue = Depends(get_job_queue)):
+    await enqueue_document_job(message, state, job_queue, "document.contract", "⚖️ Генерирую договор...")
 
 
 @router.message(States.waiting_act_data)
 async def process_act_data(message: Message, state: FSMContext,
-                           document_service: DocumentAnalyzer = Depends(get_document_service)):
-    act_data = message.text
+                           job_queue: JobQueue = Depends(get_job_queue)):
+    await enqueue_document_job(message, state, job_queue, "document.act", "🧾 Генерирую акт...")
+
+
+@router.message(States.waiting_document_text)
+async def process_document_text(message: Message, state: FSMContext,
+                                job_queue: JobQueue = Depends(get_job_queue)):
+    await enqueue_document_job(message, state, job_queue, "document.check", "📑 Проверяю документ...")
 
-    await message.answer("🧾 Генерирую акт...")
 
-    result = await document_service.create_act(
+async def enqueue_document_job(message: Message, state: FSMContext, job_queue: JobQueue,
+                               job_type: str, header: str):
+    """Поставить генерацию в очередь: обработчик не ждет LLM, результат пришлет воркер"""
+    placeholder = await message.answer(header)
+    job = await job_queue.enqueue(
         user_id=message.from_user.id,
-        act_data=act_data
+        job_type=job_type,
+        payload={"text": message.text},
+        priority=JobQueue.PRIORITY_INTERACTIVE,
+        chat_id=message.chat.id,
+        message_id=placeholder.message_id
     )
+    await message.answer(f"⏳ Задача #{job.id} в очереди, результат придет в этот чат.")
+    await state.clear()
 
-    response = f"🧾 АКТ СОЗДАН\n\n"
-    response += f"📌 Тип: {result.get('document_type', 'акт')}\n"
-    response += f"🏷️ Название:{result.get('title', 'Акт')}\n\n"
-
-    await message.answer(response)
 
-    # Обязательные поля
-    if result.get('required_fields'):
-        fields_text = "📋 ОБЯЗАТЕЛЬНЫЕ ПОЛЯ:\n"
-        for field in result.get('required_fields', [])[:5]:
-            fields_text += f"• {field}\n"
-        await message.answer(fields_text)
-
-    # Чек-лист
-    if result.get('checklist'):
-        await message.answer(f"✅ ЧЕК-ЛИСТ:\n{result.get('checklist', '')}")
-
-    # Текст акта
-    content = result.get('content', '')
-    if len(content) > 4000:
-        await message.answer("📋 Текст акта слишком длинный для сообщения.")
+@router.message(States.waiting_document_file, F.document | F.photo)
+async def process_document_file(message: Message, state: FSMContext,
+                                document_ingestion_service: DocumentIngestionService = Depends(get_document_ingestion_service),
+                                job_queue: JobQueue = Depends(get_job_queue)):
+    if message.photo:
+        # Фото приходит в нескольких размерах, для OCR берем самое крупное
+        file, filename, file_type = message.photo[-1], "photo.jpg", "jpg"
     else:
-        await message.answer(f"📝 ТЕКСТ АКТА:\n\n{content}")
+        file, filename = message.document, message.document.file_name or "document"
+        file_type = filename.rsplit(".", 1)[-1].lower()
+        if file_type not in SUPPORTED_TYPES:
+            await message.answer("❌ Поддерживаются PDF, DOCX и изображения")
+            return
 
-    await state.clear()
+    if file.file_size and file.file_size > DocumentIngestionService.MAX_FILE_SIZE:
+        await message.answer("❌ Файл больше 20 МБ")
+        return
 
+    placeholder = await message.answer("📥 Извлекаю текст...")
 
-@router.message(States.waiting_document_text)
-async def process_document_text(message: Message, state: FSMContext,
-                                document_service: DocumentAnalyzer = Depends(get_document_service)):
-    document_text = message.text
+    fd, path = tempfile.mkstemp(suffix=f".{file_type}")
+    os.close(fd)
+    try:
+        # Файл скачивается на диск потоково, разбор идет в отдельном процессе
+        await message.bot.download(file, destination=path)
+        result = await document_ingestion_service.ingest_file(message.from_user.id, path, filename, file_type)
+    except ExtractionError as e:
+        await placeholder.edit_text(f"❌ Не удалось прочитать файл: {e}")
+        await state.clear()
+        return
+    finally:
+        os.remove(path)
 
-    await message.answer("📑 Проверяю документ...")
-    result = await document_service.check_document(
+    if result["duplicate"]:
+        # Тот же файл уже загружался: текст и результат проверки берутся из базы
+        status = f"📄 Этот файл уже загружался, используем сохраненный текст ({result['chars']:,} символов)"
+    else:
+        status = f"📄 Текст извлечен: {result['chars']:,} символов за {result['extract_seconds']:.1f} с"
+    await placeholder.edit_text(f"{status}\n\n📑 Проверяю документ...")
+    job = await job_queue.enqueue(
         user_id=message.from_user.id,
-        document_text=document_text
+        job_type="document.check",
+        payload={"document_id": result["document_id"]},
+        priority=JobQueue.PRIORITY_INTERACTIVE,
+        chat_id=message.chat.id,
+        message_id=placeholder.message_id
     )
+    await message.answer(f"⏳ Задача #{job.id} в очереди, результат придет в этот чат.")
+    await state.clear()
 
-    status_emojis = {
-        "ok": "✅",
-        "risky": "⚠️",
-        "critical": "❌"
-    }
 
-    status = result.get('status', 'ok')
-    emoji = status_emojis.get(status, '📄')
+@router.message(States.waiting_sales_file, F.document)
+async def process_sales_file(message: Message, state: FSMContext,
+                             sales_import_service: SalesImportService = Depends(get_sales_import_service)):
+    document = message.document
+    file_type = (document.file_name or "").rsplit(".", 1)[-1].lower()
+    if file_type not in ("csv", "xlsx", "xlsm"):
+        await message.answer("❌ Поддерживаются только файлы CSV и XLSX")
+        return
 
-    response = f"{emoji} РЕЗУЛЬТАТ ПРОВЕРКИ\n\n"
-    response += f"📊 Статус: {status.upper()}\n"
-    response += f"📝 Общая оценка: {result.get('summary', 'Не указана')}\n\n"
+    await message.answer("📥 Импортирую продажи...")
 
-    await message.answer(response)
+    fd, path = tempfile.mkstemp(suffix=f".{file_type}")
+    os.close(fd)
+    try:
+        # Файл скачивается на диск потоково, в память целиком не читается
+        await message.bot.download(document, destination=path)
+        result = await sales_import_service.import_file(message.from_user.id, path, file_type)
+    except ValueError as e:
+        await message.answer(f"❌ Не удалось импортировать файл: {e}")
+        await state.clear()
+        return
+    finally:
+        os.remove(path)
 
-    if result.get('errors'):
-        errors_text = "❌ ОШИБКИ:\n"
-        errors_text += "Ошибок не найдено!\n"
-        await message.answer(errors_text)
+    response = "✅ ИМПОРТ ЗАВЕРШЕН\n\n"
+    response += f"📦 Загружено продаж: {result['imported']}\n"
+    response += f"⏭️ Пропущено строк: {result['skipped']}\n"
+    if result['out_of_stock']:
+        response += f"🚫 Отклонено (нет остатка): {result['out_of_stock']}\n"
+    response += f"⚡ Скорость: {result['rows_per_second']:,.0f} строк/с\n"
 
-    if result.get('risks'):
-        risks_text = "⚠️ РИСКИ:\n"
-        risks_text += "Рисков не обнаружено!\n"
-        await message.answer(risks_text)
+    if result['unknown_products']:
+        response += "\n❓ Не найдены товары:\n"
+        for name in result['unknown_products'][:10]:
+            response += f"• {name}\n"
 
-    if result.get('recommendations'):
-        rec_text = "💡 РЕКОМЕНДАЦИИ:\n"
-        rec_text += "Прочитать текст, написанный маленьким шрифтом\n"
-        await message.answer(rec_text)
+    if result['out_of_stock_products']:
+        response += "\n📉 Не хватило остатка:\n"
+        for name in result['out_of_stock_products'][:10]:
+            response += f"• {name}\n"
 
+    await message.answer(response)
     await state.clear()
 
+
 @router.message(F.text)
 async def handle_any_text(message: Message, conversation_service):
     user_text = message.text.lower()
@@ -25,4 +25,7 @@ class States(StatesGroup):
     waiting_document_text = State()
 
     # Для анализа документа (файл)
-    waiting_document_file = State()
\ No newline at end of file
+    waiting_document_file = State()
+
+    # Для импорта продаж из CSV/XLSX
+    waiting_sales_file = State()
\ No newline at end of file
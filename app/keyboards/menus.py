@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 
 
@@ -79,7 +81,8 @@ def get_analytics_menu() -> InlineKeyboardMarkup:
                 InlineKeyboardButton(text="Остатки товара", callback_data="an:stock"),
             ],
             [
-                InlineKeyboardButton(text="Финансовый обзор", callback_data="an:finance")
+                InlineKeyboardButton(text="Финансовый обзор", callback_data="an:finance"),
+                InlineKeyboardButton(text="Импорт продаж", callback_data="an:import")
             ]
         ]
     )
@@ -113,10 +116,10 @@ def get_profile_menu() -> InlineKeyboardMarkup:
         ]
     )
 
-def conversation_buttons(conversations):
+def conversation_buttons(conversations, older_cursor: Optional[str] = None, newer_cursor: Optional[str] = None):
     """
     Генерируем InlineKeyboardMarkup для списка диалогов.
-    Каждая кнопка открывает полный диалог.
+    Каждая кнопка открывает полный диалог; последняя строка — переход по страницам истории.
     """
     buttons = []
     for conv in conversations:
@@ -126,6 +129,14 @@ def conversation_buttons(conversations):
                 callback_data=f"open_dialog:{conv.id}"
             )
         ])
+
+    navigation = []
+    if newer_cursor:
+        navigation.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=f"history:newer:{newer_cursor}"))
+    if older_cursor:
+        navigation.append(InlineKeyboardButton(text="Старее ➡️", callback_data=f"history:older:{older_cursor}"))
+    if navigation:
+        buttons.append(navigation)
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
@@ -8,7 +8,10 @@ from dotenv import load_dotenv
 
 from app.ServiceMiddleware import ServiceMiddleware
 from app.dispatcher import BotDispatcher
-from app.database.db import Database
+from app.database.db import get_database
+from app.service.container import get_service_container
+from app.service.job_service import JobWorkerPool
+from app.handlers.jobs import register_job_handlers
 
 
 class BusinessStates(StatesGroup):
@@ -27,14 +30,28 @@ async def main():
     bot = Bot(token=BOT_TOKEN)
     logger.info("🚀 Запуск Business Assistant Bot...")
 
-    bot_dispatcher = BotDispatcher()
-    dp = bot_dispatcher.get_dispatcher()
-    dp.update.middleware(ServiceMiddleware())
-
-    db = Database()
+    # Один движок и пул соединений на весь процесс
+    db = get_database()
     await db.init()
 
-    await dp.start_polling(bot)
+    bot_dispatcher = BotDispatcher()
+    dp = bot_dispatcher.get_dispatcher()
+    container = get_service_container()
+    service_middleware = ServiceMiddleware(container)
+    dp.message.middleware(service_middleware)
+    dp.callback_query.middleware(service_middleware)
+
+    # Генерация документов идет в воркерах, а не в обработчиках апдейтов
+    job_pool = JobWorkerPool(db, container.get("job_queue"))
+    register_job_handlers(job_pool, bot, container)
+    job_pool.start()
+
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await job_pool.stop()
+        await container.close()
+        await db.dispose()
 
 
 if __name__ == "__main__":
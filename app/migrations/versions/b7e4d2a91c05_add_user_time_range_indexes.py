@@ -0,0 +1,59 @@
+"""add user time range indexes
+
+Revision ID: b7e4d2a91c05
+Revises: 39f2612f8455
+Create Date: 2026-10-18 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4d2a91c05'
+down_revision: Union[str, None] = '39f2612f8455'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    ('ix_sales_user_id_sale_date', 'sales', ['user_id', 'sale_date']),
+    ('ix_stock_movements_user_id_date', 'stock_movements', ['user_id', 'date']),
+    ('ix_conversations_user_id_last_message_at', 'conversations', ['user_id', 'last_message_at']),
+    ('ix_conversations_user_id_created_at', 'conversations', ['user_id', 'created_at']),
+    ('ix_marketing_ideas_user_id_created_at', 'marketing_ideas', ['user_id', 'created_at']),
+    ('ix_business_data_user_id_data_type_created_at', 'business_data', ['user_id', 'data_type', 'created_at']),
+    ('ix_products_user_id_name', 'products', ['user_id', 'name']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        op.create_index(
+            'ix_products_user_id_low_stock', 'products', ['user_id'],
+            unique=False,
+            postgresql_where=sa.text('stock_quantity <= min_stock'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_user_id_low_stock', table_name='products',
+            postgresql_concurrently=True, if_exists=True
+        )
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
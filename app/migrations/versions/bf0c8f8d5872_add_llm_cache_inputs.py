@@ -0,0 +1,27 @@
+"""add llm cache inputs
+
+Revision ID: bf0c8f8d5872
+Revises: d8a3f5b21e96
+Create Date: 2026-10-18 23:02:14.318560
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf0c8f8d5872'
+down_revision: Union[str, None] = 'd8a3f5b21e96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Переменные части промпта (JSON) — по ним ищутся похожие запросы; у старых записей NULL
+    op.add_column('llm_cache', sa.Column('inputs', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('llm_cache', 'inputs')
@@ -0,0 +1,31 @@
+"""add document content hash
+
+Revision ID: c6d1e8f94a72
+Revises: a9c27e4b8d53
+Create Date: 2026-10-18 17:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d1e8f94a72'
+down_revision: Union[str, None] = 'a9c27e4b8d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Байты ранее загруженных файлов не сохранялись, поэтому у старых документов хэш остается NULL
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(
+        'uq_documents_user_id_content_hash', 'documents', ['user_id', 'content_hash'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_documents_user_id_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
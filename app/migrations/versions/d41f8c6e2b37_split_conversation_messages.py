@@ -0,0 +1,126 @@
+"""split conversation messages
+
+Revision ID: d41f8c6e2b37
+Revises: b7e4d2a91c05
+Create Date: 2026-10-18 11:03:17.552190
+
+"""
+from itertools import zip_longest
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f8c6e2b37'
+down_revision: Union[str, None] = 'b7e4d2a91c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 500
+
+conversations = sa.table(
+    'conversations',
+    sa.column('id', sa.Integer),
+    sa.column('user_message', sa.Text),
+    sa.column('bot_response', sa.Text),
+    sa.column('created_at', sa.DateTime),
+    sa.column('last_message_at', sa.DateTime),
+)
+
+conversation_messages = sa.table(
+    'conversation_messages',
+    sa.column('conversation_id', sa.Integer),
+    sa.column('user_message', sa.Text),
+    sa.column('bot_response', sa.Text),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _split(blob, prefix):
+    """Разбивает склеенный текст диалога ("USER: a\n\nUSER: b") на отдельные реплики"""
+    if not blob:
+        return []
+    parts = blob.split(f"\n\n{prefix}")
+    if parts[0].startswith(prefix):
+        parts[0] = parts[0][len(prefix):]
+    return parts
+
+
+def upgrade() -> None:
+    op.create_table(
+        'conversation_messages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('user_message', sa.Text(), nullable=True),
+        sa.Column('bot_response', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_conversation_messages_conversation_id_id', 'conversation_messages',
+        ['conversation_id', 'id'], unique=False
+    )
+
+    # Переносим накопленные реплики в отдельные строки, в диалоге оставляем только первую
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(conversations)
+            .where(conversations.c.id > last_id)
+            .order_by(conversations.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        messages = []
+        for row in rows:
+            turns = list(zip_longest(_split(row.user_message, "USER: "), _split(row.bot_response, "BOT: ")))
+            for index, (user_text, bot_text) in enumerate(turns):
+                is_last = index == len(turns) - 1
+                messages.append({
+                    'conversation_id': row.id,
+                    'user_message': user_text,
+                    'bot_response': bot_text,
+                    'created_at': (row.last_message_at or row.created_at) if is_last else row.created_at,
+                })
+
+            if len(turns) > 1:
+                first_user, first_bot = turns[0]
+                bind.execute(
+                    sa.update(conversations)
+                    .where(conversations.c.id == row.id)
+                    .values(
+                        user_message=f"USER: {first_user or ''}",
+                        bot_response=f"BOT: {first_bot or ''}"
+                    )
+                )
+
+        if messages:
+            bind.execute(sa.insert(conversation_messages), messages)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE conversations AS c
+        SET user_message = agg.user_message,
+            bot_response = agg.bot_response
+        FROM (
+            SELECT conversation_id,
+                   string_agg('USER: ' || coalesce(user_message, ''), E'\\n\\n' ORDER BY id) AS user_message,
+                   string_agg('BOT: ' || coalesce(bot_response, ''), E'\\n\\n' ORDER BY id) AS bot_response
+            FROM conversation_messages
+            GROUP BY conversation_id
+        ) AS agg
+        WHERE c.id = agg.conversation_id
+        """
+    )
+    op.drop_index('ix_conversation_messages_conversation_id_id', table_name='conversation_messages')
+    op.drop_table('conversation_messages')
@@ -0,0 +1,48 @@
+"""conversations keyset index
+
+Revision ID: d8a3f5b21e96
+Revises: c6d1e8f94a72
+Create Date: 2026-10-18 19:11:05.482930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f5b21e96'
+down_revision: Union[str, None] = 'c6d1e8f94a72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Постраничная история идет по ключу (created_at, id): id в индексе делает порядок однозначным,
+    # а старый индекс (user_id, created_at) — его префикс и больше не нужен
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_conversations_user_id_created_at_id', 'conversations', ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'ix_conversations_user_id_created_at', table_name='conversations',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_conversations_user_id_created_at', 'conversations', ['user_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'ix_conversations_user_id_created_at_id', table_name='conversations',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,55 @@
+"""add daily sales rollup
+
+Revision ID: e5a93c7f1d28
+Revises: d41f8c6e2b37
+Create Date: 2026-10-18 13:26:09.418337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a93c7f1d28'
+down_revision: Union[str, None] = 'd41f8c6e2b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_sales_rollup',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('cost', sa.Float(), nullable=False),
+        sa.Column('sales_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'product_id')
+    )
+
+    # Первичное заполнение; повторно пересчитать можно через python -m app.database.backfill
+    op.execute(
+        """
+        INSERT INTO daily_sales_rollup (user_id, day, product_id, quantity, revenue, cost, sales_count)
+        SELECT s.user_id,
+               CAST(s.sale_date AS DATE),
+               s.product_id,
+               sum(s.quantity),
+               sum(s.total_amount),
+               sum(s.quantity * coalesce(p.purchase_price, 0)),
+               count(s.id)
+        FROM sales AS s
+        JOIN products AS p ON p.id = s.product_id
+        GROUP BY s.user_id, CAST(s.sale_date AS DATE), s.product_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_sales_rollup')
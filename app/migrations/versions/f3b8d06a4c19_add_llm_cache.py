@@ -0,0 +1,39 @@
+"""add llm cache
+
+Revision ID: f3b8d06a4c19
+Revises: e5a93c7f1d28
+Create Date: 2026-10-18 14:41:52.027614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d06a4c19'
+down_revision: Union[str, None] = 'e5a93c7f1d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('call_site', sa.String(length=100), nullable=True),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('prompt', sa.Text(), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_llm_cache_last_hit_at', 'llm_cache', ['last_hit_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_cache_last_hit_at', table_name='llm_cache')
+    op.drop_table('llm_cache')
@@ -7,6 +7,12 @@ from .llm_service import LLMService
 from .document_analyzer import DocumentAnalyzer
 from .warehouse_service import WarehouseService
 from .marketing_idea_service import MarketingService
+from .sales_import_service import SalesImportService
+from .report_cache import ReportCache
+from .activity_buffer import ActivityBuffer
+from .job_service import JobQueue, JobWorkerPool
+from .document_ingestion import DocumentIngestionService
+from .container import ServiceContainer, get_service_container
 
 __all__ = [
     'LLMService',
@@ -17,6 +23,14 @@ __all__ = [
     'AnalyticService',
     'WarehouseService',
     'MarketingService',
+    'SalesImportService',
+    'ReportCache',
+    'ActivityBuffer',
+    'JobQueue',
+    'JobWorkerPool',
+    'DocumentIngestionService',
+    'ServiceContainer',
+    'get_service_container',
     'llm_service',
     'user_service',
     'conversation_service',
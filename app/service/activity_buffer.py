@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """Отложенная запись User.last_active.
+
+    touch() только запоминает время в памяти; раз в flush_interval секунд все
+    накопленные отметки пишутся одним пакетным UPDATE. Сколько бы раз пользователь
+    ни нажал кнопку за интервал, в базу уходит одна строка. При остановке (close)
+    буфер сбрасывается; при падении процесса теряются отметки последнего интервала —
+    для "последней активности" это допустимо.
+    """
+
+    def __init__(self, db, flush_interval: Optional[float] = None, max_pending: int = 50000):
+        self.db = db
+        self.flush_interval = flush_interval or float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "30"))
+        self.max_pending = max_pending
+        self._pending: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._overflow_flush: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.touches = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def touch(self, user_id: int, seen_at: Optional[datetime] = None):
+        """Отметить активность пользователя (без обращения к базе)"""
+        seen_at = seen_at or datetime.now()
+        previous = self._pending.get(user_id)
+        if previous is None or previous < seen_at:
+            self._pending[user_id] = seen_at
+        self.touches += 1
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+        if len(self._pending) >= self.max_pending and (self._overflow_flush is None or self._overflow_flush.done()):
+            # Всплеск активности: не ждем таймера, чтобы буфер не рос без ограничений
+            self._overflow_flush = asyncio.create_task(self.flush())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Отмена цикла при остановке не должна обрывать запись на середине
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> int:
+        """Записать накопленные отметки; при ошибке они возвращаются в буфер до следующей попытки"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with self.db.get_uow() as uow:
+                    written = await uow.users.bulk_update_last_active(batch)
+            except Exception as e:
+                logger.error(f"Не удалось записать активность {len(batch)} пользователей: {e}")
+                for user_id, seen_at in batch.items():
+                    current = self._pending.get(user_id)
+                    if current is None or current < seen_at:
+                        self._pending[user_id] = seen_at
+                return 0
+            self.flushes += 1
+            self.rows_written += written
+            return written
+
+    async def close(self):
+        """Остановить периодическую запись и сбросить остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._overflow_flush is not None:
+            await self._overflow_flush
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_interval": self.flush_interval,
+        }
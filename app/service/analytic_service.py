@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.database.unit_of_work import UnitOfWork
 from datetime import datetime, timedelta
 
@@ -7,47 +7,37 @@ class AnalyticService:
     def __init__(self, db):
         self.db = db
 
-    async def get_daily_activity(self, user_id: int) -> Dict[str, Any]:
+    async def get_daily_activity(self, user_id: int, days: int = 7) -> Dict[str, Any]:
         """Аналитика ежедневной активности"""
-        async with self.db.get_uow() as uow:
-            # Консультации за последние 7 дней
-            conversations = await uow.conversations.find_by_user_id(user_id, limit=100)
-
-            daily_activity = {}
-            for conv in conversations:
-                date_str = conv.created_at.strftime('%Y-%m-%d')
-                daily_activity[date_str] = daily_activity.get(date_str, 0) + 1
-
-            return {
-                "daily_activity": daily_activity,
-                "total_last_week": sum(daily_activity.values()),
-                "most_active_day": max(daily_activity.items(), key=lambda x: x[1]) if daily_activity else None
-            }
-
-    async def get_category_insights(self, user_id: int) -> Dict[str, Any]:
+        end = datetime.now()
+        start = end - timedelta(days=days - 1)
+        async with self.db.get_uow(replica=True) as uow:
+            # Счетчики по дням считает база, включая дни без консультаций
+            counts = await uow.conversations.count_by_day(user_id, start, end)
+
+        daily_activity = {day.strftime('%Y-%m-%d'): count for day, count in counts}
+        busiest = max(daily_activity.items(), key=lambda x: x[1]) if daily_activity else None
+
+        return {
+            "daily_activity": daily_activity,
+            "total_last_week": sum(daily_activity.values()),
+            "most_active_day": busiest if busiest and busiest[1] else None
+        }
+
+    async def get_category_insights(self, user_id: int, days: Optional[int] = None) -> Dict[str, Any]:
         """Инсайты по категориям запросов"""
-        async with self.db.get_uow() as uow:
-            conversations = await uow.conversations.find_by_user_id(user_id, limit=200)
-
-            category_insights = {}
-            for conv in conversations:
-                category = conv.category or "general"
-                if category not in category_insights:
-                    category_insights[category] = {
-                        "count": 0,
-                        "last_used": conv.created_at,
-                        "examples": []
-                    }
-
-                category_insights[category]["count"] += 1
-                category_insights[category]["last_used"] = max(
-                    category_insights[category]["last_used"], conv.created_at
-                )
-
-                if len(category_insights[category]["examples"]) < 3:
-                    category_insights[category]["examples"].append(conv.user_message[:50] + "...")
-
-            return category_insights
+        start = datetime.now() - timedelta(days=days) if days else None
+        async with self.db.get_uow(replica=True) as uow:
+            categories = await uow.conversations.count_by_category(user_id, start=start)
+
+        return {
+            item["category"]: {
+                "count": item["count"],
+                "last_used": item["last_used"],
+                "examples": [example + "..." for example in item["examples"]]
+            }
+            for item in categories
+        }
 
     async def generate_weekly_report(self, user_id: int) -> str:
         """Сгенерировать недельный отчет"""
@@ -31,13 +31,13 @@ class BusinessDataService:
 
     async def get_latest_sales_report(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Получить последний отчет по продажам"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             latest_data = await uow.business_data.find_latest_by_type(user_id, "sales")
             return latest_data.data_json if latest_data else None
 
     async def get_sales_trend(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
         """Получить тренд продаж за период"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             sales_data = await uow.business_data.find_by_user_and_type(user_id, "sales", limit=days)
             return [data.data_json for data in sales_data]
 
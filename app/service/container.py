@@ -0,0 +1,71 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.database.db import Database, get_database
+from .user_service import UserService
+from .conversation_service import ConversationService
+from .analytic_service import AnalyticService
+from .warehouse_service import WarehouseService
+from .marketing_idea_service import MarketingService
+from .document_analyzer import DocumentAnalyzer
+from .llm_service import LLMService
+from .llm_cache import LLMCache
+from .sales_import_service import SalesImportService
+from .report_cache import ReportCache
+from .activity_buffer import ActivityBuffer
+from .job_service import JobQueue
+from .document_ingestion import DocumentIngestionService
+
+
+class ServiceContainer:
+    """Сервисы, создаваемые один раз на процесс и выдаваемые по имени параметра обработчика"""
+
+    # Имя параметра обработчика -> фабрика сервиса
+    FACTORIES: Dict[str, Callable[["ServiceContainer"], Any]] = {
+        "user_service": lambda c: UserService(c.db, c.get("activity_buffer")),
+        "activity_buffer": lambda c: ActivityBuffer(c.db),
+        "conversation_service": lambda c: ConversationService(c.db),
+        "analytic_service": lambda c: AnalyticService(c.db),
+        "warehouse_service": lambda c: WarehouseService(c.db, c.report_cache),
+        "marketing_idea_service": lambda c: MarketingService(c.db, c.get("llm_service")),
+        "llm_service": lambda c: LLMService(cache=LLMCache.from_env(c.db)),
+        "document_service": lambda c: DocumentAnalyzer(c.db, c.get("llm_service")),
+        "sales_import_service": lambda c: SalesImportService(c.db, report_cache=c.report_cache),
+        "job_queue": lambda c: JobQueue(c.db),
+        "document_ingestion_service": lambda c: DocumentIngestionService(c.db),
+    }
+
+    def __init__(self, db: Database):
+        self.db = db
+        # Общий кэш отчетов: складской сервис читает, импорт продаж сбрасывает
+        self.report_cache = ReportCache()
+        self._instances: Dict[str, Any] = {}
+
+    @property
+    def names(self) -> Iterable[str]:
+        return self.FACTORIES.keys()
+
+    def get(self, name: str) -> Any:
+        """Сервис по имени; создается при первом обращении"""
+        service = self._instances.get(name)
+        if service is None:
+            service = self.FACTORIES[name](self)
+            self._instances[name] = service
+        return service
+
+    async def close(self):
+        """Закрыть ресурсы созданных сервисов (HTTP-сессии клиентов LLM и т.п.)"""
+        for service in self._instances.values():
+            close = getattr(service, "close", None)
+            if close is not None:
+                await close()
+
+
+_container: Optional[ServiceContainer] = None
+
+
+def get_service_container() -> ServiceContainer:
+    """Общий контейнер сервисов процесса поверх общего Database"""
+    global _container
+    if _container is None:
+        _container = ServiceContainer(get_database())
+    return _container
@@ -1,61 +1,92 @@
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import select
-
 from app.database.unit_of_work import UnitOfWork
-from app.database.models import Conversation
+from app.database.models import Conversation, ConversationMessage
+from app.utils.pagination import decode_cursor, encode_cursor
 
 
 class ConversationService:
     def __init__(self, db):
         self.db = db
 
-    async def add_message(self, user_id: int, user_text: str, bot_text: str, category: str = "general") -> Conversation:
-        """Добавляем сообщение в активный диалог (12 часов) через UoW."""
+    async def add_message(self, user_id: int, user_text: str, bot_text: str,
+                          category: str = "general") -> ConversationMessage:
+        """Добавляем реплику в активный диалог (12 часов) через UoW.
+
+        Каждая реплика — отдельная строка conversation_messages, поэтому стоимость записи
+        не растет с длиной диалога. Текстовые колонки строки диалога не заполняются (без двойной записи).
+        """
         now = datetime.utcnow()
-        user_line = f"USER: {user_text}"
-        bot_line = f"BOT: {bot_text}"
+        message = ConversationMessage(user_message=user_text, bot_response=bot_text, created_at=now)
 
         async with self.db.get_uow() as uow:
             # --- ищем последний активный диалог ---
             twelve_hours_ago = now - timedelta(hours=12)
-            result = await uow.conversations.session.execute(
-                select(Conversation)
-                .where(
-                    Conversation.user_id == user_id,
-                    Conversation.last_message_at >= twelve_hours_ago
-                )
-                .order_by(Conversation.id.desc())
-                .limit(1)
-            )
-            conv = result.scalar_one_or_none()
+            conversation_id = await uow.conversations.find_last_active_id(user_id, twelve_hours_ago)
 
-            if conv:
+            if conversation_id is not None:
                 # продолжаем существующий диалог
-                conv.user_message += f"\n\n{user_line}"
-                conv.bot_response += f"\n\n{bot_line}"
-                conv.last_message_at = now
+                message.conversation_id = conversation_id
+                await uow.conversations.touch(conversation_id, now)
             else:
                 # создаём новый диалог
                 conv = Conversation(
                     user_id=user_id,
                     category=category,
-                    user_message=user_line,
-                    bot_response=bot_line,
                     message_length=len(user_text),
                     response_time_ms=0,
                     created_at=now,
                     last_message_at=now,
                 )
-                await uow.conversations.save(conv)
+                message.conversation = conv
+                await uow.conversations.add(conv)
 
-        return conv
-    async def get_user_conversations(self, user_id: int, limit: int = 10):
-        async with self.db.get_uow() as uow:
-            return await uow.conversations.find_by_user_id(user_id, limit)
+            await uow.conversations.add_message(message)
+
+        return message
+
+    async def get_user_conversations(self, user_id: int, limit: int = 10, preview_length: int = 80):
+        """Последние диалоги для списков истории: проекции с превью, без полных текстов"""
+        async with self.db.get_uow(read_only=True) as uow:
+            return await uow.conversations.find_summaries_by_user_id(user_id, limit, preview_length)
+
+    async def get_conversation_page(self, user_id: int, cursor: Optional[str] = None, direction: str = "older",
+                                    limit: int = 10, preview_length: int = 80) -> Dict[str, Any]:
+        """Страница истории по курсору: items и курсоры соседних страниц (None — страницы нет).
+
+        direction="older" — страница после cursor (старше), "newer" — перед ним.
+        Некорректный курсор — ValueError.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        newer = direction == "newer" and position is not None
+        async with self.db.get_uow(read_only=True) as uow:
+            items, has_more = await uow.conversations.find_summaries_page(
+                user_id,
+                limit,
+                older_than=None if newer else position,
+                newer_than=position if newer else None,
+                preview_length=preview_length
+            )
+
+        if newer and not items:
+            # Все более новые диалоги удалены — показываем начало истории
+            return await self.get_conversation_page(user_id, limit=limit, preview_length=preview_length)
+
+        has_older = has_more if not newer else True
+        has_newer = has_more if newer else position is not None
+        return {
+            "items": items,
+            "older_cursor": encode_cursor(items[-1].created_at, items[-1].id) if items and has_older else None,
+            "newer_cursor": encode_cursor(items[0].created_at, items[0].id) if items and has_newer else None,
+        }
 
     async def get_conversation(self, conversation_id: int):
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.conversations.find_by_id(conversation_id)
 
+    async def get_conversation_messages(self, conversation_id: int, after_id: Optional[int] = None,
+                                        limit: int = 20) -> List[ConversationMessage]:
+        """Реплики диалога, начиная после after_id"""
+        async with self.db.get_uow(read_only=True) as uow:
+            return await uow.conversations.find_messages(conversation_id, after_id, limit)
@@ -1,22 +1,37 @@
 # app/services/document_service.py
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import os
 import uuid
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+from app.service.llm_service import LLMService
+from app.utils.text_chunking import chunk_text
+
+
 class DocumentAnalyzer:
-    def __init__(self, db):
+    # Итоговый статус проверки — самый тяжелый среди кусков
+    STATUS_SEVERITY = {"ok": 0, "risky": 1, "critical": 2}
+    CHECK_PROMPT_VERSION = 1
+    # Без настоящей модели проверять нечем: ответ заглушки выглядел бы как "ошибок нет"
+    UNAVAILABLE_STATUS = "unavailable"
+
+    def __init__(self, db, llm_service: Optional[LLMService] = None):
         self.db = db
+        self.llm_service = llm_service or LLMService()
+        self.chunk_tokens = int(os.getenv("DOC_CHUNK_TOKENS", "3000"))
+        self.chunk_concurrency = int(os.getenv("DOC_CHUNK_CONCURRENCY", "4"))
 
     async def create_contract(
             self,
             user_id: int,
-            contract_details: str
+            contract_details: str,
+            on_progress: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """Генерация договора через ИИ"""
-
-        from app.service.llm_service import LLMService
-        llm_service = LLMService()
+        """Генерация договора через ИИ; on_progress получает накопленный ответ модели по ходу генерации"""
 
         prompt = f"""
         Сгенерируй юридический договор на основе следующих деталей:
@@ -34,7 +49,9 @@ class DocumentAnalyzer:
         }}
         """
 
-        result = await llm_service.generate_json(prompt)
+        result = await self.llm_service.generate_json(
+            prompt, call_site="create_contract", on_progress=on_progress
+        )
 
         # Сохраняем как документ через UoW
         async with self.db.get_uow() as uow:
@@ -52,12 +69,10 @@ class DocumentAnalyzer:
     async def create_act(
             self,
             user_id: int,
-            act_data: str
+            act_data: str,
+            on_progress: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """Генерация акта через ИИ"""
-
-        from app.service.llm_service import LLMService
-        llm_service = LLMService()
+        """Генерация акта через ИИ; on_progress — как в create_contract"""
 
         prompt = f"""
         Сгенерируй юридический акт (акт выполненных работ/акт приема-передачи) на основе данных:
@@ -74,7 +89,9 @@ class DocumentAnalyzer:
         }}
         """
 
-        result = await llm_service.generate_json(prompt)
+        result = await self.llm_service.generate_json(
+            prompt, call_site="create_act", on_progress=on_progress
+        )
 
         async with self.db.get_uow() as uow:
             doc = await uow.documents.create(
@@ -90,17 +107,54 @@ class DocumentAnalyzer:
     async def check_document(
             self,
             user_id: int,
-            document_text: str
+            document_text: str,
+            previous_chunks: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
-        """Проверка документа на ошибки и риски"""
-
-        from app.service.llm_service import LLMService
-        llm_service = LLMService()
+        """Проверка документа на ошибки и риски.
 
+        Текст режется на куски по границам разделов (chunk_text), куски проверяются
+        параллельно (не больше chunk_concurrency одновременно), а их ошибки, риски и
+        рекомендации сливаются в общий результат. Разбор по кускам — в "chunks";
+        куски из previous_chunks с тем же хэшем повторно не проверяются.
+        Без настоящей модели (has_model) возвращается статус UNAVAILABLE_STATUS.
+        """
+        if not self.llm_service.has_model:
+            return {
+                "status": self.UNAVAILABLE_STATUS,
+                "errors": [],
+                "risks": [],
+                "recommendations": [],
+                "summary": "Проверка документов недоступна: модель ИИ не подключена",
+                "chunks": [],
+            }
+
+        chunks = chunk_text(document_text, self.chunk_tokens)
+        known = {chunk["hash"]: chunk for chunk in previous_chunks or [] if "hash" in chunk}
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def analyze(index: int, text: str) -> Dict[str, Any]:
+            chunk_hash = self.chunk_hash(text, self.llm_service.model)
+            if chunk_hash in known:
+                return {**known[chunk_hash], "index": index, "reused": True}
+            async with semaphore:
+                result = await self._check_chunk(text)
+            return {"index": index, "hash": chunk_hash, "reused": False, **result}
+
+        analyzed = await asyncio.gather(*[analyze(index, text) for index, text in enumerate(chunks)])
+        return self._merge_chunks(list(analyzed))
+
+    @staticmethod
+    def chunk_hash(text: str, model: str) -> str:
+        # Версия промпта и модель входят в хэш: при смене любой из них старые разборы не переиспользуются
+        payload = f"{DocumentAnalyzer.CHECK_PROMPT_VERSION}:{model}:{' '.join(text.split())}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _check_chunk(self, text: str) -> Dict[str, Any]:
         prompt = f"""
-        Проверь документ на юридические ошибки, риски и дай рекомендации:
+        Проверь фрагмент документа на юридические ошибки, риски и дай рекомендации.
+        Оценивай только то, что есть во фрагменте:
 
-        {document_text}
+        {text}
 
         Верни результат в JSON:
         {{
@@ -108,14 +162,83 @@ class DocumentAnalyzer:
             "errors": ["ошибка 1", "ошибка 2"],
             "risks": ["риск 1", "риск 2"],
             "recommendations": ["рекомендация 1", "рекомендация 2"],
-            "summary": "общая оценка документа"
+            "summary": "общая оценка фрагмента"
         }}
         """
 
-        return await llm_service.generate_json(prompt)
+        result = await self.llm_service.generate(prompt, call_site="check_document", use_cache=True)
+        status = result.get("status")
+        return {
+            "status": status if status in self.STATUS_SEVERITY else "ok",
+            "errors": self._as_list(result.get("errors")),
+            "risks": self._as_list(result.get("risks")),
+            "recommendations": self._as_list(result.get("recommendations")),
+            "summary": str(result.get("summary") or result.get("text") or ""),
+        }
+
+    @staticmethod
+    def _as_list(value: Any) -> List[str]:
+        if not value:
+            return []
+        if isinstance(value, list):
+            return [str(item) for item in value if item]
+        return [str(value)]
+
+    def _merge_chunks(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Свести результаты кусков к схеме одиночной проверки; одинаковые пункты не повторяются"""
+        merged = {"errors": [], "risks": [], "recommendations": []}
+        seen = {field: set() for field in merged}
+        status = "ok"
+        for chunk in chunks:
+            if self.STATUS_SEVERITY[chunk["status"]] > self.STATUS_SEVERITY[status]:
+                status = chunk["status"]
+            for field, items in merged.items():
+                for item in chunk[field]:
+                    key = " ".join(item.split()).casefold()
+                    if key not in seen[field]:
+                        seen[field].add(key)
+                        items.append(item)
+
+        summaries = [chunk["summary"] for chunk in chunks if chunk["summary"]]
+        if len(chunks) > 1:
+            summary = f"Проверено частей: {len(chunks)}. " + " ".join(summaries)
+        else:
+            summary = summaries[0] if summaries else ""
+        return {"status": status, **merged, "summary": summary, "chunks": chunks}
+
+    async def check_stored_document(self, user_id: int, document_id: int) -> Dict[str, Any]:
+        """Проверка загруженного документа с сохранением в Insight; неизменные куски берутся из прошлого разбора"""
+        async with self.db.get_uow(read_only=True) as uow:
+            document = await uow.documents.get_by_id(document_id)
+            if document is None or document.user_id != user_id:
+                raise ValueError(f"Документ {document_id} не найден")
+            insight = await uow.insights.get_by_document_id(document_id)
+            if insight is None and document.content_hash:
+                # Тот же файл пользователь уже загружал и разбирал — текст тот же
+                insight = await uow.insights.get_by_content_hash(user_id, document.content_hash)
+        previous = json.loads(insight.raw_data) if insight is not None and insight.raw_data else None
+
+        result = await self.check_document(
+            user_id, document.content_text or "", previous_chunks=(previous or {}).get("chunks")
+        )
+        if result["status"] == self.UNAVAILABLE_STATUS:
+            # Не сохраняем: после подключения модели документ должен проверяться заново
+            return result
+        if previous is not None and all(chunk["reused"] for chunk in result["chunks"]):
+            # Текст и промпт не менялись: прошлый разбор актуален целиком
+            return previous
 
+        async with self.db.get_uow() as uow:
+            await uow.insights.create(
+                document_id=document_id,
+                summary=result["summary"],
+                risks=json.dumps(result["risks"], ensure_ascii=False),
+                recommendations=json.dumps(result["recommendations"], ensure_ascii=False),
+                raw_data=json.dumps(result, ensure_ascii=False)
+            )
+        return result
 
     async def get_user_documents(self, user_id: int) -> list:
         """Получить документы пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.documents.get_user_documents(user_id)
\ No newline at end of file
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows: ограничение памяти недоступно
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+PDF_TYPES = {"pdf"}
+DOCX_TYPES = {"docx"}
+IMAGE_TYPES = {"jpg", "jpeg", "png", "tif", "tiff", "bmp", "webp"}
+SUPPORTED_TYPES = PDF_TYPES | DOCX_TYPES | IMAGE_TYPES
+
+
+class ExtractionError(Exception):
+    """Не удалось извлечь текст из файла"""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Извлечение не уложилось в лимит времени"""
+
+
+# ---------- Код дочернего процесса ----------
+# Функции ниже выполняются в процессах пула: только модульный уровень (pickle) и ленивые импорты
+
+def _init_worker(memory_limit: Optional[int]):
+    # Ограничение адресного пространства процесса: файл-бомба получит MemoryError, а не OOM всего бота
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    # Ctrl+C обрабатывает родитель, который и закрывает пул
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("Превышено время извлечения текста")
+
+
+def _extract_pdf(path: str, max_chars: int) -> str:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        raise ExtractionError("PDF защищен паролем")
+    parts, total = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)
+
+
+def _extract_docx(path: str, max_chars: int) -> str:
+    from docx import Document as DocxDocument
+
+    document = DocxDocument(path)
+    parts, total = [], 0
+    for paragraph in document.paragraphs:
+        parts.append(paragraph.text)
+        total += len(paragraph.text)
+        if total >= max_chars:
+            return "\n".join(parts)
+    for table in document.tables:
+        for row in table.rows:
+            line = " | ".join(cell.text for cell in row.cells)
+            parts.append(line)
+            total += len(line)
+            if total >= max_chars:
+                return "\n".join(parts)
+    return "\n".join(parts)
+
+
+def _extract_image(path: str, timeout: float) -> str:
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(path) as image:
+        # tesseract — отдельный процесс, SIGALRM его не прервет: у pytesseract свой таймаут
+        return pytesseract.image_to_string(image, lang=os.getenv("OCR_LANG", "rus+eng"), timeout=timeout)
+
+
+def extract_text_sync(path: str, file_type: str, timeout: float, max_chars: int) -> str:
+    """Извлечь текст из файла с лимитом времени (выполняется в процессе пула)"""
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if file_type in PDF_TYPES:
+            text = _extract_pdf(path, max_chars)
+        elif file_type in DOCX_TYPES:
+            text = _extract_docx(path, max_chars)
+        elif file_type in IMAGE_TYPES:
+            text = _extract_image(path, timeout)
+        else:
+            raise ExtractionError(f"Неподдерживаемый тип файла: {file_type}")
+    except ExtractionError:
+        raise
+    except MemoryError:
+        raise ExtractionError("Файл требует слишком много памяти")
+    except RuntimeError as e:
+        # pytesseract сообщает о своем таймауте через RuntimeError
+        if "timeout" in str(e).lower():
+            raise ExtractionTimeout("Превышено время распознавания")
+        raise ExtractionError(f"Файл поврежден или не читается: {e}")
+    except Exception as e:
+        raise ExtractionError(f"Файл поврежден или не читается: {e}")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return text.strip()[:max_chars]
+
+
+# ---------- Родительский процесс ----------
+
+class DocumentExtractor:
+    """Извлечение текста из PDF/DOCX/изображений в пуле процессов.
+
+    Парсинг и OCR — CPU-bound, в цикле событий они остановили бы обработку апдейтов.
+    Для каждого файла действуют лимит времени (SIGALRM в процессе пула) и лимит
+    памяти (RLIMIT_AS процесса). Процессы пула пересоздаются каждые
+    max_tasks_per_child файлов, чтобы фрагментация памяти парсеров не копилась.
+    """
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            timeout: Optional[float] = None,
+            memory_limit_mb: Optional[int] = None,
+            max_chars: int = 1_000_000,
+            max_tasks_per_child: int = 50
+    ):
+        self.max_workers = max_workers or int(os.getenv("DOC_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.timeout = timeout or float(os.getenv("DOC_EXTRACT_TIMEOUT", "60"))
+        memory_limit_mb = memory_limit_mb or int(os.getenv("DOC_EXTRACT_MEMORY_MB", "512"))
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.max_chars = max_chars
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.extracted = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.memory_limit,),
+                max_tasks_per_child=self.max_tasks_per_child
+            )
+        return self._executor
+
+    async def extract(self, path: str, file_type: str) -> str:
+        """Текст файла; ExtractionError, если файл не читается или превышены лимиты"""
+        file_type = file_type.lower()
+        if file_type not in SUPPORTED_TYPES:
+            raise ExtractionError(f"Неподдерживаемый тип файла: {file_type}")
+
+        loop = asyncio.get_running_loop()
+        try:
+            text = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._get_executor(), extract_text_sync, path, file_type, self.timeout, self.max_chars
+                ),
+                # Запас сверх SIGALRM: на случай зависания в C-коде, где сигнал не обрабатывается
+                self.timeout + 10
+            )
+        except asyncio.TimeoutError:
+            self.failed += 1
+            raise ExtractionTimeout("Превышено время извлечения текста")
+        except BrokenProcessPool:
+            # Процесс пула убит (например, OOM killer): пересоздаем пул для следующих файлов
+            self.failed += 1
+            self._reset()
+            raise ExtractionError("Обработка файла аварийно завершилась")
+        except ExtractionError:
+            self.failed += 1
+            raise
+        self.extracted += 1
+        return text
+
+    def _reset(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def close(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
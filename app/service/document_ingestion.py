@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from .document_extraction import DocumentExtractor, ExtractionError
+
+
+class DocumentIngestionService:
+    """Загрузка файлов пользователя: извлечение текста и сохранение в documents"""
+
+    # Bot API не отдает боту файлы больше 20 МБ
+    MAX_FILE_SIZE = 20 * 1024 * 1024
+
+    def __init__(self, db, extractor: Optional[DocumentExtractor] = None):
+        self.db = db
+        self.extractor = extractor or DocumentExtractor()
+        self.duplicates = 0
+        self.reused_extractions = 0
+
+    @staticmethod
+    def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def ingest_file(self, user_id: int, path: str, filename: str, file_type: str) -> Dict[str, Any]:
+        """Извлечь текст из файла на диске и сохранить документ; ExtractionError — файл не читается.
+
+        Документы ключуются sha256 байтов: повторная загрузка того же файла возвращает
+        существующий документ пользователя (duplicate=True) без повторного разбора и OCR.
+        Документы других пользователей не просматриваются: их файлы и тексты не раскрываются.
+        """
+        size = os.path.getsize(path)
+        if size > self.MAX_FILE_SIZE:
+            raise ExtractionError("Файл больше 20 МБ")
+
+        started = time.perf_counter()
+        # hashlib отпускает GIL на больших блоках — считаем в потоке, не блокируя цикл событий
+        content_hash = await asyncio.to_thread(self.file_sha256, path)
+
+        async with self.db.get_uow(read_only=True) as uow:
+            existing = await uow.documents.get_by_hash(user_id, content_hash)
+            text = None if existing else await uow.documents.get_text_by_hash(user_id, content_hash)
+        if existing:
+            self.duplicates += 1
+            return self._result(existing.id, existing.content_text, started, duplicate=True)
+
+        if text is None:
+            text = await self.extractor.extract(path, file_type)
+        else:
+            self.reused_extractions += 1
+        if not text:
+            raise ExtractionError("В файле не найден текст")
+
+        try:
+            async with self.db.get_uow() as uow:
+                document = await uow.documents.create(
+                    user_id=user_id,
+                    filename=filename,
+                    file_type=file_type.lower(),
+                    content=text,
+                    size=size,
+                    content_hash=content_hash
+                )
+        except IntegrityError:
+            # Тот же файл одновременно загружен дважды: побеждает первая запись
+            async with self.db.get_uow(read_only=True) as uow:
+                document = await uow.documents.get_by_hash(user_id, content_hash)
+            if document is None:
+                raise
+            self.duplicates += 1
+            return self._result(document.id, document.content_text, started, duplicate=True)
+
+        return self._result(document.id, text, started, duplicate=False)
+
+    @staticmethod
+    def _result(document_id: int, text: Optional[str], started: float, duplicate: bool) -> Dict[str, Any]:
+        return {
+            "document_id": document_id,
+            "chars": len(text or ""),
+            "extract_seconds": time.perf_counter() - started,
+            "duplicate": duplicate,
+        }
+
+    async def close(self):
+        await self.extractor.close()
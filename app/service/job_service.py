@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.database.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[Optional[Dict[str, Any]]]]
+JobCallback = Callable[[Job, Any], Awaitable[None]]
+
+
+class JobQueue:
+    """Постановка фоновых задач в очередь (таблица jobs)"""
+
+    # Интерактивные задачи (пользователь ждет ответ) идут раньше фоновых
+    PRIORITY_INTERACTIVE = 10
+    PRIORITY_BACKGROUND = 0
+
+    def __init__(self, db):
+        self.db = db
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(
+            self,
+            user_id: int,
+            job_type: str,
+            payload: Dict[str, Any],
+            priority: int = PRIORITY_INTERACTIVE,
+            chat_id: Optional[int] = None,
+            message_id: Optional[int] = None,
+            max_attempts: int = 3
+    ) -> Job:
+        async with self.db.get_uow() as uow:
+            job = await uow.jobs.create({
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "type": job_type,
+                "payload": payload,
+                "priority": priority,
+                "max_attempts": max_attempts,
+            })
+        # Воркеры этого процесса не ждут следующего опроса
+        self._wakeup.set()
+        return job
+
+    async def get_job(self, user_id: int, job_id: int) -> Optional[Job]:
+        async with self.db.get_uow(read_only=True) as uow:
+            return await uow.jobs.get_by_id(job_id, user_id)
+
+    async def wait_for_jobs(self, timeout: float):
+        """Ждать новой задачи этого процесса не дольше timeout (задачи других процессов — по опросу)"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class JobWorkerPool:
+    """Пул asyncio-воркеров, выполняющих задачи из таблицы jobs.
+
+    Обработчик задачи регистрируется по типу. Ошибка — повтор с экспоненциальной
+    задержкой, пока не исчерпаны max_attempts; затем задача помечается failed.
+    job_timeout — таймаут выполнения. Блокировка задачи (после ее истечения задачу
+    упавшего процесса заберет другой воркер) длиннее на lock_grace: воркер, у которого
+    сработал таймаут, успевает записать ошибку, пока задачу никто не перехватил.
+    """
+
+    def __init__(
+            self,
+            db,
+            queue: JobQueue,
+            concurrency: Optional[int] = None,
+            job_timeout: float = 300.0,
+            lock_grace: float = 60.0,
+            poll_interval: float = 2.0,
+            retry_base: float = 5.0
+    ):
+        self.db = db
+        self.queue = queue
+        self.concurrency = concurrency or int(os.getenv("JOB_WORKERS", "4"))
+        self.job_timeout = job_timeout
+        self.lock_seconds = job_timeout + lock_grace
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.on_success: Optional[JobCallback] = None
+        self.on_failure: Optional[JobCallback] = None
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    def start(self):
+        for index in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(index), name=f"job-worker-{index}"))
+        logger.info(f"Запущено воркеров задач: {self.concurrency}")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                async with self.db.get_uow() as uow:
+                    jobs = await uow.jobs.claim(self.lock_seconds, limit=1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"job-worker-{index}: не удалось получить задачу: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if not jobs:
+                await self.queue.wait_for_jobs(self.poll_interval)
+                continue
+            await self._run(jobs[0])
+
+    async def _run(self, job: Job):
+        handler = self._handlers.get(job.type)
+        if handler is None:
+            await self._finish_failed(job, f"Неизвестный тип задачи: {job.type}")
+            return
+        if job.attempts > job.max_attempts:
+            # Воркер упал, не успев завершить последнюю попытку
+            await self._finish_failed(job, job.error or "Превышено число попыток")
+            return
+
+        try:
+            result = await asyncio.wait_for(handler(job), self.job_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Задача {job.id} ({job.type}), попытка {job.attempts}: {e}")
+            if job.attempts < job.max_attempts:
+                delay = self.retry_base * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5)
+                async with self.db.get_uow() as uow:
+                    owned = await uow.jobs.fail(job.id, job.attempts, repr(e), retry_in=delay)
+                if owned:
+                    self.retried += 1
+                else:
+                    self._log_lost(job)
+            else:
+                await self._finish_failed(job, repr(e))
+            return
+
+        async with self.db.get_uow() as uow:
+            owned = await uow.jobs.complete(job.id, job.attempts, result)
+        if not owned:
+            self._log_lost(job)
+            return
+        self.processed += 1
+        await self._notify(self.on_success, job, result)
+
+    async def _finish_failed(self, job: Job, error: str):
+        async with self.db.get_uow() as uow:
+            owned = await uow.jobs.fail(job.id, job.attempts, error)
+        if not owned:
+            self._log_lost(job)
+            return
+        self.failed += 1
+        await self._notify(self.on_failure, job, error)
+
+    @staticmethod
+    def _log_lost(job: Job):
+        # Блокировка истекла, задачу перехватила следующая попытка — итог и уведомление за ней
+        logger.warning(f"Задача {job.id} ({job.type}), попытка {job.attempts}: задача уже перехвачена, результат отброшен")
+
+    async def _notify(self, callback: Optional[JobCallback], job: Job, value: Any):
+        if callback is None:
+            return
+        try:
+            await callback(job, value)
+        except Exception as e:
+            logger.error(f"Не удалось доставить результат задачи {job.id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
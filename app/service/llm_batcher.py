@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .llm_providers import LLMProvider, LLMProviderError
+
+
+class LLMBatcher:
+    """Собирает одиночные генерации в пачки для provider.complete_batch.
+
+    Пачка уходит, когда набралось max_batch_size запросов или прошло max_wait секунд
+    с первого запроса в ней. Запросы с разными max_tokens/timeout не смешиваются.
+    Пачка занимает одно место в общем семафоре LLMService. on_start запроса вызывается,
+    когда его пачка получила место и ушла провайдеру, — для учета ожидания в очереди.
+    """
+
+    def __init__(self, provider: LLMProvider, semaphore: asyncio.Semaphore,
+                 max_batch_size: int = 16, max_wait: float = 0.02):
+        self.provider = provider
+        self.semaphore = semaphore
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched_requests = 0
+        self._pending: Dict[Tuple[Any, ...], List[Tuple[str, asyncio.Future, Optional[Callable[[], None]]]]] = {}
+        self._timers: Dict[Tuple[Any, ...], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str, max_tokens: Optional[int] = None, timeout: Optional[float] = None,
+                     on_start: Optional[Callable[[], None]] = None) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = (max_tokens, timeout)
+
+        pending = self._pending.setdefault(group, [])
+        pending.append((prompt, future, on_start))
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+
+        return await future
+
+    def _flush(self, group: Tuple[Any, ...]):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(group, batch))
+        # Держим ссылку, чтобы задачу не собрал сборщик мусора до завершения
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Tuple[Any, ...],
+                   batch: List[Tuple[str, asyncio.Future, Optional[Callable[[], None]]]]):
+        max_tokens, timeout = group
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            async with self.semaphore:
+                for _, future, on_start in batch:
+                    # Отмененный запрос уже не ждет ответа — его не считаем начатым
+                    if on_start is not None and not future.done():
+                        on_start()
+                results = await self.provider.complete_batch(
+                    [prompt for prompt, _, _ in batch], max_tokens=max_tokens, timeout=timeout
+                )
+            if len(results) != len(batch):
+                raise LLMProviderError(f"LLM вернул {len(results)} ответов на пачку из {len(batch)}")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "avg_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+        }
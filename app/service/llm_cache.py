@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from app.utils.lru import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Кэш ответов LLM перед LLMService.generate*.
+
+    Точное совпадение: ключ — sha256 от нормализованного промпта (регистр, пробелы),
+    модели и параметров генерации. Горячие записи лежат в LRU процесса, все — в таблице
+    llm_cache, поэтому кэш переживает перезапуск и общий для бота и API.
+
+    Поиск похожих (similarity_threshold) — по коэффициенту Жаккара слов переменных частей
+    промпта (inputs: ниша, цель, тема...), а не всего промпта, где большую часть слов дает
+    общий шаблон. Ищется среди записей того же места вызова в памяти процесса; вызовы без
+    inputs ищутся только точно. По умолчанию выключен.
+
+    Попадания (hits, last_hit_at — по ним prune решает, что удалять) копятся в памяти и
+    пишутся пачкой раз в flush_interval секунд, а не UPDATE с commit на каждое чтение.
+    """
+
+    WORD_RE = re.compile(r"\w+")
+
+    def __init__(
+            self,
+            db=None,
+            maxsize: int = 1024,
+            ttl: Optional[float] = 7 * 24 * 3600,
+            similarity_threshold: Optional[float] = None,
+            max_rows: int = 10000,
+            prune_every: int = 500,
+            flush_interval: float = 30.0
+    ):
+        self.db = db
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self.flush_interval = flush_interval
+        self._entries = LRUCache(maxsize)
+        self._warmed = set()
+        self._writes = 0
+        # key -> (попаданий с прошлой записи, время последнего попадания)
+        self._pending_hits: Dict[str, Tuple[int, datetime]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.hit_flushes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, db=None) -> "LLMCache":
+        similarity = os.getenv("LLM_CACHE_SIMILARITY")
+        return cls(
+            db=db,
+            maxsize=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            similarity_threshold=float(similarity) if similarity else None,
+            max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "10000")),
+            flush_interval=float(os.getenv("LLM_CACHE_FLUSH_INTERVAL", "30"))
+        )
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(prompt.split()).casefold()
+
+    @staticmethod
+    def make_key(normalized_prompt: str, model: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps([model, params, normalized_prompt], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def dump_inputs(cls, inputs: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Нормализованные переменные части промпта в JSON (для хранения в llm_cache.inputs)"""
+        if not inputs:
+            return None
+        normalized = {name: cls.normalize(str(value)) for name, value in inputs.items() if value}
+        return json.dumps(normalized, ensure_ascii=False, sort_keys=True) if normalized else None
+
+    def _tokens(self, dumped_inputs: Optional[str]) -> Optional[FrozenSet[str]]:
+        """Слова inputs с именем поля: "кофейня" в нише и в пожеланиях — разные слова"""
+        if dumped_inputs is None:
+            return None
+        return frozenset(
+            f"{name}:{word}"
+            for name, value in json.loads(dumped_inputs).items()
+            for word in self.WORD_RE.findall(value)
+        )
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl is None or time.time() - stored_at < self.ttl
+
+    def _remember(self, key: str, call_site: str, model: str, dumped_inputs: Optional[str],
+                  response: str, stored_at: Optional[float] = None):
+        self._entries.set(key, {
+            "call_site": call_site,
+            "model": model,
+            "tokens": self._tokens(dumped_inputs),
+            "response": response,
+            "stored_at": stored_at or time.time(),
+        })
+
+    async def get(self, call_site: str, model: str, prompt: str, params: Dict[str, Any],
+                  inputs: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Сохраненный ответ для промпта или None; inputs — переменные части промпта для поиска похожих"""
+        normalized = self.normalize(prompt)
+        key = self.make_key(normalized, model, params)
+        dumped_inputs = self.dump_inputs(inputs)
+
+        entry = self._entries.get(key)
+        if entry is not None and self._fresh(entry["stored_at"]):
+            self.memory_hits += 1
+            self._record_hit(key)
+            return entry["response"]
+
+        if self.db is not None:
+            response = await self._db_get(key)
+            if response is not None:
+                self.db_hits += 1
+                self._record_hit(key)
+                self._remember(key, call_site, model, dumped_inputs, response)
+                return response
+
+        if self.similarity_threshold is not None and dumped_inputs is not None:
+            similar = await self._find_similar(call_site, model, dumped_inputs)
+            if similar is not None:
+                self.similar_hits += 1
+                similar_key, response = similar
+                self._record_hit(similar_key)
+                return response
+
+        self.misses += 1
+        return None
+
+    async def put(self, call_site: str, model: str, prompt: str, params: Dict[str, Any], response: str,
+                  inputs: Optional[Dict[str, Any]] = None):
+        normalized = self.normalize(prompt)
+        key = self.make_key(normalized, model, params)
+        dumped_inputs = self.dump_inputs(inputs)
+        self._remember(key, call_site, model, dumped_inputs, response)
+        if self.db is None:
+            return
+
+        try:
+            async with self.db.get_uow() as uow:
+                await uow.llm_cache.put(key, call_site, model, normalized, response, inputs=dumped_inputs)
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    await uow.llm_cache.prune(self.max_rows, created_before=self._expired_before())
+        except Exception as e:
+            # Кэш — оптимизация: ошибка записи не должна ронять генерацию
+            logger.warning(f"LLM cache: не удалось сохранить ответ: {e}")
+
+    def _expired_before(self) -> Optional[datetime]:
+        return datetime.utcnow() - timedelta(seconds=self.ttl) if self.ttl is not None else None
+
+    def _record_hit(self, key: str):
+        """Запомнить попадание; в базу оно уйдет со следующей пачкой"""
+        if self.db is None:
+            return
+        count, _ = self._pending_hits.get(key, (0, None))
+        self._pending_hits[key] = (count + 1, datetime.utcnow())
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Отмена цикла при остановке не должна обрывать запись на середине
+            await asyncio.shield(self.flush_hits())
+
+    async def flush_hits(self) -> int:
+        """Записать накопленные попадания; при ошибке они возвращаются в буфер до следующей попытки"""
+        async with self._flush_lock:
+            if not self._pending_hits:
+                return 0
+            batch, self._pending_hits = self._pending_hits, {}
+            try:
+                async with self.db.get_uow() as uow:
+                    written = await uow.llm_cache.add_hits(batch)
+            except Exception as e:
+                logger.warning(f"LLM cache: не удалось записать попадания: {e}")
+                for key, (count, hit_at) in batch.items():
+                    pending, _ = self._pending_hits.get(key, (0, None))
+                    self._pending_hits[key] = (pending + count, hit_at)
+                return 0
+            self.hit_flushes += 1
+            return written
+
+    async def close(self):
+        """Остановить периодическую запись попаданий и сбросить остаток"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self.db is not None:
+            await self.flush_hits()
+
+    async def _db_get(self, key: str) -> Optional[str]:
+        try:
+            async with self.db.get_uow(read_only=True) as uow:
+                return await uow.llm_cache.get(key, created_after=self._expired_before())
+        except Exception as e:
+            logger.warning(f"LLM cache: не удалось прочитать ответ: {e}")
+            return None
+
+    async def _find_similar(self, call_site: str, model: str, dumped_inputs: str) -> Optional[Tuple[str, str]]:
+        """(ключ, ответ) самой похожей по inputs записи того же места вызова и модели"""
+        if self.db is not None and (call_site, model) not in self._warmed:
+            await self._warm(call_site, model)
+
+        tokens = self._tokens(dumped_inputs)
+        if not tokens:
+            return None
+
+        best_score, best = 0.0, None
+        for key, entry in self._entries.items():
+            if (entry["call_site"] != call_site or entry["model"] != model
+                    or not entry["tokens"] or not self._fresh(entry["stored_at"])):
+                continue
+            score = len(tokens & entry["tokens"]) / len(tokens | entry["tokens"])
+            if score > best_score:
+                best_score, best = score, (key, entry["response"])
+
+        return best if best_score >= self.similarity_threshold else None
+
+    async def _warm(self, call_site: str, model: str):
+        """Загрузить в память недавние записи места вызова, чтобы похожие находились и после рестарта"""
+        self._warmed.add((call_site, model))
+        try:
+            async with self.db.get_uow(read_only=True) as uow:
+                entries = await uow.llm_cache.get_recent(call_site, model, limit=max(1, self._entries.maxsize // 4))
+        except Exception as e:
+            logger.warning(f"LLM cache: не удалось загрузить записи: {e}")
+            return
+        for entry in reversed(entries):
+            if entry.key in self._entries:
+                continue
+            # created_at хранится в UTC без зоны
+            stored_at = entry.created_at.replace(tzinfo=timezone.utc).timestamp() if entry.created_at else None
+            self._remember(entry.key, call_site, model, entry.inputs, entry.response, stored_at=stored_at)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.db_hits + self.similar_hits + self.misses
+        hits = lookups - self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "evictions": self._entries.evictions,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "similarity_threshold": self.similarity_threshold,
+            "pending_hits": len(self._pending_hits),
+            "hit_flushes": self.hit_flushes,
+        }
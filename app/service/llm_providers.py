@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProviderError(Exception):
+    """Провайдер не смог вернуть ответ (после всех повторов)"""
+
+
+class LLMProvider(ABC):
+    """Базовый провайдер: получает промпт, возвращает текст ответа модели"""
+
+    # True — complete_batch отправляет пачку одним запросом, и LLMService может копить пачки
+    supports_batch = False
+    # True — ответ не зависит от промпта (заглушка), генерировать им нечего
+    is_stub = False
+
+    @abstractmethod
+    async def complete(self, prompt: str, max_tokens: Optional[int] = None,
+                       timeout: Optional[float] = None) -> str:
+        """Текст ответа модели на промпт"""
+
+    async def complete_batch(self, prompts: List[str], max_tokens: Optional[int] = None,
+                             timeout: Optional[float] = None) -> List[str]:
+        """Ответы на несколько промптов в том же порядке; по умолчанию — параллельные complete()"""
+        return list(await asyncio.gather(*[
+            self.complete(prompt, max_tokens=max_tokens, timeout=timeout) for prompt in prompts
+        ]))
+
+    async def stream(self, prompt: str, max_tokens: Optional[int] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Ответ по частям; по умолчанию — весь ответ одним куском"""
+        yield await self.complete(prompt, max_tokens=max_tokens, timeout=timeout)
+
+    async def close(self):
+        pass
+
+
+class StubLLMProvider(LLMProvider):
+    """Заглушка без сети: фиксированный JSON-ответ (для разработки без ключа API)"""
+
+    model = "stub"
+    is_stub = True
+
+    RESPONSE = {
+        "title": "Идея для продвижения",
+        "description": "Создайте серию коротких видео о том, как работает ваш бизнес.",
+        "examples": [
+            "«Как мы готовим заказы за 60 секунд»",
+            "«Топ-3 проблемы клиентов и как мы их решаем»"
+        ]
+    }
+
+    async def complete(self, prompt: str, max_tokens: Optional[int] = None,
+                       timeout: Optional[float] = None) -> str:
+        return json.dumps(self.RESPONSE, ensure_ascii=False)
+
+
+class HTTPLLMProvider(LLMProvider):
+    """OpenAI-совместимый /chat/completions поверх одной долгоживущей aiohttp-сессии.
+
+    Сессия и пул keep-alive соединений создаются при первом запросе и живут до close().
+    Таймауты, 429 и 5xx повторяются с экспоненциальной задержкой и случайным джиттером.
+    Если задан batch_path (например, "/completions"), пачки промптов уходят одним запросом
+    с полем prompt-списком, как в OpenAI-совместимом /v1/completions. Это устаревший
+    эндпоинт без ролей сообщений: промпт идет сырым текстом, а чат-модели OpenAI
+    (gpt-4o-mini и т.п.) его не принимают. Для них batch_path игнорируется, и пачки
+    не копятся; для самостоятельно развернутых серверов (vLLM и т.п.) он работает с любой моделью.
+    """
+
+    RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+    # Модели OpenAI, доступные только через /chat/completions (кроме *-instruct)
+    CHAT_ONLY_MODEL_PREFIXES = ("gpt-4", "gpt-3.5-turbo", "chatgpt", "o1", "o3", "o4")
+
+    def __init__(
+            self,
+            base_url: str,
+            api_key: Optional[str] = None,
+            model: str = "gpt-4o-mini",
+            timeout: float = 60.0,
+            connect_timeout: float = 5.0,
+            max_retries: int = 3,
+            backoff_base: float = 0.5,
+            backoff_max: float = 8.0,
+            pool_limit: int = 20,
+            batch_path: Optional[str] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_limit = pool_limit
+        if batch_path is not None and self.is_chat_only(model):
+            logger.warning(f"LLM: {model} не поддерживает {batch_path}, пачки отключены")
+            batch_path = None
+        self.batch_path = batch_path
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def is_chat_only(cls, model: str) -> bool:
+        """Модель принимает только /chat/completions, а не /completions с prompt-списком"""
+        model = model.lower()
+        return model.startswith(cls.CHAT_ONLY_MODEL_PREFIXES) and "instruct" not in model
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # ClientSession привязана к event loop, поэтому создаем ее лениво внутри него
+        if self._session is None or self._session.closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_limit, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout)
+            )
+        return self._session
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter: одновременно упавшие запросы не повторяются синхронно
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _payload(self, prompt: str, max_tokens: Optional[int]) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        return payload
+
+    async def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        """POST с повторами; возвращает JSON ответа"""
+        session = self._get_session()
+        request_timeout = (
+            aiohttp.ClientTimeout(total=timeout, sock_connect=self.connect_timeout) if timeout is not None else None
+        )
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.post(f"{self.base_url}{path}", json=payload, timeout=request_timeout) as response:
+                    if await self._should_retry(response, attempt):
+                        continue
+                    return await response.json()
+            except (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise LLMProviderError(f"LLM недоступен: {e!r}") from e
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM: {e!r}, повтор через {delay:.2f} с")
+                await asyncio.sleep(delay)
+
+        raise LLMProviderError("LLM: исчерпаны повторы")
+
+    async def _should_retry(self, response: aiohttp.ClientResponse, attempt: int) -> bool:
+        """Ждет перед повтором и возвращает True для временных ошибок; для прочих ошибок — исключение"""
+        if response.status in self.RETRY_STATUSES and attempt < self.max_retries:
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else self._backoff(attempt)
+            logger.warning(f"LLM {response.status}, повтор через {delay:.2f} с")
+            await asyncio.sleep(delay)
+            return True
+        if response.status >= 400:
+            raise LLMProviderError(f"LLM ответил {response.status}: {await response.text()}")
+        return False
+
+    async def complete(self, prompt: str, max_tokens: Optional[int] = None,
+                       timeout: Optional[float] = None) -> str:
+        data = await self._post("/chat/completions", self._payload(prompt, max_tokens), timeout)
+        return data["choices"][0]["message"]["content"]
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.batch_path is not None
+
+    async def complete_batch(self, prompts: List[str], max_tokens: Optional[int] = None,
+                             timeout: Optional[float] = None) -> List[str]:
+        if not self.supports_batch:
+            return await super().complete_batch(prompts, max_tokens=max_tokens, timeout=timeout)
+
+        payload = {"model": self.model, "prompt": prompts}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        data = await self._post(self.batch_path, payload, timeout)
+        choices = sorted(data["choices"], key=lambda choice: choice["index"])
+        return [choice["text"] for choice in choices]
+
+    async def stream(self, prompt: str, max_tokens: Optional[int] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Токены из SSE-потока (stream=true); повтор возможен только до первого полученного куска"""
+        session = self._get_session()
+        payload = {**self._payload(prompt, max_tokens), "stream": True}
+        request_timeout = aiohttp.ClientTimeout(
+            total=timeout if timeout is not None else self.timeout, sock_connect=self.connect_timeout
+        )
+
+        received = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.post(f"{self.base_url}/chat/completions", json=payload,
+                                        timeout=request_timeout) as response:
+                    if await self._should_retry(response, attempt):
+                        continue
+                    async for line in response.content:
+                        line = line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            return
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            received = True
+                            yield delta
+                    return
+            except (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+                # Часть ответа уже отдана: повтор начал бы текст заново
+                if received or attempt >= self.max_retries:
+                    raise LLMProviderError(f"LLM недоступен: {e!r}") from e
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM: {e!r}, повтор через {delay:.2f} с")
+                await asyncio.sleep(delay)
+
+        raise LLMProviderError("LLM: исчерпаны повторы")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def create_llm_provider() -> LLMProvider:
+    """Провайдер по переменным окружения: LLM_BASE_URL задан — HTTP, иначе заглушка"""
+    base_url = os.getenv("LLM_BASE_URL")
+    if not base_url:
+        return StubLLMProvider()
+    return HTTPLLMProvider(
+        base_url=base_url,
+        api_key=os.getenv("LLM_API_KEY"),
+        model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+        timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        pool_limit=int(os.getenv("LLM_POOL_LIMIT", "20")),
+        batch_path=os.getenv("LLM_BATCH_PATH") or None
+    )
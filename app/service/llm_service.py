@@ -1,25 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import string
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from app.utils.latency import LatencyHistogram
+from .llm_batcher import LLMBatcher
+from .llm_cache import LLMCache
+from .llm_providers import LLMProvider, create_llm_provider
+
+
+logger = logging.getLogger(__name__)
+
+# Экранирования JSON, кроме \uXXXX
+JSON_SIMPLE_ESCAPES = set('"\\/bfnrt')
+LONE_SURROGATE_RE = re.compile("[\ud800-\udfff]")
+
+
 class LLMService:
-    def __init__(self):
-        pass
+    """Долгоживущий клиент LLM поверх провайдера.
 
-    async def generate(self, prompt: str) -> dict:
-        # Заглушка — имитация работы LLM
-        return {
-            "title": "Идея для продвижения",
-            "description": "Создайте серию коротких видео о том, как работает ваш бизнес.",
-            "examples": [
-                "«Как мы готовим заказы за 60 секунд»",
-                "«Топ-3 проблемы клиентов и как мы их решаем»"
-            ]
-        }
+    Один экземпляр на процесс (создается контейнером сервисов): общий семафор
+    ограничивает число одновременных генераций, задержки собираются по call_site.
+    Вызовы с use_cache=True сначала ищут ответ в LLMCache (если он передан).
+    Одинаковые одновременные промпты выполняются один раз; если провайдер умеет
+    пачки, одиночные генерации копятся в LLMBatcher (LLM_BATCH_SIZE / LLM_BATCH_WAIT_MS).
+    """
+
+    def __init__(self, provider: Optional[LLMProvider] = None, max_concurrency: Optional[int] = None,
+                 cache: Optional[LLMCache] = None, batch_size: Optional[int] = None,
+                 batch_wait: Optional[float] = None):
+        self.provider = provider or create_llm_provider()
+        self.cache = cache
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.batcher = None
+        if self.provider.supports_batch:
+            self.batcher = LLMBatcher(
+                self.provider,
+                self._semaphore,
+                max_batch_size=batch_size or int(os.getenv("LLM_BATCH_SIZE", "16")),
+                max_wait=batch_wait if batch_wait is not None else float(os.getenv("LLM_BATCH_WAIT_MS", "20")) / 1000
+            )
+        self._pending: Dict[tuple, asyncio.Task] = {}
+        self.coalesced = 0
+        self._in_flight = 0
+        self._latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._queue_wait: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._first_chunk: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.provider, "model", type(self.provider).__name__)
+
+    @property
+    def has_model(self) -> bool:
+        """False, если настроена только заглушка (LLM_BASE_URL не задан)"""
+        return not self.provider.is_stub
+
+    async def _cached(self, use_cache: bool, call_site: str, prompt: str, max_tokens: Optional[int],
+                      cache_inputs: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not use_cache or self.cache is None:
+            return None
+        return await self.cache.get(call_site, self.model, prompt, {"max_tokens": max_tokens}, inputs=cache_inputs)
+
+    async def _store(self, use_cache: bool, call_site: str, prompt: str, max_tokens: Optional[int],
+                     cache_inputs: Optional[Dict[str, Any]], text: str):
+        if use_cache and self.cache is not None:
+            await self.cache.put(call_site, self.model, prompt, {"max_tokens": max_tokens}, text, inputs=cache_inputs)
+
+    async def generate_raw(self, prompt: str, call_site: str = "default", max_tokens: Optional[int] = None,
+                           timeout: Optional[float] = None, use_cache: bool = False,
+                           cache_inputs: Optional[Dict[str, Any]] = None) -> str:
+        """Текст ответа модели; cache_inputs — переменные части промпта, по ним кэш ищет похожие"""
+        cached = await self._cached(use_cache, call_site, prompt, max_tokens, cache_inputs)
+        if cached is not None:
+            return cached
+
+        # Такой же промпт уже генерируется — ждем его результат вместо второго вызова
+        key = (prompt, max_tokens)
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._complete(prompt, call_site, max_tokens, timeout))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        text = await asyncio.shield(task)
+
+        await self._store(use_cache, call_site, prompt, max_tokens, cache_inputs, text)
+        return text
+
+    async def _complete(self, prompt: str, call_site: str, max_tokens: Optional[int], timeout: Optional[float]) -> str:
+        if self.batcher is not None:
+            return await self._complete_batched(prompt, call_site, max_tokens, timeout)
 
-    async def generate_raw(self, prompt: str) -> str:
-        return f"[LLM RAW ответ на запрос: {prompt[:60]}...]"
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self._queue_wait[call_site].observe(started - queued)
+            self._in_flight += 1
+            failed = True
+            try:
+                result = await self.provider.complete(prompt, max_tokens=max_tokens, timeout=timeout)
+                failed = False
+                return result
+            finally:
+                self._in_flight -= 1
+                self._latency[call_site].observe(time.perf_counter() - started, error=failed)
 
-    async def generate_json(self, prompt: str) -> dict:
+    async def _complete_batched(self, prompt: str, call_site: str, max_tokens: Optional[int],
+                                timeout: Optional[float]) -> str:
+        """Генерация через LLMBatcher; ожидание и in_flight считаются так же, как без пачек"""
+        # Семафор занимает пачка целиком, а не каждый запрос
+        queued = time.perf_counter()
+        started = None
+
+        def on_start():
+            nonlocal started
+            started = time.perf_counter()
+            self._queue_wait[call_site].observe(started - queued)
+            self._in_flight += 1
+
+        failed = True
+        try:
+            result = await self.batcher.submit(prompt, max_tokens=max_tokens, timeout=timeout, on_start=on_start)
+            failed = False
+            return result
+        finally:
+            if started is not None:
+                self._in_flight -= 1
+                self._latency[call_site].observe(time.perf_counter() - started, error=failed)
+
+    async def stream(self, prompt: str, call_site: str = "default",
+                     max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Ответ модели по мере генерации; место в семафоре занято, пока поток не дочитан или не закрыт"""
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self._queue_wait[call_site].observe(started - queued)
+            self._in_flight += 1
+            failed = True
+            first = True
+            try:
+                async for chunk in self.provider.stream(prompt, max_tokens=max_tokens, timeout=timeout):
+                    if first:
+                        self._first_chunk[call_site].observe(time.perf_counter() - started)
+                        first = False
+                    yield chunk
+                failed = False
+            finally:
+                self._in_flight -= 1
+                self._latency[call_site].observe(time.perf_counter() - started, error=failed)
+
+    async def generate_streaming(self, prompt: str, on_progress: Callable[[str], Awaitable[None]],
+                                 call_site: str = "default", max_tokens: Optional[int] = None,
+                                 timeout: Optional[float] = None, use_cache: bool = False,
+                                 cache_inputs: Optional[Dict[str, Any]] = None) -> str:
+        """Полный текст ответа; on_progress получает накопленный текст после каждого куска"""
+        cached = await self._cached(use_cache, call_site, prompt, max_tokens, cache_inputs)
+        if cached is not None:
+            await self._report_progress(on_progress, call_site, cached)
+            return cached
+
+        text = ""
+        async for chunk in self.stream(prompt, call_site=call_site, max_tokens=max_tokens, timeout=timeout):
+            text += chunk
+            await self._report_progress(on_progress, call_site, text)
+        await self._store(use_cache, call_site, prompt, max_tokens, cache_inputs, text)
+        return text
+
+    @staticmethod
+    async def _report_progress(on_progress: Callable[[str], Awaitable[None]], call_site: str, text: str):
+        """Промежуточный показ — не повод прерывать генерацию: ошибка только пишется в лог"""
+        try:
+            await on_progress(text)
+        except Exception as e:
+            logger.warning(f"{call_site}: не удалось показать ход генерации: {e!r}")
+
+    async def generate(self, prompt: str, call_site: str = "default",
+                       on_progress: Optional[Callable[[str], Awaitable[None]]] = None, **kwargs) -> dict:
+        """Ответ модели, разобранный как JSON-объект; с on_progress ответ читается потоком"""
+        if on_progress is not None:
+            text = await self.generate_streaming(prompt, on_progress, call_site=call_site, **kwargs)
+        else:
+            text = await self.generate_raw(prompt, call_site=call_site, **kwargs)
+        return self.parse_json(text)
+
+    async def generate_json(self, prompt: str, call_site: str = "default",
+                            on_progress: Optional[Callable[[str], Awaitable[None]]] = None, **kwargs) -> dict:
         # Метод специально для DocumentAnalyzer
-        result = await self.generate(prompt)
-        # В реальном LLM здесь может быть парсинг JSON
+        result = await self.generate(prompt, call_site=call_site, on_progress=on_progress, **kwargs)
         return {
             "document_type": result.get("document_type", "документ"),
             "title": result.get("title", "Без названия"),
@@ -29,3 +204,75 @@ class LLMService:
             "risks": result.get("risks", "Риски не выявлены"),
             "recommendations": result.get("recommendations", result.get("advice", "Рекомендации отсутствуют"))
         }
+
+    @staticmethod
+    def parse_json(text: str) -> dict:
+        """JSON из ответа модели: допускает обертку ```json ... ``` и текст вокруг объекта"""
+        fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+        candidate = fenced.group(1) if fenced else text
+        start, end = candidate.find("{"), candidate.rfind("}")
+        if start != -1 and end > start:
+            try:
+                parsed = json.loads(candidate[start:end + 1])
+                if isinstance(parsed, dict):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+        return {"text": text}
+
+    @staticmethod
+    def partial_json_field(text: str, field: str) -> Optional[str]:
+        """Значение строкового поля из еще не дописанного JSON (для показа ответа по ходу генерации).
+
+        Разбор останавливается на недописанной или некорректной escape-последовательности;
+        суррогатные пары \\uXXXX склеиваются в один символ, одиночные суррогаты отбрасываются.
+        """
+        match = re.search(rf'"{re.escape(field)}"\s*:\s*"', text)
+        if match is None:
+            return None
+
+        raw = []
+        index = match.end()
+        while index < len(text):
+            char = text[index]
+            if char == '"':
+                break
+            if char == "\\":
+                escape = text[index:index + 2]
+                if escape == "\\u":
+                    code = text[index + 2:index + 6]
+                    if len(code) < 4 or not all(digit in string.hexdigits for digit in code):
+                        break
+                    raw.append(text[index:index + 6])
+                    index += 6
+                    continue
+                if len(escape) < 2 or escape[1] not in JSON_SIMPLE_ESCAPES:
+                    break
+                raw.append(escape)
+                index += 2
+                continue
+            raw.append(char)
+            index += 1
+
+        # Экранирование собрано и проверено выше — декодирует его json, включая суррогатные пары
+        value = json.loads(f'"{"".join(raw)}"', strict=False)
+        # Половина пары в конце еще дописывается, непарные суррогаты не закодировать в UTF-8
+        return LONE_SURROGATE_RE.sub("", value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Задержки генерации и ожидания семафора по местам вызова"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "coalesced": self.coalesced,
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "latency": {site: histogram.snapshot() for site, histogram in self._latency.items()},
+            "queue_wait": {site: histogram.snapshot() for site, histogram in self._queue_wait.items()},
+            "first_chunk": {site: histogram.snapshot() for site, histogram in self._first_chunk.items()},
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def close(self):
+        if self.cache is not None:
+            await self.cache.close()
+        await self.provider.close()
@@ -1,11 +1,27 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 import json
 import random
 
+from app.service.llm_service import LLMService
+
+
 class MarketingService:
 
-    def __init__(self, db):
+    def __init__(self, db, llm_service: Optional[LLMService] = None):
         self.db = db
+        self.llm_service = llm_service or LLMService()
+
+    async def _generate(self, prompt: str, call_site: str, inputs: Dict[str, Any],
+                        on_progress: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Поля от модели; без настоящей модели — пусто: ответ заглушки затер бы шаблон.
+
+        inputs — то, что ввел пользователь: по ним кэш ищет похожие запросы.
+        """
+        if not self.llm_service.has_model:
+            return {}
+        return await self.llm_service.generate(
+            prompt, call_site=call_site, on_progress=on_progress, use_cache=True, cache_inputs=inputs
+        )
 
     async def generate_marketing_idea(
         self,
@@ -13,11 +29,12 @@ class MarketingService:
         niche: str,
         goal: str,
         platform: str,
-        custom_request: Optional[str] = None
+        custom_request: Optional[str] = None,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """Генерация комплексной маркетинговой идеи (заглушка)"""
+        """Генерация комплексной маркетинговой идеи; on_progress получает ответ модели по ходу генерации"""
 
-        # Заглушка вместо реального LLM
+        # Шаблоны на случай, если модель не вернула часть полей
         ideas_pool = [
             {
                 "title": "Вирусный челлендж в сторис",
@@ -62,6 +79,32 @@ class MarketingService:
         response = random.choice(ideas_pool)
         response["title"] = f"{response['title']} для {niche}"
 
+        prompt = f"""
+        Составь маркетинговую стратегию для бизнеса.
+
+        Ниша: {niche}
+        Цель: {goal}
+        Платформа: {platform}
+        Пожелания: {custom_request or "нет"}
+
+        Верни результат в JSON:
+        {{
+            "title": "название стратегии",
+            "problem": "какую проблему решаем",
+            "solution": "суть решения",
+            "action_plan": ["шаг 1", "шаг 2", "шаг 3"],
+            "content_ideas": ["идея 1", "идея 2", "идея 3"],
+            "metrics": "целевые KPI",
+            "budget_tips": "рекомендации по бюджету"
+        }}
+        """
+        generated = await self._generate(
+            prompt, "marketing_idea",
+            {"niche": niche, "goal": goal, "platform": platform, "custom_request": custom_request},
+            on_progress=on_progress
+        )
+        response.update({key: value for key, value in generated.items() if key in response and value})
+
         # Сохраняем в базу через UoW
         async with self.db.get_uow() as uow:
             idea = await uow.marketing_ideas.create(
@@ -83,7 +126,7 @@ class MarketingService:
         topic: str,
         style: str = "профессиональный"
     ) -> Dict[str, Any]:
-        """Генерация поста для соцсетей (заглушка)"""
+        """Генерация поста для соцсетей"""
 
         posts_pool = [
             {
@@ -106,7 +149,25 @@ class MarketingService:
             }
         ]
 
-        return random.choice(posts_pool)
+        post = random.choice(posts_pool)
+
+        prompt = f"""
+        Напиши пост для соцсетей на тему: {topic}
+        Стиль: {style}
+
+        Верни результат в JSON:
+        {{
+            "headline": "заголовок",
+            "hook": "цепляющее первое предложение",
+            "body": "основной текст",
+            "cta": "призыв к действию",
+            "hashtags": ["#хэштег1", "#хэштег2"],
+            "visual_tips": "рекомендации по визуалу"
+        }}
+        """
+        generated = await self._generate(prompt, "social_post", {"topic": topic, "style": style})
+        post.update({key: value for key, value in generated.items() if key in post and value})
+        return post
 
     async def generate_content_plan(
         self,
@@ -114,7 +175,7 @@ class MarketingService:
         business_description: str,
         theme: str = "общая"
     ) -> Dict[str, Any]:
-        """Генерация контент-плана на 30 дней (заглушка)"""
+        """Генерация контент-плана на 30 дней"""
 
         # Генерируем 30 дней контента
         daily_posts = []
@@ -137,13 +198,33 @@ class MarketingService:
                 "platform": random.choice(["Instagram", "Telegram", "VK"])
             })
 
-        return {
+        plan = {
             "strategy_overview": f"Комплексный контент-план для {business_description} с фокусом на {theme} тематику",
             "daily_posts": daily_posts,
             "key_metrics": "Охват 100K, конверсия 3%, рост подписчиков 2000/мес",
             "tools_recommendations": "Canva для графики, Trello для планирования, Google Analytics для аналитики"
         }
 
+        prompt = f"""
+        Составь контент-план на 30 дней.
+
+        Бизнес: {business_description}
+        Тематика: {theme}
+
+        Верни результат в JSON:
+        {{
+            "strategy_overview": "общая стратегия",
+            "daily_posts": [{{"day": 1, "topic": "тема", "format": "Пост", "goal": "Вовлечение", "platform": "Telegram"}}],
+            "key_metrics": "целевые метрики",
+            "tools_recommendations": "инструменты"
+        }}
+        """
+        generated = await self._generate(
+            prompt, "content_plan", {"business_description": business_description, "theme": theme}
+        )
+        plan.update({key: value for key, value in generated.items() if key in plan and value})
+        return plan
+
     async def generate_business_ideas(
         self,
         user_id: int,
@@ -193,7 +274,7 @@ class MarketingService:
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """Получить историю маркетинговых идей пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             ideas = await uow.marketing_ideas.get_by_user_id(user_id, limit)
             return [
                 {
@@ -212,5 +293,5 @@ class MarketingService:
         user_id: int
     ) -> Dict[str, Any]:
         """Получить статистику по маркетингу"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.marketing_ideas.get_user_statistics(user_id)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.utils.lru import LRUCache
+
+
+class ReportCache:
+    """Кэш отчетов в памяти процесса по ключу (user_id, отчет, период).
+
+    Записи живут ttl секунд и вытесняются по LRU. Одновременные запросы одного отчета
+    ждут одно вычисление (single-flight). invalidate_user() сбрасывает все отчеты
+    пользователя: пользователь получает новое поколение, записи старого поколения
+    считаются устаревшими. Поколение помнится ttl секунд: за это время все записи,
+    посчитанные до сброса, истекают сами, поэтому словарь поколений не растет без границ.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = LRUCache(maxsize)
+        # user_id -> (поколение, время сброса); порядок вставки = порядок сбросов
+        self._generations: Dict[int, Tuple[int, float]] = {}
+        self._generation_counter = itertools.count(1)
+        self._inflight: Dict[Tuple[Hashable, ...], asyncio.Task] = {}
+
+    async def get_or_compute(self, user_id: int, report: str, period: Optional[int],
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Отчет из кэша или результат compute(), общий для одновременных вызовов"""
+        generation = self._generation(user_id)
+        key = (user_id, report, period, generation)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.hits += 1
+                return value
+            self._entries.pop(key)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            started_at = time.monotonic()
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._store(key, started_at, done))
+
+        # shield: отмена одного из ожидающих не отменяет вычисление для остальных
+        return await asyncio.shield(task)
+
+    def _generation(self, user_id: int) -> int:
+        entry = self._generations.get(user_id)
+        return entry[0] if entry is not None else 0
+
+    def _store(self, key: Tuple[Hashable, ...], started_at: float, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        user_id, generation = key[0], key[-1]
+        # Срок жизни считается от начала вычисления: отчет, начатый до забытого сброса, уже истек
+        expires_at = started_at + self.ttl
+        # Данные изменились, пока отчет считался — такой результат не кэшируем
+        if self._generation(user_id) == generation and expires_at > time.monotonic():
+            self._entries.set(key, (expires_at, task.result()))
+
+    def invalidate_user(self, user_id: int):
+        """Сбросить все отчеты пользователя (после записи продаж, остатков, товаров)"""
+        now = time.monotonic()
+        # Номера поколений не повторяются: забытый сброс не оживит записи старого поколения
+        self._generations.pop(user_id, None)
+        self._generations[user_id] = (next(self._generation_counter), now)
+        self._forget_generations(now)
+
+    def _forget_generations(self, now: float):
+        """Забыть сбросы старше ttl: записи, посчитанные до них, уже истекли"""
+        while self._generations:
+            user_id, (_, invalidated_at) = next(iter(self._generations.items()))
+            if invalidated_at > now - self.ttl:
+                break
+            del self._generations[user_id]
+
+    def clear(self):
+        self._entries.clear()
+        self._generations.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self._entries.evictions,
+            "hit_rate": (self.hits + self.coalesced) / requests if requests else 0.0,
+            "inflight": len(self._inflight),
+            "generations": len(self._generations),
+        }
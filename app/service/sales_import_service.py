@@ -0,0 +1,237 @@
+import asyncio
+import csv
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# Допустимые заголовки колонок файла -> поле продажи
+COLUMN_ALIASES = {
+    "product": "product",
+    "товар": "product",
+    "название": "product",
+    "наименование": "product",
+    "quantity": "quantity",
+    "количество": "quantity",
+    "кол-во": "quantity",
+    "unit_price": "unit_price",
+    "price": "unit_price",
+    "цена": "unit_price",
+    "sale_date": "sale_date",
+    "date": "sale_date",
+    "дата": "sale_date",
+    "payment_method": "payment_method",
+    "оплата": "payment_method",
+    "customer_info": "customer_info",
+    "клиент": "customer_info",
+}
+
+REQUIRED_COLUMNS = ("product", "quantity")
+
+
+def read_chunks(path: str, file_type: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Потоково читает CSV/XLSX кусками по chunk_size строк"""
+    if file_type == "csv":
+        # Разделитель (',' или ';' из Excel) определяем по началу файла, дальше читает быстрый C-парсер
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            sample = f.read(64 * 1024)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+        except csv.Error:
+            delimiter = ","
+        yield from pd.read_csv(path, chunksize=chunk_size, sep=delimiter, encoding="utf-8-sig")
+        return
+
+    if file_type in ("xlsx", "xlsm"):
+        # read_excel читает лист целиком, поэтому идем по строкам openpyxl в режиме read_only
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+        return
+
+    raise ValueError(f"Неподдерживаемый формат файла: {file_type}")
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Приводит колонки к полям продажи и отбрасывает некорректные строки"""
+    chunk = chunk.rename(columns=lambda column: COLUMN_ALIASES.get(str(column).strip().lower(), column))
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+
+    chunk = chunk.copy()
+    chunk["product"] = chunk["product"].astype("string").str.strip()
+    chunk["quantity"] = pd.to_numeric(chunk["quantity"], errors="coerce")
+    # Количество — целое положительное: дробное (0.5) не округляем молча, а отбрасываем строку
+    whole_quantity = chunk["quantity"] > 0
+    whole_quantity &= chunk["quantity"] % 1 == 0
+    chunk["unit_price"] = pd.to_numeric(chunk["unit_price"], errors="coerce") if "unit_price" in chunk else None
+    chunk["sale_date"] = (
+        pd.to_datetime(chunk["sale_date"], errors="coerce", dayfirst=True) if "sale_date" in chunk else pd.NaT
+    )
+    chunk = chunk[chunk["product"].notna() & (chunk["product"] != "") & whole_quantity]
+    return chunk.astype({"quantity": "int64"})
+
+
+class SalesImportService:
+    """Массовый импорт продаж из CSV/XLSX: по чанку — один запрос товаров и пачка вставок"""
+
+    def __init__(self, db, chunk_size: int = 5000, report_cache=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.report_cache = report_cache
+
+    async def import_file(self, user_id: int, path: str, file_type: str) -> Dict[str, Any]:
+        """Импортировать файл продаж; возвращает статистику и скорость в строках/с"""
+        started = time.perf_counter()
+        stats = {
+            "imported": 0, "skipped": 0, "out_of_stock": 0,
+            "unknown_products": set(), "out_of_stock_products": set(), "chunks": 0
+        }
+
+        chunks = read_chunks(path, file_type.lower(), self.chunk_size)
+        try:
+            while True:
+                # Разбор файла — CPU-работа, не держим на ней event loop
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+
+                total_rows = len(chunk)
+                chunk = await asyncio.to_thread(normalize_chunk, chunk)
+                stats["skipped"] += total_rows - len(chunk)
+                if not chunk.empty:
+                    await self._import_chunk(user_id, chunk, stats)
+                stats["chunks"] += 1
+        finally:
+            # Чанки коммитятся по отдельности: отчеты сбрасываем, даже если импорт оборвался на середине
+            if self.report_cache is not None and stats["imported"]:
+                self.report_cache.invalidate_user(user_id)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Импорт продаж user_id={user_id}: {stats['imported']} строк за {elapsed:.1f} с "
+            f"({stats['imported'] / elapsed if elapsed else 0:.0f} строк/с)"
+        )
+        return {
+            "imported": stats["imported"],
+            "skipped": stats["skipped"],
+            "out_of_stock": stats["out_of_stock"],
+            "unknown_products": sorted(stats["unknown_products"]),
+            "out_of_stock_products": sorted(stats["out_of_stock_products"]),
+            "chunks": stats["chunks"],
+            "elapsed_seconds": elapsed,
+            "rows_per_second": stats["imported"] / elapsed if elapsed else 0.0,
+        }
+
+    async def _import_chunk(self, user_id: int, chunk: pd.DataFrame, stats: Dict[str, Any]):
+        now = datetime.now()
+
+        # Каждый чанк — отдельная транзакция: импорт большого файла не держит одну длинную транзакцию
+        async with self.db.get_uow() as uow:
+            # Товары чанка блокируются до commit: остаток, по которому отбираются строки,
+            # не изменится параллельной продажей
+            products = await uow.products.get_by_names(chunk["product"].unique().tolist(), user_id, lock=True)
+            remaining = {product.id: product.stock_quantity or 0 for product in products.values()}
+
+            sales = []
+            for row in chunk.itertuples(index=False):
+                product = products.get(row.product)
+                if product is None:
+                    stats["unknown_products"].add(row.product)
+                    stats["skipped"] += 1
+                    continue
+
+                quantity = int(row.quantity)
+                if quantity > remaining[product.id]:
+                    # Продажи без остатка не записываем: склад не уходит в минус, как и при create_sale
+                    stats["out_of_stock_products"].add(product.name)
+                    stats["out_of_stock"] += 1
+                    continue
+                remaining[product.id] -= quantity
+
+                unit_price = self._value(row.unit_price)
+                unit_price = float(unit_price) if unit_price is not None else product.selling_price
+                sale_date = self._value(row.sale_date)
+
+                sales.append({
+                    "user_id": user_id,
+                    "product_id": product.id,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
+                    "total_amount": quantity * unit_price,
+                    "sale_date": sale_date.to_pydatetime() if sale_date is not None else now,
+                    "payment_method": self._text(getattr(row, "payment_method", None)) or "cash",
+                    "customer_info": self._text(getattr(row, "customer_info", None)),
+                })
+
+            sold_quantities = defaultdict(int)
+            for sale in sales:
+                sold_quantities[sale["product_id"]] += sale["quantity"]
+
+            # Одно агрегированное списание на товар за чанк, с проверкой остатка в самом UPDATE
+            decremented = await uow.products.bulk_decrement_stock(user_id, sold_quantities)
+            rejected = set(sold_quantities) - decremented
+            if rejected:
+                # Под блокировкой сюда не попасть; если остаток все же изменился, строки товара отклоняются
+                names = {product.id: product.name for product in products.values()}
+                stats["out_of_stock_products"].update(names[product_id] for product_id in rejected)
+                stats["out_of_stock"] += sum(1 for sale in sales if sale["product_id"] in rejected)
+                sales = [sale for sale in sales if sale["product_id"] not in rejected]
+
+            await uow.sales.bulk_create(sales)
+            await uow.stock_movements.bulk_create([
+                {
+                    "user_id": user_id,
+                    "product_id": product_id,
+                    "type": "outgoing",
+                    "quantity": quantity,
+                    "reason": "Импорт продаж",
+                    "date": now,
+                } for product_id, quantity in sold_quantities.items() if product_id in decremented
+            ])
+            # Дневная сводка обновляется в той же транзакции, что и продажи чанка
+            purchase_prices = {product.id: product.purchase_price or 0.0 for product in products.values()}
+            await uow.sales_rollup.add_many([
+                {
+                    "user_id": user_id,
+                    "day": sale["sale_date"].date(),
+                    "product_id": sale["product_id"],
+                    "quantity": sale["quantity"],
+                    "revenue": sale["total_amount"],
+                    "cost": sale["quantity"] * purchase_prices[sale["product_id"]],
+                } for sale in sales
+            ])
+
+        stats["imported"] += len(sales)
+
+    @staticmethod
+    def _value(value: Any) -> Optional[Any]:
+        """NaN/NaT/None из pandas -> None"""
+        if value is None or pd.isna(value):
+            return None
+        return value
+
+    @classmethod
+    def _text(cls, value: Any) -> Optional[str]:
+        value = cls._value(value)
+        return str(value).strip() if value is not None else None
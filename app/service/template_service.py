@@ -9,12 +9,12 @@ class TemplateService:
 
     async def get_templates_by_category(self, category: str) -> List[Template]:
         """Получить шаблоны по категории"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.templates.find_by_category(category)
 
     async def get_all_templates(self) -> List[Template]:
         """Получить все шаблоны"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.templates.find_all()
 
     async def get_legal_templates(self) -> List[Template]:
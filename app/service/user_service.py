@@ -1,34 +1,71 @@
+import os
+import time
 from datetime import timedelta, datetime
 from typing import Optional, Dict, Any, List
 from app.database.unit_of_work import UnitOfWork
 from app.database.models import User
+from app.utils.lru import LRUCache
+from .activity_buffer import ActivityBuffer
 
 
 class UserService:
-    def __init__(self, db):
+    def __init__(self, db, activity_buffer: Optional[ActivityBuffer] = None,
+                 cache_size: Optional[int] = None, cache_ttl: Optional[float] = None):
         self.db = db
+        # Без буфера время активности пишется сразу, отдельным UPDATE на каждый вызов
+        self.activity_buffer = activity_buffer
+        # Профили, прочитанные недавно: повторные нажатия пользователя не ходят в базу.
+        # TTL ограничивает устаревание, если профиль поменял другой процесс (API)
+        self._profiles = LRUCache(cache_size or int(os.getenv("USER_CACHE_SIZE", "10000")))
+        self.cache_ttl = cache_ttl or float(os.getenv("USER_CACHE_TTL", "300"))
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _cached_profile(self, user_id: int) -> Optional[User]:
+        entry = self._profiles.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if time.monotonic() >= expires_at:
+            self._profiles.pop(user_id)
+            return None
+        return user
+
+    def _remember_profile(self, user: User):
+        self._profiles.set(user.id, (time.monotonic() + self.cache_ttl, user))
+
+    def invalidate_profile(self, user_id: int):
+        self._profiles.pop(user_id)
 
     async def get_or_create_user(self, user_id: int, username: str = None, first_name: str = None,
                                  last_name: str = None) -> User:
         """Получить или создать пользователя"""
-        async with self.db.get_uow() as uow:
-            user = await uow.users.find_by_id(user_id)
-
-            if not user:
-                user = User(
-                    id=user_id,
-                    username=username,
-                    first_name=first_name,
-                    last_name=last_name
-                )
-                user = await uow.users.save(user)
+        user = self._cached_profile(user_id)
+        # Telegram прислал другое имя — профиль в кэше устарел, обновляем через upsert
+        changed = user is not None and any(
+            value is not None and value != current
+            for value, current in ((username, user.username), (first_name, user.first_name),
+                                   (last_name, user.last_name))
+        )
+        if user is not None and not changed:
+            self.cache_hits += 1
+            if self.activity_buffer is not None:
+                self.activity_buffer.touch(user_id)
             else:
-                await uow.users.update_last_active(user_id)
-
+                async with self.db.get_uow() as uow:
+                    await uow.users.update_last_active(user_id)
             return user
 
+        self.cache_misses += 1
+        async with self.db.get_uow() as uow:
+            # Upsert заодно обновляет last_active — отметка в буфере не нужна
+            user = await uow.users.upsert(user_id, username, first_name, last_name)
+        self._remember_profile(user)
+        return user
+
     async def update_user_profile(self, user_id: int, **kwargs) -> Optional[User]:
         """Обновить профиль пользователя"""
+        self.invalidate_profile(user_id)
         async with self.db.get_uow() as uow:
             user = await uow.users.find_by_id(user_id)
             if not user:
@@ -40,38 +77,45 @@ class UserService:
                     setattr(user, key, value)
 
             user.last_active = datetime.now()
-            return user
+
+        # Кэшируем уже сохраненную версию (UoW закоммитил изменения на выходе)
+        self._remember_profile(user)
+        return user
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "size": len(self._profiles),
+            "maxsize": self._profiles.maxsize,
+            "evictions": self._profiles.evictions,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+        }
 
     async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
         """Получить статистику пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(replica=True) as uow:
             # Основная информация о пользователе
             user = await uow.users.find_by_id(user_id)
             if not user:
                 return {"error": "Пользователь не найден"}
 
-            # Статистика консультаций
-            conversations = await uow.conversations.find_by_user_id(user_id)
-
-            # Популярные категории
-            category_stats = {}
-            for conv in conversations:
-                category = conv.category or "general"
-                category_stats[category] = category_stats.get(category, 0) + 1
-
-            popular_categories = sorted(category_stats.items(), key=lambda x: x[1], reverse=True)[:3]
+            # Только агрегаты: тексты консультаций не читаются
+            summary = await uow.conversations.count_by_category(user_id, examples=0)
+            totals = await uow.conversations.activity_summary(user_id)
 
             # Активность за последние 7 дней
             week_ago = datetime.now() - timedelta(days=7)
-            recent_conversations = [c for c in conversations if c.created_at >= week_ago]
+            recent = await uow.conversations.count_by_category(user_id, start=week_ago, examples=0)
 
             return {
                 "user_id": user_id,
-                "consultations_count": len(conversations),
-                "recent_consultations": len(recent_conversations),
-                "popular_categories": popular_categories,
-                "first_consultation": conversations[0].created_at if conversations else None,
-                "last_consultation": conversations[-1].created_at if conversations else None,
+                "consultations_count": totals["total"],
+                "recent_consultations": sum(item["count"] for item in recent),
+                "popular_categories": [(item["category"], item["count"]) for item in summary[:3]],
+                "first_consultation": totals["first"],
+                "last_consultation": totals["last"],
                 "account_created": user.created_at,
                 "last_active": user.last_active,
                 "business_type": user.business_type,
@@ -80,31 +124,18 @@ class UserService:
 
     async def get_user_activity_trend(self, user_id: int, days: int = 30) -> Dict[str, Any]:
         """Получить тренд активности пользователя за указанный период"""
-        async with self.db.get_uow() as uow:
-            conversations = await uow.conversations.find_by_user_id(user_id)
-
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-
-            daily_activity = {}
-            for conv in conversations:
-                if start_date <= conv.created_at <= end_date:
-                    date_str = conv.created_at.strftime('%Y-%m-%d')
-                    daily_activity[date_str] = daily_activity.get(date_str, 0) + 1
-
-            # Заполняем пропущенные дни нулями
-            for i in range(days + 1):
-                date_str = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-                if date_str not in daily_activity:
-                    daily_activity[date_str] = 0
-
-            sorted_activity = dict(sorted(daily_activity.items()))
-
-            return {
-                "period_days": days,
-                "total_consultations": sum(daily_activity.values()),
-                "daily_activity": sorted_activity,
-                "most_active_day": max(sorted_activity.items(), key=lambda x: x[1]) if sorted_activity else None,
-                "average_per_day": sum(sorted_activity.values()) / len(sorted_activity) if sorted_activity else 0
-            }
-
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        async with self.db.get_uow(replica=True) as uow:
+            # Группировка по дням и заполнение пропусков нулями — в базе (generate_series)
+            counts = await uow.conversations.count_by_day(user_id, start_date, end_date)
+
+        sorted_activity = {day.strftime('%Y-%m-%d'): count for day, count in counts}
+
+        return {
+            "period_days": days,
+            "total_consultations": sum(sorted_activity.values()),
+            "daily_activity": sorted_activity,
+            "most_active_day": max(sorted_activity.items(), key=lambda x: x[1]) if sorted_activity else None,
+            "average_per_day": sum(sorted_activity.values()) / len(sorted_activity) if sorted_activity else 0
+        }
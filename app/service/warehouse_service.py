@@ -1,15 +1,55 @@
 from collections import defaultdict
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from functools import wraps
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
 
 from app.database.unit_of_work import UnitOfWork
-from app.database.models import Product, Sale
+from app.database.models import Product
+from .report_cache import ReportCache
+
+
+def invalidates_reports(method):
+    """После успешной записи сбрасывает кэш отчетов пользователя.
+
+    Сброс идет после выхода из UoW, то есть после commit: иначе параллельный
+    отчет мог бы закэшировать данные до записи.
+    """
+    @wraps(method)
+    async def wrapper(self, user_id: int, *args, **kwargs):
+        result = await method(self, user_id, *args, **kwargs)
+        if self.report_cache is not None and result.get("success"):
+            self.report_cache.invalidate_user(user_id)
+        return result
+    return wrapper
 
 
 class WarehouseService:
-    def __init__(self, db):
+    def __init__(self, db, report_cache: Optional[ReportCache] = None):
         self.db = db
-
+        self.report_cache = report_cache
+
+    async def _cached(self, user_id: int, report: str, period: Optional[int], build):
+        if self.report_cache is None:
+            return await build()
+        return await self.report_cache.get_or_compute(user_id, report, period, build)
+
+    def _report_uow(self) -> UnitOfWork:
+        """UoW для построения отчета.
+
+        Кэшируемые отчеты читаются с primary: отстающая реплика сразу после сброса кэша
+        закрепила бы в нем данные до записи на весь ttl. Без кэша — чтение с реплики.
+        """
+        if self.report_cache is not None:
+            return self.db.get_uow(read_only=True)
+        return self.db.get_uow(replica=True)
+
+    @staticmethod
+    def _period_days(period_days: int) -> Tuple[date, date]:
+        """Календарные дни отчета "за N дней": N дней, включая сегодня (границы включительно)"""
+        end_day = date.today()
+        return end_day - timedelta(days=max(period_days, 1) - 1), end_day
+
+    @invalidates_reports
     async def create_product(self, user_id: int, product_data: dict) -> Dict[str, Any]:
         async with self.db.get_uow() as uow:
             product_data["user_id"] = user_id
@@ -20,28 +60,41 @@ class WarehouseService:
                 "message": f"✅ Товар добавлен: {product.name}"
             }
 
+    @invalidates_reports
     async def create_sale(self, user_id: int, sale_data: dict) -> Dict[str, Any]:
+        if sale_data["quantity"] <= 0:
+            return {
+                "success": False,
+                "message": "❌ Количество должно быть больше нуля"
+            }
+
         async with self.db.get_uow() as uow:
-            # Получаем товар с проверкой user_id
-            product = await uow.products.get_by_id(sale_data["product_id"], user_id)
+            # Проверка остатка и списание одним условным UPDATE в той же транзакции, что и продажа
+            product = await uow.products.decrement_stock(sale_data["product_id"], user_id, sale_data["quantity"])
             if not product:
+                stock_quantity = await uow.products.get_stock_quantity(sale_data["product_id"], user_id)
+                if stock_quantity is None:
+                    return {
+                        "success": False,
+                        "message": "❌ Товар не найден"
+                    }
                 return {
                     "success": False,
-                    "message": "❌ Товар не найден"
-                }
-
-            if product.stock_quantity < sale_data["quantity"]:
-                return {
-                    "success": False,
-                    "message": f"❌ Недостаточно товара. В наличии: {product.stock_quantity} шт"
+                    "message": f"❌ Недостаточно товара. В наличии: {stock_quantity} шт"
                 }
 
             sale_data["total_amount"] = sale_data["quantity"] * sale_data["unit_price"]
             sale_data["user_id"] = user_id
-            sale = await uow.sales.create(sale_data)  # await
-
-            new_stock = product.stock_quantity - sale_data["quantity"]
-            await uow.products.update_stock(product.id, user_id, new_stock)
+            sale = await uow.sales.create(sale_data)
+            # Дневной агрегат обновляется в той же транзакции, что и сама продажа
+            await uow.sales_rollup.add(
+                user_id=user_id,
+                day=sale.sale_date.date(),
+                product_id=sale.product_id,
+                quantity=sale.quantity,
+                revenue=sale.total_amount,
+                cost=sale.quantity * (product.purchase_price or 0.0)
+            )
 
             return {
                 "success": True,
@@ -49,25 +102,33 @@ class WarehouseService:
                 "message": f"✅ Продажа зафиксирована: {sale.quantity} шт на сумму {sale.total_amount} руб"
             }
 
+    @invalidates_reports
     async def create_stock_movement(self, user_id: int, movement_data: dict) -> Dict[str, Any]:
+        if movement_data["quantity"] <= 0:
+            return {
+                "success": False,
+                "message": "❌ Количество должно быть больше нуля"
+            }
+
         async with self.db.get_uow() as uow:
-            product = await uow.products.get_by_id(movement_data["product_id"], user_id)
+            delta = movement_data["quantity"] if movement_data.get("type") == "incoming" else -movement_data["quantity"]
+            # Расход проверяется и списывается тем же условным UPDATE, что и продажа
+            product = await uow.products.adjust_stock(movement_data["product_id"], user_id, delta)
             if not product:
+                stock_quantity = await uow.products.get_stock_quantity(movement_data["product_id"], user_id)
+                if stock_quantity is None:
+                    return {
+                        "success": False,
+                        "message": "❌ Товар не найден"
+                    }
                 return {
                     "success": False,
-                    "message": "❌ Товар не найден"
+                    "message": f"❌ Недостаточно товара. В наличии: {stock_quantity} шт"
                 }
 
             movement_data["user_id"] = user_id
             movement = await uow.stock_movements.create(movement_data)
 
-            if movement.type == "incoming":
-                new_stock = product.stock_quantity + movement.quantity
-            else:
-                new_stock = product.stock_quantity - movement.quantity
-
-            await uow.products.update_stock(product.id, user_id, new_stock)
-
             return {
                 "success": True,
                 "data": movement,
@@ -75,76 +136,62 @@ class WarehouseService:
             }
 
     async def get_warehouse_report(self, user_id: int) -> Dict[str, Any]:
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(replica=True) as uow:
             products = await uow.products.get_all(user_id)
             low_stock = await uow.products.get_low_stock(user_id)
-            week_ago = datetime.now() - timedelta(days=7)
-            recent_sales = await uow.sales.get_by_period(user_id, week_ago, datetime.now())
-            total_revenue = sum(sale.total_amount for sale in recent_sales)
+            today = date.today()
+            # Неделя — семь календарных дней, включая сегодня
+            week_totals = await uow.sales_rollup.get_period_totals(user_id, today - timedelta(days=6), today)
 
             return {
                 "total_products": len(products),
                 "low_stock_count": len(low_stock),
                 "low_stock_items": low_stock,
-                "weekly_revenue": total_revenue,
-                "total_sales_week": len(recent_sales)
+                "weekly_revenue": week_totals["revenue"],
+                "total_sales_week": week_totals["count"]
             }
 
     async def get_sales_report(self, user_id: int, period_days: int = 30) -> Dict[str, Any]:
         """Отчет по продажам за период для конкретного пользователя"""
-        async with self.db.get_uow() as uow:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=period_days)
+        return await self._cached(user_id, "sales", period_days, lambda: self._build_sales_report(user_id, period_days))
 
-            sales = await uow.sales.get_by_period(user_id, start_date, end_date)
-            products = await uow.products.get_all(user_id)
+    async def _build_sales_report(self, user_id: int, period_days: int) -> Dict[str, Any]:
+        async with self._report_uow() as uow:
+            start_day, end_day = self._period_days(period_days)
+
+            # Агрегаты читаются из дневной сводки: O(дни × товары) строк вместо O(продажи)
+            totals = await uow.sales_rollup.get_period_totals(user_id, start_day, end_day)
+            top_products = await uow.sales_rollup.get_top_products(user_id, start_day, end_day, limit=5)
+            daily_sales = await uow.sales_rollup.get_daily_revenue(user_id, start_day, end_day)
+            # Последние продажи — за те же календарные дни, что и агрегаты
+            recent_sales = await uow.sales.get_recent_with_product_names(
+                user_id, datetime.combine(start_day, time.min), datetime.now(), limit=10
+            )
 
-            # Статистика по продажам
-            total_revenue = sum(sale.total_amount for sale in sales)
-            total_quantity = sum(sale.quantity for sale in sales)
-            total_sales = len(sales)
-            avg_sale_amount = total_revenue / total_sales if sales else 0
-
-            # Топ товаров
-            product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0, "product": None})
-            for sale in sales:
-                product_sales[sale.product_id]["quantity"] += sale.quantity
-                product_sales[sale.product_id]["revenue"] += sale.total_amount
-                product_sales[sale.product_id]["product"] = sale.product
-
-            top_products = sorted(
-                product_sales.values(),
-                key=lambda x: x["revenue"],
-                reverse=True
-            )[:5]
-
-            # Динамика по дням
-            daily_sales = defaultdict(float)
-            for sale in sales:
-                date_str = sale.sale_date.strftime("%Y-%m-%d")
-                daily_sales[date_str] += sale.total_amount
+            total_revenue = totals["revenue"]
+            total_sales = totals["count"]
+            avg_sale_amount = total_revenue / total_sales if total_sales else 0
 
             return {
                 "period": f"Последние {period_days} дней",
                 "total_revenue": total_revenue,
-                "total_quantity": total_quantity,
+                "total_quantity": totals["quantity"],
                 "total_sales": total_sales,
                 "avg_sale_amount": avg_sale_amount,
-                "top_products": top_products,
-                "daily_sales": dict(daily_sales),
-                "sales_data": [
-                    {
-                        "date": sale.sale_date.strftime("%Y-%m-%d %H:%M"),
-                        "product": sale.product.name,
-                        "quantity": sale.quantity,
-                        "amount": sale.total_amount
-                    } for sale in sales[-10:]  # Последние 10 продаж
-                ] if sales else []
+                "top_products": [
+                    {"quantity": quantity, "revenue": revenue, "product": product}
+                    for product, quantity, revenue in top_products
+                ],
+                "daily_sales": daily_sales,
+                "sales_data": recent_sales
             }
 
     async def get_stock_report(self, user_id: int) -> Dict[str, Any]:
         """Отчет по остаткам товара для конкретного пользователя"""
-        async with self.db.get_uow() as uow:
+        return await self._cached(user_id, "stock", None, lambda: self._build_stock_report(user_id))
+
+    async def _build_stock_report(self, user_id: int) -> Dict[str, Any]:
+        async with self._report_uow() as uow:
             products = await uow.products.get_all(user_id)
             low_stock = await uow.products.get_low_stock(user_id)
 
@@ -199,18 +246,24 @@ class WarehouseService:
 
     async def get_financial_overview(self, user_id: int, period_days: int = 30) -> Dict[str, Any]:
         """Финансовый обзор для конкретного пользователя"""
-        async with self.db.get_uow() as uow:
+        return await self._cached(
+            user_id, "financial", period_days, lambda: self._build_financial_overview(user_id, period_days)
+        )
+
+    async def _build_financial_overview(self, user_id: int, period_days: int) -> Dict[str, Any]:
+        async with self._report_uow() as uow:
             # Период для анализа
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=period_days)
+            start_day, end_day = self._period_days(period_days)
 
-            # Данные о продажах
-            sales = await uow.sales.get_by_period(user_id, start_date, end_date)
+            # Выручка и себестоимость — из дневной сводки, без загрузки строк продаж
+            totals = await uow.sales_rollup.get_period_totals(user_id, start_day, end_day)
+            category_performance = await uow.sales_rollup.get_category_totals(user_id, start_day, end_day)
             products = await uow.products.get_all(user_id)
 
             # Расчеты
-            total_revenue = sum(sale.total_amount for sale in sales)
-            total_cost = sum(sale.quantity * sale.product.purchase_price for sale in sales)
+            total_revenue = totals["revenue"]
+            total_cost = totals["cost"]
+            total_sales = totals["count"]
             total_profit = total_revenue - total_cost
             profit_margin = (total_profit / total_revenue * 100) if total_revenue else 0
 
@@ -223,15 +276,6 @@ class WarehouseService:
             avg_daily_revenue = total_revenue / period_days if period_days > 0 else 0
             forecast_next_period = avg_daily_revenue * period_days
 
-            # Эффективность по категориям
-            category_performance = defaultdict(lambda: {"revenue": 0, "cost": 0, "profit": 0})
-            for sale in sales:
-                category = sale.product.category
-                cost = sale.quantity * sale.product.purchase_price
-                category_performance[category]["revenue"] += sale.total_amount
-                category_performance[category]["cost"] += cost
-                category_performance[category]["profit"] += (sale.total_amount - cost)
-
             return {
                 "period": f"Последние {period_days} дней",
                 "revenue": {
@@ -250,11 +294,11 @@ class WarehouseService:
                     "potential_profit": potential_profit
                 },
                 "efficiency": {
-                    "total_sales": len(sales),
-                    "avg_sale_amount": total_revenue / len(sales) if sales else 0,
+                    "total_sales": total_sales,
+                    "avg_sale_amount": total_revenue / total_sales if total_sales else 0,
                     "stock_turnover": total_revenue / current_stock_value if current_stock_value else 0
                 },
-                "category_performance": dict(category_performance),
+                "category_performance": category_performance,
                 "key_metrics": [
                     {"name": "Выручка", "value": total_revenue, "format": "currency"},
                     {"name": "Прибыль", "value": total_profit, "format": "currency"},
@@ -269,15 +313,15 @@ class WarehouseService:
     # Дополнительные методы
     async def get_product_by_name(self, user_id: int, product_name: str) -> Optional[Product]:
         """Получить товар по имени для конкретного пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.products.get_by_name(product_name, user_id)
 
     async def get_all_products(self, user_id: int) -> List[Product]:
         """Получить все товары пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.products.get_all(user_id)
 
     async def get_low_stock_products(self, user_id: int) -> List[Product]:
         """Получить товары с низким запасом для пользователя"""
-        async with self.db.get_uow() as uow:
+        async with self.db.get_uow(read_only=True) as uow:
             return await uow.products.get_low_stock(user_id)
\ No newline at end of file
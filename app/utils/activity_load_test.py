@@ -0,0 +1,112 @@
+"""Шторм нажатий: сколько записей в users дает обновление last_active с ActivityBuffer и без него.
+
+Запуск: python -m app.utils.activity_load_test --users 10000 --taps 3
+        python -m app.utils.activity_load_test --database-url postgresql://...  (по умолчанию — временный SQLite)
+
+Каждый пользователь нажимает кнопку taps раз; каждое нажатие — UserService.get_or_create_user,
+как в обработчиках бота. Считаются UPDATE-запросы к users и обновленные строки.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, event, insert
+
+from app.database.db import Database
+from app.database.models import Base, User
+from app.service.activity_buffer import ActivityBuffer
+from app.service.user_service import UserService
+
+
+# Синтетические пользователи — вне диапазона ID Telegram, удаляются после прогона
+ID_BASE = 9_000_000_000_000
+
+
+class WriteCounter:
+    """Считает UPDATE к users на уровне драйвера (executemany — один запрос)"""
+
+    def __init__(self, database: Database):
+        self.updates = 0
+        self.rows = 0
+        event.listen(database.engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE USERS"):
+            self.updates += 1
+            self.rows += len(parameters) if executemany else 1
+
+
+async def storm(db: Database, users: int, taps: int, concurrency: int,
+                buffer: Optional[ActivityBuffer]) -> Dict[str, Any]:
+    service = UserService(db, activity_buffer=buffer)
+    counter = WriteCounter(db)
+    clicks = [ID_BASE + index for index in range(users) for _ in range(taps)]
+    random.shuffle(clicks)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def click(user_id: int):
+        async with semaphore:
+            await service.get_or_create_user(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[click(user_id) for user_id in clicks])
+    if buffer is not None:
+        # Остановка бота: остаток буфера записывается при закрытии контейнера
+        await buffer.close()
+    elapsed = time.perf_counter() - started
+    event.remove(db.engine.sync_engine, "before_cursor_execute", counter._on_execute)
+
+    return {
+        "clicks": len(clicks),
+        "elapsed_s": round(elapsed, 2),
+        "clicks_per_s": round(len(clicks) / elapsed),
+        "update_statements": counter.updates,
+        "updated_rows": counter.rows,
+        "write_statements_per_s": round(counter.updates / elapsed, 1),
+    }
+
+
+async def main(database_url: Optional[str], users: int, taps: int, concurrency: int, flush_interval: float):
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite+aiosqlite:///{path}"
+
+    db = Database(database_url)
+    synthetic = User.id >= ID_BASE
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+            await conn.execute(delete(User).where(synthetic))
+            await conn.execute(insert(User), [
+                {"id": ID_BASE + index, "username": f"load{index}"} for index in range(users)
+            ])
+
+        print(f"Пользователей: {users}, нажатий на пользователя: {taps}")
+        direct = await storm(db, users, taps, concurrency, buffer=None)
+        print(f"{'без буфера':12} {direct}")
+        buffered = await storm(db, users, taps, concurrency, buffer=ActivityBuffer(db, flush_interval=flush_interval))
+        print(f"{'ActivityBuffer':12} {buffered}")
+        print(f"UPDATE-запросов меньше в {direct['update_statements'] / max(buffered['update_statements'], 1):.0f} раз")
+    finally:
+        async with db.engine.begin() as conn:
+            await conn.execute(delete(User).where(synthetic))
+        await db.dispose()
+        if path:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Шторм нажатий и запись User.last_active")
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--taps", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.users, args.taps, args.concurrency, args.flush_interval))
@@ -0,0 +1,110 @@
+"""Память на один вызов списка истории: полные строки Conversation против проекции с превью.
+
+Запуск: python -m app.utils.conversation_memory_benchmark --conversations 2000 --text-kb 16 --limit 10
+
+Создает во временном SQLite пользователя с длинной историей и для каждого limit сравнивает
+пик памяти (tracemalloc) и время запроса: как было (все колонки, включая тексты) и
+find_summaries_by_user_id. Диалоги заведены как до переноса реплик: первая реплика и в
+колонках conversations, и в conversation_messages.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import undefer
+
+from app.database.db import Database
+from app.database.models import Base, Conversation, ConversationMessage, User
+
+
+async def measure(db: Database, query) -> tuple:
+    """Пик памяти (КБ) и время (мс) одного вызова, как в обработчике: своя UoW на вызов"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    async with db.get_uow(read_only=True) as uow:
+        rows = await query(uow)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), peak / 1024, elapsed * 1000
+
+
+async def main(conversations: int, text_kb: int, limits):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db = Database(f"sqlite+aiosqlite:///{path}")
+    user_id = 1
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, Conversation.__table__, ConversationMessage.__table__
+            ])
+            await conn.execute(insert(User), [{"id": user_id, "username": "heavy"}])
+            now = datetime.utcnow()
+            text = "Вопрос о договоре поставки и штрафах. " * (text_kb * 1024 // 40)
+            await conn.execute(insert(Conversation), [
+                {
+                    "id": index + 1,
+                    "user_id": user_id,
+                    "category": ("legal", "marketing", "analytics")[index % 3],
+                    "user_message": f"USER: {index} {text}",
+                    "bot_response": f"BOT: {index} {text}",
+                    "message_length": len(text),
+                    "created_at": now - timedelta(minutes=index),
+                    "last_message_at": now - timedelta(minutes=index),
+                }
+                for index in range(conversations)
+            ])
+            await conn.execute(insert(ConversationMessage), [
+                {
+                    "conversation_id": index + 1,
+                    "user_message": f"{index} {text}",
+                    "bot_response": f"{index} {text}",
+                    "created_at": now - timedelta(minutes=index),
+                }
+                for index in range(conversations)
+            ])
+
+        print(f"Диалогов: {conversations}, текст вопроса и ответа: по {text_kb} КБ")
+
+        # Прогрев: компиляция запросов и пул соединений не должны попасть в первый замер
+        async with db.get_uow(read_only=True) as uow:
+            await uow.conversations.find_summaries_by_user_id(user_id, 1)
+            await uow.conversations.find_by_user_id(user_id, 1)
+
+        for limit in limits:
+            async def full_rows(uow, limit=limit):
+                # Запрос до изменения: строки целиком, с обоими текстами
+                result = await uow.session.execute(
+                    select(Conversation)
+                    .options(undefer(Conversation.user_message), undefer(Conversation.bot_response))
+                    .where(Conversation.user_id == user_id)
+                    .order_by(Conversation.created_at.desc())
+                    .limit(limit)
+                )
+                return result.scalars().all()
+
+            async def summaries(uow, limit=limit):
+                return await uow.conversations.find_summaries_by_user_id(user_id, limit)
+
+            before = await measure(db, full_rows)
+            after = await measure(db, summaries)
+            print(f"limit={limit:<5} полные строки: {before[1]:9.0f} КБ {before[2]:7.1f} мс | "
+                  f"проекция: {after[1]:7.0f} КБ {after[2]:6.1f} мс | память меньше в {before[1] / after[1]:.0f} раз")
+    finally:
+        await db.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Память на вызов истории диалогов")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--text-kb", type=int, default=16)
+    parser.add_argument("--limit", type=int, nargs="+", default=[10, 100, 200])
+    args = parser.parse_args()
+    asyncio.run(main(args.conversations, args.text_kb, args.limit))
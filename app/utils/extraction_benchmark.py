@@ -0,0 +1,102 @@
+"""Замер извлечения текста из больших PDF: в цикле событий и в DocumentExtractor.
+
+Запуск: python -m app.utils.extraction_benchmark --pages 100 --files 8
+
+Генерирует PDF с текстом на каждой странице и параллельно извлекает текст из files копий.
+Печатает время и максимальную задержку цикла событий (на сколько "замирал" бы бот).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.service.document_extraction import DocumentExtractor, extract_text_sync
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 45):
+    """Минимальный PDF с текстом (шрифт Helvetica) без сторонних библиотек"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [
+            f"({'Section %d.%d Contract clause text: the parties agree to terms' % (page + 1, line)}) Tj 0 -14 Td"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 40 780 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+async def measure(label: str, files: int, extract):
+    """Запустить files извлечений и следить за задержкой цикла событий тикером раз в 10 мс"""
+    max_lag = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    texts = await asyncio.gather(*[extract() for _ in range(files)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    print(f"{label:28} {elapsed:6.2f} с, {elapsed / files:5.2f} с/файл, "
+          f"макс. задержка цикла {max_lag * 1000:7.0f} мс, символов {len(texts[0]):,}")
+
+
+async def main(pages: int, files: int, workers: int):
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        write_text_pdf(path, pages)
+        print(f"PDF: {pages} страниц, {os.path.getsize(path) / 1024:.0f} КБ, файлов: {files}")
+
+        async def inline():
+            # Так выглядело бы извлечение прямо в обработчике
+            return extract_text_sync(path, "pdf", 600, 10_000_000)
+
+        await measure("в цикле событий", files, inline)
+
+        extractor = DocumentExtractor(max_workers=workers, timeout=600)
+        try:
+            # Первый вызов поднимает процессы пула — не включаем его в замер
+            await extractor.extract(path, "pdf")
+            await measure(f"пул процессов ({extractor.max_workers})", files, lambda: extractor.extract(path, "pdf"))
+        finally:
+            await extractor.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер извлечения текста из PDF")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="DOC_EXTRACT_WORKERS")
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.files, args.workers))
@@ -0,0 +1,122 @@
+"""Локальный OpenAI-совместимый сервер-заглушка для проверки HTTPLLMProvider без внешнего API.
+
+Запуск: python -m app.utils.fake_llm_server --port 8081 --latency 0.5 --failure-rate 0.1
+Затем: LLM_BASE_URL=http://127.0.0.1:8081/v1
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeLLMServer:
+    """Отвечает на /v1/chat/completions и /v1/completions фиксированным JSON с задержкой и долей ошибок 503.
+
+    При "stream": true отдает ответ SSE-кусками по chunk_size символов с паузой chunk_delay.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, response: Optional[dict] = None,
+                 chunk_size: int = 16, chunk_delay: float = 0.05):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.response = response or {
+            "title": "Тестовый ответ",
+            "content": "Текст, сгенерированный тестовым сервером",
+        }
+        self.requests = 0
+        self.batched_prompts = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/completions", self.completions)
+        return app
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return web.json_response({"error": "overloaded"}, status=503)
+
+        content = json.dumps(self.response, ensure_ascii=False)
+        if payload.get("stream"):
+            return await self._stream(request, content)
+
+        return web.json_response({
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+        })
+
+    async def completions(self, request: web.Request) -> web.Response:
+        """Пакетный эндпоинт: prompt — строка или список, по ответу на каждый элемент"""
+        self.requests += 1
+        payload = await request.json()
+        prompts = payload["prompt"] if isinstance(payload["prompt"], list) else [payload["prompt"]]
+        self.batched_prompts += len(prompts)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return web.json_response({"error": "overloaded"}, status=503)
+
+        content = json.dumps(self.response, ensure_ascii=False)
+        return web.json_response({
+            "object": "text_completion",
+            "choices": [
+                {"index": index, "text": content, "finish_reason": "stop"} for index in range(len(prompts))
+            ],
+        })
+
+    async def _stream(self, request: web.Request, content: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for start in range(0, len(content), self.chunk_size):
+            chunk = {"choices": [{"index": 0, "delta": {"content": content[start:start + self.chunk_size]}}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запустить в текущем event loop; возвращает base_url для HTTPLLMProvider"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}/v1"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Тестовый OpenAI-совместимый сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="пауза между SSE-кусками, с")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, failure_rate=args.failure_rate, chunk_delay=args.chunk_delay)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Проверка планов: горячие запросы по (user_id, время) идут по составным индексам, а не полным сканом.
+
+Запуск: python -m app.utils.index_usage_check --database-url postgresql://...  (база после alembic upgrade head)
+        python -m app.utils.index_usage_check  (временный SQLite со схемой из models)
+
+Каждый запрос берется из репозитория как есть: вызов перехватывается на уровне драйвера, и тот же
+SQL с теми же параметрами отправляется в EXPLAIN. В Postgres план строится с enable_seqscan = off:
+на почти пустой базе планировщик иначе честно выбрал бы полный скан, а так Seq Scan в плане
+означает, что подходящего индекса нет. Код выхода 1 — хотя бы один запрос не попал в свой индекс.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.database.db import Database
+from app.database.models import Base
+
+USER_ID = 1
+SQLITE_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+# (запрос, ожидаемый индекс, вызов репозитория)
+CHECKS = [
+    ("продажи за период", "ix_sales_user_id_sale_date",
+     lambda uow, now: uow.sales.get_by_period(USER_ID, now - timedelta(days=30), now)),
+    ("последние продажи с товарами", "ix_sales_user_id_sale_date",
+     lambda uow, now: uow.sales.get_recent_with_product_names(USER_ID, now - timedelta(days=30), now)),
+    ("движения склада за период", "ix_stock_movements_user_id_date",
+     lambda uow, now: uow.stock_movements.get_by_period(USER_ID, now - timedelta(days=30), now)),
+    ("активный диалог", "ix_conversations_user_id_last_message_at",
+     lambda uow, now: uow.conversations.find_last_active_id(USER_ID, now - timedelta(hours=12))),
+    ("страница истории диалогов", "ix_conversations_user_id_created_at_id",
+     lambda uow, now: uow.conversations.find_summaries_page(USER_ID, 10, older_than=(now, 2 ** 31 - 1))),
+    ("маркетинговые идеи", "ix_marketing_ideas_user_id_created_at",
+     lambda uow, now: uow.marketing_ideas.get_by_user_id(USER_ID)),
+    ("бизнес-данные по типу", "ix_business_data_user_id_data_type_created_at",
+     lambda uow, now: uow.business_data.find_by_user_and_type(USER_ID, "sales")),
+    ("товар по названию", "ix_products_user_id_name",
+     lambda uow, now: uow.products.get_by_name("Товар", USER_ID)),
+    ("товары с низким запасом", "ix_products_user_id_low_stock",
+     lambda uow, now: uow.products.get_low_stock(USER_ID)),
+    ("текст документа по хэшу", "uq_documents_user_id_content_hash",
+     lambda uow, now: uow.documents.get_text_by_hash(USER_ID, "0" * 64)),
+]
+
+
+async def capture_statement(db: Database, call, now: datetime) -> Tuple[str, object]:
+    """Первый SQL-запрос, который отправляет вызов репозитория, и его параметры"""
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    engine = db.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        async with db.get_uow(read_only=True) as uow:
+            await call(uow, now)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return captured[0]
+
+
+def _postgres_plan_indexes(node: dict, indexes: Set[str], seq_scans: List[str]):
+    if "Index Name" in node:
+        indexes.add(node["Index Name"])
+    if node.get("Node Type") == "Seq Scan":
+        seq_scans.append(node.get("Relation Name", "?"))
+    for child in node.get("Plans", []):
+        _postgres_plan_indexes(child, indexes, seq_scans)
+
+
+async def explain(db: Database, statement: str, parameters) -> Tuple[Set[str], List[str], str]:
+    """Индексы в плане, таблицы с полным сканом и сам план текстом"""
+    indexes, seq_scans = set(), []
+    async with db.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            _postgres_plan_indexes(plan[0]["Plan"], indexes, seq_scans)
+            text = json.dumps(plan[0]["Plan"], ensure_ascii=False)
+        else:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            details = [row[-1] for row in result.all()]
+            for detail in details:
+                indexes.update(SQLITE_INDEX_RE.findall(detail))
+                if detail.startswith("SCAN ") and "INDEX" not in detail:
+                    seq_scans.append(detail.split()[1])
+            text = "; ".join(details)
+        await conn.rollback()
+    return indexes, seq_scans, text
+
+
+async def main(database_url: Optional[str], verbose: bool) -> int:
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite+aiosqlite:///{path}"
+
+    db = Database(database_url)
+    failures = 0
+    try:
+        if path:
+            async with db.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+        now = datetime.now()
+        for name, expected, call in CHECKS:
+            statement, parameters = await capture_statement(db, call, now)
+            indexes, seq_scans, plan = await explain(db, statement, parameters)
+            ok = expected in indexes
+            failures += not ok
+            status = "OK  " if ok else "FAIL"
+            print(f"{status} {name:32} ожидается {expected}; в плане: {', '.join(sorted(indexes)) or '—'}"
+                  + (f"; полный скан: {', '.join(seq_scans)}" if seq_scans else ""))
+            if verbose or not ok:
+                print(f"     {plan}")
+    finally:
+        await db.dispose()
+        if path:
+            os.remove(path)
+
+    print(f"Проверено запросов: {len(CHECKS)}, без ожидаемого индекса: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN горячих запросов по (user_id, время)")
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--verbose", action="store_true", help="печатать планы всех запросов")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.database_url, args.verbose)))
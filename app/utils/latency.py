@@ -0,0 +1,39 @@
+from typing import Any, Dict, Sequence
+
+
+class LatencyHistogram:
+    """Число вызовов, ошибки и гистограмма длительности в миллисекундах"""
+
+    DEFAULT_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = {bucket: 0 for bucket in self.buckets_ms}
+        self.histogram["inf"] = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+        elapsed_ms = seconds * 1000
+        for bucket in self.buckets_ms:
+            if elapsed_ms <= bucket:
+                self.histogram[bucket] += 1
+                return
+        self.histogram["inf"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "histogram_ms": dict(self.histogram),
+        }
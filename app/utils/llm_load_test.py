@@ -0,0 +1,77 @@
+"""Синтетическая нагрузка на LLMService против локального FakeLLMServer.
+
+Запуск: python -m app.utils.llm_load_test --users 500 --topics 100 --latency 0.3
+
+Прогоняет уникальные промпты и промпты с повторяющимися темами (их склеивает LLMService),
+с пачками и без. Печатает пропускную способность, задержки и число HTTP-запросов.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict
+
+from app.service.llm_providers import HTTPLLMProvider
+from app.service.llm_service import LLMService
+from app.utils.fake_llm_server import FakeLLMServer
+
+
+async def run_mode(base_url: str, server: FakeLLMServer, users: int, topics: int,
+                   batch: bool, repeat_topics: bool, concurrency: int) -> Dict[str, Any]:
+    # Имя модели не из чат-моделей OpenAI: для них /completions (пачки) отключается
+    provider = HTTPLLMProvider(base_url, model="fake-llm", batch_path="/completions" if batch else None,
+                               pool_limit=concurrency)
+    llm = LLMService(provider, max_concurrency=concurrency)
+    requests_before = server.requests
+    latencies = []
+
+    async def user(index: int):
+        # Как в generate_social_post: промпт зависит только от темы
+        prompt = f"Напиши пост для соцсетей на тему: тема {index % topics}"
+        if not repeat_topics:
+            prompt += f" (пользователь {index})"
+        started = time.perf_counter()
+        await llm.generate(prompt, call_site="social_post")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[user(index) for index in range(users)])
+    elapsed = time.perf_counter() - started
+    await llm.close()
+
+    latencies.sort()
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_s": round(users / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000),
+        "http_requests": server.requests - requests_before,
+        "coalesced": llm.coalesced,
+        "avg_batch_size": round(llm.batcher.stats()["avg_batch_size"], 1) if llm.batcher else None,
+    }
+
+
+async def main(users: int, topics: int, latency: float, concurrency: int):
+    server = FakeLLMServer(latency=latency)
+    base_url = await server.start()
+    try:
+        for name, batch, repeat_topics in (
+                ("уникальные", False, False),
+                ("уникальные + пачки", True, False),
+                ("повторы тем", False, True),
+                ("повторы тем + пачки", True, True),
+        ):
+            result = await run_mode(base_url, server, users, topics, batch, repeat_topics, concurrency)
+            print(f"{name:20} {result}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузка на LLMService против FakeLLMServer")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--topics", type=int, default=100, help="число различных промптов")
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа сервера, с")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.topics, args.latency, args.concurrency))
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Awaitable, Callable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины текста сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class ThrottledMessageEditor:
+    """Постепенно обновляет одно сообщение (edit_text) по мере генерации ответа.
+
+    Telegram ограничивает частоту правок одного чата (порядка одной в секунду),
+    поэтому промежуточные версии текста пропускаются, если с прошлой правки прошло
+    меньше min_interval. finish() всегда доставляет итоговый текст: ждет паузу, которую
+    назначил Telegram, и повторяет правку, а если она так и не прошла — отправляет
+    итог новым сообщением.
+    """
+
+    # Сколько раз finish() повторяет правку после TelegramRetryAfter
+    FINISH_ATTEMPTS = 3
+
+    def __init__(self, message: Message, min_interval: float = 1.0):
+        self._setup(message.edit_text, message.answer, message.text, min_interval)
+
+    @classmethod
+    def for_message_id(cls, bot: Bot, chat_id: int, message_id: int,
+                       text: Optional[str] = None, min_interval: float = 1.0) -> "ThrottledMessageEditor":
+        """Редактор сообщения, известного только по ID (например, в фоновой задаче)"""
+        editor = cls.__new__(cls)
+        editor._setup(
+            partial(bot.edit_message_text, chat_id=chat_id, message_id=message_id),
+            partial(bot.send_message, chat_id), text, min_interval
+        )
+        return editor
+
+    def _setup(self, edit_text: Callable[[str], Awaitable], send_text: Callable[[str], Awaitable],
+               text: Optional[str], min_interval: float):
+        self._edit_text = edit_text
+        self._send_text = send_text
+        self.min_interval = min_interval
+        self._last_text = text
+        self._last_edit = 0.0
+        self._blocked_until = 0.0
+
+    async def update(self, text: str):
+        """Промежуточный текст: применяется, только если пора"""
+        now = time.monotonic()
+        if now - self._last_edit < self.min_interval or now < self._blocked_until:
+            return
+        await self._edit(text)
+
+    async def finish(self, text: str):
+        """Итоговый текст: дожидается разрешения Telegram на правку и повторяет ее до успеха"""
+        for _ in range(self.FINISH_ATTEMPTS):
+            wait = max(self._blocked_until, self._last_edit + self.min_interval) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if await self._edit(text):
+                return
+
+        # Правка так и не прошла: итог не должен потеряться, отправляем его отдельным сообщением
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self._send_text(self._fit(text))
+        self._last_text = self._fit(text)
+
+    async def _edit(self, text: str) -> bool:
+        """False — Telegram попросил подождать (TelegramRetryAfter), текст не применен"""
+        text = self._fit(text)
+        if not text or text == self._last_text:
+            return True
+        self._last_edit = time.monotonic()
+        try:
+            await self._edit_text(text)
+            self._last_text = text
+        except TelegramRetryAfter as e:
+            # Превысили лимит правок: пропускаем промежуточные обновления до истечения паузы
+            self._blocked_until = time.monotonic() + e.retry_after
+            return False
+        except TelegramBadRequest as e:
+            # "message is not modified" и подобные — не повод прерывать генерацию
+            logger.debug(f"edit_text пропущен: {e}")
+        return True
+
+    @staticmethod
+    def _fit(text: str) -> str:
+        if len(text) <= MAX_MESSAGE_LENGTH:
+            return text
+        # Пока ответ длиннее лимита, показываем его конец: там появляется новый текст
+        return "…" + text[-(MAX_MESSAGE_LENGTH - 1):]
@@ -0,0 +1,90 @@
+"""Накладные расходы ServiceMiddleware на одно обновление: сервисы на каждое обновление против контейнера.
+
+Запуск: python -m app.utils.middleware_benchmark --updates 20000
+
+"Было" — middleware в прежнем виде: шесть сервисов создаются на каждое обновление,
+независимо от того, какие нужны обработчику (с нынешними конструкторами сервисов).
+"Стало" — ServiceMiddleware поверх ServiceContainer: в обработчик подставляются только
+объявленные им сервисы, созданные один раз. Обработчики — настоящие обработчики бота;
+следующий шаг цепочки пустой, поэтому измеряется только работа middleware.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from aiogram.dispatcher.event.handler import HandlerObject
+
+from app.ServiceMiddleware import ServiceMiddleware
+from app.database.db import Database
+from app.handlers import callbacks, messages
+from app.service import (
+    UserService, ConversationService, AnalyticService, WarehouseService, MarketingService, DocumentAnalyzer
+)
+from app.service.container import ServiceContainer
+
+
+class PerUpdateServiceMiddleware:
+    """Прежний ServiceMiddleware: все сервисы создаются заново на каждое обновление"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def __call__(self, handler, event, data):
+        data["user_service"] = UserService(self.db)
+        data["conversation_service"] = ConversationService(self.db)
+        data["analytic_service"] = AnalyticService(self.db)
+        data["warehouse_service"] = WarehouseService(self.db)
+        data["marketing_idea_service"] = MarketingService(self.db)
+        data["document_service"] = DocumentAnalyzer(self.db)
+        return await handler(event, data)
+
+
+async def _next_handler(event, data):
+    return None
+
+
+async def run(middleware, handler_object: HandlerObject, updates: int) -> float:
+    """Среднее время одного вызова middleware, мкс"""
+    # Прогрев: в контейнере сервисы создаются при первом обращении
+    await middleware(_next_handler, None, {"handler": handler_object})
+
+    started = time.perf_counter()
+    for _ in range(updates):
+        await middleware(_next_handler, None, {"handler": handler_object})
+    return (time.perf_counter() - started) / updates * 1e6
+
+
+async def main(updates: int):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    # Соединения не открываются: сервисы только создаются
+    db = Database(f"sqlite+aiosqlite:///{path}")
+    container = ServiceContainer(db)
+    before_middleware = PerUpdateServiceMiddleware(db)
+    after_middleware = ServiceMiddleware(container)
+
+    handlers = [
+        ("без сервисов (quick_actions)", callbacks.quick_actions),
+        ("один сервис (profile_history)", callbacks.profile_history),
+        ("два сервиса (process_document_file)", messages.process_document_file),
+    ]
+    try:
+        print(f"Обновлений на замер: {updates}")
+        for name, callback in handlers:
+            handler_object = HandlerObject(callback=callback)
+            before = await run(before_middleware, handler_object, updates)
+            after = await run(after_middleware, handler_object, updates)
+            print(f"{name:38} было: {before:6.1f} мкс | стало: {after:4.1f} мкс | быстрее в {before / after:.0f} раз")
+    finally:
+        await container.close()
+        await db.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Накладные расходы ServiceMiddleware на обновление")
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates))
@@ -0,0 +1,126 @@
+"""Стресс-тест списания: параллельные продажи и расходы одного товара не уводят остаток в минус.
+
+Запуск: python -m app.utils.oversell_stress_test --stock 100 --requests 1000 --concurrency 50
+        python -m app.utils.oversell_stress_test --database-url postgresql://...  (по умолчанию — временный SQLite)
+
+Товар с остатком stock; requests списаний по 1–3 шт (продажи через WarehouseService.create_sale
+и расходы через create_stock_movement вперемешку) идут одновременно, по concurrency сразу.
+Проверяется, что остаток не отрицательный, что он равен начальному минус сумма успешных
+списаний, что записанные продажи и расходы совпадают с успешными ответами и что лишние
+списания отклонены. Код выхода 1 — инвариант нарушен.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from app.database.db import Database
+from app.database.models import Base, DailySalesRollup, Product, Sale, StockMovement, User
+from app.service.warehouse_service import WarehouseService
+
+
+# Синтетический пользователь — вне диапазона ID Telegram, удаляется после прогона
+USER_ID = 9_000_000_000_003
+
+
+async def cleanup(conn):
+    for model in (DailySalesRollup, Sale, StockMovement, Product):
+        await conn.execute(delete(model).where(model.user_id == USER_ID))
+    await conn.execute(delete(User).where(User.id == USER_ID))
+
+
+async def main(database_url: Optional[str], stock: int, requests: int, concurrency: int) -> int:
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite+aiosqlite:///{path}"
+
+    db = Database(database_url)
+    service = WarehouseService(db)
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, Product.__table__, Sale.__table__, StockMovement.__table__,
+                DailySalesRollup.__table__
+            ])
+            await cleanup(conn)
+            await conn.execute(insert(User), [{"id": USER_ID, "username": "oversell"}])
+            product_id = (await conn.execute(
+                insert(Product).returning(Product.id),
+                [{"user_id": USER_ID, "name": "Дефицит", "selling_price": 100.0, "purchase_price": 60.0,
+                  "stock_quantity": stock}]
+            )).scalar_one()
+
+        rng = random.Random(requests)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def take(quantity: int, as_sale: bool):
+            async with semaphore:
+                if as_sale:
+                    result = await service.create_sale(USER_ID, {
+                        "product_id": product_id, "quantity": quantity, "unit_price": 100.0
+                    })
+                else:
+                    result = await service.create_stock_movement(USER_ID, {
+                        "product_id": product_id, "quantity": quantity, "type": "outgoing", "reason": "списание"
+                    })
+                return quantity if result["success"] else 0
+
+        started = time.perf_counter()
+        taken = await asyncio.gather(*[
+            take(rng.randint(1, 3), as_sale=rng.random() < 0.7) for _ in range(requests)
+        ])
+        elapsed = time.perf_counter() - started
+
+        async with db.get_uow(read_only=True) as uow:
+            final_stock = await uow.products.get_stock_quantity(product_id, USER_ID)
+            sold = (await uow.session.execute(
+                select(func.coalesce(func.sum(Sale.quantity), 0)).where(Sale.product_id == product_id)
+            )).scalar()
+            moved_out = (await uow.session.execute(
+                select(func.coalesce(func.sum(StockMovement.quantity), 0)).where(StockMovement.product_id == product_id)
+            )).scalar()
+
+        accepted = sum(1 for quantity in taken if quantity)
+        print(f"Остаток {stock}, списаний {requests} (параллельно {concurrency}) за {elapsed:.2f} с: "
+              f"принято {accepted}, отклонено {requests - accepted}, списано {sum(taken)} шт, "
+              f"итоговый остаток {final_stock}")
+
+        failures = []
+        if final_stock < 0:
+            failures.append(f"остаток ушел в минус: {final_stock}")
+        if final_stock != stock - sum(taken):
+            failures.append(f"остаток {final_stock} != {stock} - {sum(taken)}")
+        if sold + moved_out != sum(taken):
+            failures.append(f"записано продаж и расходов {sold + moved_out}, успешных списаний {sum(taken)}")
+        if sum(taken) < stock - 2:
+            # Отказ при остатке, которого хватало, — тоже ошибка (списания по 1–3 шт)
+            failures.append(f"списано {sum(taken)} из {stock}: часть списаний отклонена зря")
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if not failures:
+            print("OK   остаток не отрицательный и сходится с продажами и расходами")
+        return 1 if failures else 0
+    finally:
+        async with db.engine.begin() as conn:
+            await cleanup(conn)
+        await db.dispose()
+        if path:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Параллельные списания одного товара")
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.database_url, args.stock, args.requests, args.concurrency)))
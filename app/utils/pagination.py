@@ -0,0 +1,23 @@
+import base64
+import struct
+from datetime import datetime, timedelta
+from typing import Tuple
+
+EPOCH = datetime(1970, 1, 1)
+# created_at в микросекундах + id: 12 байт -> 16 символов base64, помещается в callback_data (64 байта)
+_CURSOR = struct.Struct(">qI")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Непрозрачный курсор позиции (created_at, id) для callback_data"""
+    micros = (created_at.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(_CURSOR.pack(micros, row_id)).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Позиция из курсора; ValueError, если курсор поврежден"""
+    try:
+        micros, row_id = _CURSOR.unpack(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, struct.error) as e:
+        raise ValueError(f"Некорректный курсор: {cursor!r}") from e
+    return EPOCH + timedelta(microseconds=micros), row_id
@@ -0,0 +1,166 @@
+"""Проверка маршрутизации чтения на реплику на двух настоящих базах.
+
+Запуск: python -m app.utils.replica_routing_check  (два временных файла SQLite: primary и "реплика")
+        python -m app.utils.replica_routing_check --primary-url postgresql://.../bot --replica-url postgresql://.../bot_replica
+
+Базы не реплицируются друг в друга: в каждую пишется своя метка, и по прочитанной метке
+видно, куда на самом деле ушел запрос. Проверяется:
+- запись и обычные/read-only UoW идут на primary, replica=True — на реплику;
+- реплика с отставанием больше DB_REPLICA_MAX_LAG и недоступная реплика — чтение с primary;
+- после восстановления реплики (следующая проверка отставания) чтение возвращается на нее;
+- без DATABASE_REPLICA_URL replica=True — обычное read-only чтение с primary.
+Код выхода 1 — хотя бы одна проверка не прошла.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+
+from app.database.db import Database
+from app.database.models import Base, User
+from app.database.routing import ReplicaRouter
+
+# Синтетический пользователь — вне диапазона ID Telegram, удаляется после прогона
+MARKER_ID = 9_000_000_000_002
+
+
+class FakeLagRouter(ReplicaRouter):
+    """Политика с заданным отставанием вместо запроса к pg_last_xact_replay_timestamp()"""
+
+    def __init__(self, lag: Optional[float], **kwargs):
+        super().__init__(check_interval=0, **kwargs)
+        self.fake_lag = lag
+
+    async def _refresh_lag(self):
+        self.lag = self.fake_lag
+        self._checked_at = 0
+
+
+async def read_marker(db: Database, **uow_options) -> Optional[str]:
+    async with db.get_uow(**uow_options) as uow:
+        return (await uow.session.execute(select(User.username).where(User.id == MARKER_ID))).scalar()
+
+
+async def seed(url: str, marker: str):
+    db = Database(url)
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+            await conn.execute(delete(User).where(User.id == MARKER_ID))
+            await conn.execute(insert(User), [{"id": MARKER_ID, "username": marker}])
+    finally:
+        await db.dispose()
+
+
+async def cleanup(url: str):
+    db = Database(url)
+    try:
+        async with db.engine.begin() as conn:
+            await conn.execute(delete(User).where(User.id == MARKER_ID))
+    finally:
+        await db.dispose()
+
+
+async def check_routing(primary_url: str, replica_url: str):
+    db = Database(primary_url, replica_url=replica_url, routing_policy=ReplicaRouter(check_interval=0))
+    try:
+        assert await read_marker(db) == "primary", "обычная UoW должна читать с primary"
+        assert await read_marker(db, read_only=True) == "primary", "read_only без replica — primary"
+        assert await read_marker(db, replica=True) == "replica", "replica=True должна читать с реплики"
+        assert db.routing_policy.replica_reads == 1
+
+        # Запись из UoW попадает только на primary
+        async with db.get_uow() as uow:
+            await uow.session.execute(
+                User.__table__.update().where(User.id == MARKER_ID).values(username="primary-written")
+            )
+        assert await read_marker(db) == "primary-written"
+        assert await read_marker(db, replica=True) == "replica", "запись не должна уходить на реплику"
+    finally:
+        await db.dispose()
+
+
+async def check_lag_fallback(primary_url: str, replica_url: str):
+    router = FakeLagRouter(lag=30.0, max_lag_seconds=5.0)
+    db = Database(primary_url, replica_url=replica_url, routing_policy=router)
+    try:
+        assert await read_marker(db, replica=True) == "primary", "отстающая реплика — чтение с primary"
+        assert router.primary_fallbacks == 1
+
+        router.fake_lag = 1.0
+        assert await read_marker(db, replica=True) == "replica", "реплика догнала — чтение снова с нее"
+        assert db.pool_status()["replica"]["lag_seconds"] == 1.0
+    finally:
+        await db.dispose()
+
+
+async def check_unavailable_replica(primary_url: str):
+    # Реплика, к которой нельзя подключиться: каталога не существует
+    missing = os.path.join(tempfile.gettempdir(), "no-such-dir", "replica.db")
+    router = ReplicaRouter(check_interval=0)
+    db = Database(primary_url, replica_url=f"sqlite+aiosqlite:///{missing}", routing_policy=router)
+    try:
+        assert await read_marker(db, replica=True) == "primary", "недоступная реплика — чтение с primary"
+        assert router.lag is None and router.primary_fallbacks == 1
+    finally:
+        await db.dispose()
+
+
+async def check_without_replica(primary_url: str):
+    db = Database(primary_url, replica_url=None)
+    try:
+        assert db.replica_engine is None
+        assert await read_marker(db, replica=True) == "primary", "без реплики replica=True — primary"
+    finally:
+        await db.dispose()
+
+
+async def main(primary_url: Optional[str], replica_url: Optional[str]) -> int:
+    paths = []
+    if primary_url is None or replica_url is None:
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            paths.append(path)
+        primary_url, replica_url = (f"sqlite+aiosqlite:///{path}" for path in paths)
+
+    # Переменная окружения не должна подменить явно переданные адреса
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+    checks = [
+        ("маршрутизация чтения и записи", lambda: check_routing(primary_url, replica_url)),
+        ("отстающая реплика", lambda: check_lag_fallback(primary_url, replica_url)),
+        ("недоступная реплика", lambda: check_unavailable_replica(primary_url)),
+        ("без реплики", lambda: check_without_replica(primary_url)),
+    ]
+    failures = 0
+    try:
+        for name, check in checks:
+            await seed(primary_url, "primary")
+            await seed(replica_url, "replica")
+            try:
+                await check()
+                print(f"OK   {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL {name}: {e}")
+    finally:
+        for url in (primary_url, replica_url):
+            await cleanup(url)
+        for path in paths:
+            os.remove(path)
+
+    print(f"Проверок: {len(checks)}, не прошло: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Маршрутизация чтения между primary и репликой")
+    parser.add_argument("--primary-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--replica-url", default=None, help="по умолчанию — второй временный SQLite")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.primary_url, args.replica_url)))
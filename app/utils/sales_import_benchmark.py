@@ -0,0 +1,143 @@
+"""Скорость импорта продаж: SalesImportService на файле в 1М строк против create_sale по одной продаже.
+
+Запуск: python -m app.utils.sales_import_benchmark --rows 1000000 --products 500
+        python -m app.utils.sales_import_benchmark --format xlsx --rows 100000
+        python -m app.utils.sales_import_benchmark --database-url postgresql://...  (по умолчанию — временный SQLite)
+
+Генерирует файл продаж для синтетического пользователя (остатков хватает на весь файл, плюс
+немного строк с дробным количеством, которые должны быть отклонены), импортирует его и печатает
+строки/с. Для сравнения sample продаж записывается через WarehouseService.create_sale по одной.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import tempfile
+import time
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from app.database.db import Database
+from app.database.models import Base, DailySalesRollup, Product, Sale, StockMovement, User
+from app.service.sales_import_service import SalesImportService
+from app.service.warehouse_service import WarehouseService
+
+
+# Синтетический пользователь — вне диапазона ID Telegram, удаляется после прогона
+USER_ID = 9_000_000_000_004
+# Каждая FRACTIONAL_EVERY-я строка — с количеством 0.5, такие строки импорт отклоняет
+FRACTIONAL_EVERY = 1000
+
+
+def write_file(path: str, file_format: str, rows: int, products: int) -> int:
+    """Файл продаж; возвращает число строк с дробным количеством"""
+    rng = random.Random(rows)
+    header = ["Товар", "Количество", "Цена", "Дата", "Оплата"]
+
+    def generate():
+        for index in range(rows):
+            quantity = 0.5 if index % FRACTIONAL_EVERY == FRACTIONAL_EVERY - 1 else rng.randint(1, 5)
+            yield [f"Товар {rng.randrange(products)}", quantity, 100 + rng.randrange(50),
+                   f"{rng.randint(1, 28):02d}.09.2026", "card"]
+
+    if file_format == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(header)
+            writer.writerows(generate())
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in generate():
+            sheet.append(row)
+        workbook.save(path)
+    return rows // FRACTIONAL_EVERY
+
+
+async def cleanup(conn):
+    for model in (DailySalesRollup, Sale, StockMovement, Product):
+        await conn.execute(delete(model).where(model.user_id == USER_ID))
+    await conn.execute(delete(User).where(User.id == USER_ID))
+
+
+async def seed(db: Database, products: int, stock: int):
+    async with db.engine.begin() as conn:
+        await cleanup(conn)
+        await conn.execute(insert(User), [{"id": USER_ID, "username": "import-bench"}])
+        await conn.execute(insert(Product), [
+            {"user_id": USER_ID, "name": f"Товар {index}", "selling_price": 120.0, "purchase_price": 70.0,
+             "stock_quantity": stock}
+            for index in range(products)
+        ])
+
+
+async def main(database_url: Optional[str], file_format: str, rows: int, products: int, sample: int):
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite+aiosqlite:///{path}"
+
+    fd, file_path = tempfile.mkstemp(suffix=f".{file_format}")
+    os.close(fd)
+    db = Database(database_url)
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, Product.__table__, Sale.__table__, StockMovement.__table__,
+                DailySalesRollup.__table__
+            ])
+
+        started = time.perf_counter()
+        fractional = write_file(file_path, file_format, rows, products)
+        print(f"Файл {file_format}: {rows} строк, {os.path.getsize(file_path) / 2 ** 20:.1f} МБ, "
+              f"сгенерирован за {time.perf_counter() - started:.1f} с")
+
+        # Остатка хватает на весь файл: отклоняются только строки с дробным количеством
+        await seed(db, products, stock=rows * 5)
+        result = await SalesImportService(db).import_file(USER_ID, file_path, file_format)
+        async with db.get_uow(read_only=True) as uow:
+            stored = (await uow.session.execute(
+                select(func.count(Sale.id)).where(Sale.user_id == USER_ID)
+            )).scalar()
+        assert stored == result["imported"] == rows - fractional, (stored, result)
+        assert result["skipped"] == fractional, result
+        print(f"SalesImportService: {result['imported']} продаж за {result['elapsed_seconds']:.1f} с — "
+              f"{result['rows_per_second']:,.0f} строк/с ({result['chunks']} чанков, "
+              f"отклонено дробных: {result['skipped']})")
+
+        await seed(db, products, stock=sample * 5)
+        service = WarehouseService(db)
+        product_ids = await service.get_all_products(USER_ID)
+        rng = random.Random(sample)
+        started = time.perf_counter()
+        for _ in range(sample):
+            await service.create_sale(USER_ID, {
+                "product_id": rng.choice(product_ids).id, "quantity": rng.randint(1, 5), "unit_price": 100.0
+            })
+        per_call = sample / (time.perf_counter() - started)
+        print(f"create_sale по одной: {sample} продаж — {per_call:,.0f} строк/с; "
+              f"импорт быстрее в {result['rows_per_second'] / per_call:.0f} раз")
+    finally:
+        async with db.engine.begin() as conn:
+            await cleanup(conn)
+        await db.dispose()
+        os.remove(file_path)
+        if path:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Скорость массового импорта продаж")
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=2000, help="продаж через create_sale для сравнения")
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.format, args.rows, args.products, args.sample))
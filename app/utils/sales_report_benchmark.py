@@ -0,0 +1,208 @@
+"""Отчет по продажам: агрегация в Python по всем строкам против агрегатов в базе.
+
+Запуск: python -m app.utils.sales_report_benchmark --sales 1000 100000 1000000 --products 200
+        python -m app.utils.sales_report_benchmark --database-url postgresql://...  (по умолчанию — временный SQLite)
+
+Для каждого размера создает пользователя с sales продажами за period дней и сравнивает
+время, пик памяти (tracemalloc) и число SQL-запросов:
+- "в Python": как было до переноса агрегатов в SQL — все продажи периода с товарами,
+  суммы, топ товаров и динамика по дням считаются в цикле;
+- "в базе": WarehouseService.get_sales_report без кэша — агрегаты из дневной сводки.
+Так же замеряется get_financial_overview. Число SQL-запросов обоих отчетов не должно
+зависеть от числа продаж: оно сверяется с EXPECTED_STATEMENTS на каждом размере.
+Код выхода 1 — число запросов отличается от ожидаемого.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import selectinload
+
+from app.database.db import Database
+from app.database.models import Base, DailySalesRollup, Product, Sale, User
+from app.service.warehouse_service import WarehouseService
+
+
+# Синтетический пользователь — вне диапазона ID Telegram, удаляется после прогона
+USER_ID = 9_000_000_000_001
+INSERT_BATCH = 50000
+# Запросов на отчет при любом числе продаж: сводка (итоги, топ, по дням) + последние продажи;
+# для финансов — итоги, категории и товары
+EXPECTED_STATEMENTS = {"sales": 4, "financial": 3}
+
+
+async def python_report(db: Database, user_id: int, period_days: int):
+    """Путь до переноса в SQL: строки продаж в память, агрегаты в цикле"""
+    async with db.get_uow(read_only=True) as uow:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=period_days)
+        result = await uow.session.execute(
+            select(Sale)
+            .options(selectinload(Sale.product))
+            .where(Sale.user_id == user_id, Sale.sale_date.between(start_date, end_date))
+        )
+        sales = result.scalars().all()
+
+        product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0, "product": None})
+        daily_sales = defaultdict(float)
+        for sale in sales:
+            product_sales[sale.product_id]["quantity"] += sale.quantity
+            product_sales[sale.product_id]["revenue"] += sale.total_amount
+            product_sales[sale.product_id]["product"] = sale.product
+            daily_sales[sale.sale_date.strftime("%Y-%m-%d")] += sale.total_amount
+
+        return {
+            "total_revenue": sum(sale.total_amount for sale in sales),
+            "total_sales": len(sales),
+            "top_products": sorted(product_sales.values(), key=lambda x: x["revenue"], reverse=True)[:5],
+            "daily_sales": dict(daily_sales),
+        }
+
+
+class StatementCounter:
+    def __init__(self, database: Database):
+        self.count = 0
+        self._engine = database.engine.sync_engine
+        event.listen(self._engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def close(self):
+        event.remove(self._engine, "before_cursor_execute", self._on_execute)
+
+
+async def measure(db: Database, build) -> dict:
+    counter = StatementCounter(db)
+    tracemalloc.start()
+    started = time.perf_counter()
+    report = await build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    counter.close()
+    return {"report": report, "ms": elapsed * 1000, "peak_kb": peak / 1024, "statements": counter.count}
+
+
+async def cleanup(conn):
+    for model in (DailySalesRollup, Sale, Product):
+        await conn.execute(delete(model).where(model.user_id == USER_ID))
+    await conn.execute(delete(User).where(User.id == USER_ID))
+
+
+async def seed(db: Database, sales: int, products: int, period_days: int):
+    async with db.engine.begin() as conn:
+        await cleanup(conn)
+        await conn.execute(insert(User), [{"id": USER_ID, "username": "report-bench"}])
+        await conn.execute(insert(Product), [
+            {
+                "user_id": USER_ID,
+                "name": f"Товар {index}",
+                "category": f"Категория {index % 10}",
+                "purchase_price": 50.0,
+                "selling_price": 100.0 + index,
+            }
+            for index in range(products)
+        ])
+        product_ids = (await conn.execute(select(Product.id).where(Product.user_id == USER_ID))).scalars().all()
+
+        price = {product_id: 50.0 for product_id in product_ids}
+        rollup = defaultdict(lambda: {"quantity": 0, "revenue": 0.0, "cost": 0.0, "sales_count": 0})
+        now = datetime.now()
+        rng = random.Random(sales)
+        for offset in range(0, sales, INSERT_BATCH):
+            rows = []
+            for _ in range(min(INSERT_BATCH, sales - offset)):
+                quantity = rng.randint(1, 5)
+                rows.append({
+                    "user_id": USER_ID,
+                    "product_id": rng.choice(product_ids),
+                    "quantity": quantity,
+                    "unit_price": 100.0,
+                    "total_amount": quantity * 100.0,
+                    # Минута запаса: продажи не должны выпасть из окна отчета, пока идет прогон
+                    "sale_date": now - timedelta(seconds=rng.uniform(60, (period_days - 1) * 86400)),
+                })
+            await conn.execute(insert(Sale), rows)
+
+            for row in rows:
+                total = rollup[(row["sale_date"].date(), row["product_id"])]
+                total["quantity"] += row["quantity"]
+                total["revenue"] += row["total_amount"]
+                total["cost"] += row["quantity"] * price[row["product_id"]]
+                total["sales_count"] += 1
+
+        # Сводка считается здесь же, а не rebuild(): CAST(... AS DATE) есть в Postgres, но не в SQLite
+        await conn.execute(insert(DailySalesRollup), [
+            {"user_id": USER_ID, "day": day, "product_id": product_id, **total}
+            for (day, product_id), total in rollup.items()
+        ])
+
+
+async def main(database_url: Optional[str], sizes, products: int, period_days: int) -> int:
+    path = None
+    if database_url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite+aiosqlite:///{path}"
+
+    db = Database(database_url)
+    service = WarehouseService(db)
+    failures = []
+    try:
+        async with db.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[
+                User.__table__, Product.__table__, Sale.__table__, DailySalesRollup.__table__
+            ])
+
+        for sales in sizes:
+            await seed(db, sales, products, period_days)
+            before = await measure(db, lambda: python_report(db, USER_ID, period_days))
+            after = await measure(db, lambda: service.get_sales_report(USER_ID, period_days))
+            financial = await measure(db, lambda: service.get_financial_overview(USER_ID, period_days))
+
+            # Отчеты должны совпадать, иначе сравнение бессмысленно
+            assert before["report"]["total_sales"] == after["report"]["total_sales"] == sales
+            assert financial["report"]["efficiency"]["total_sales"] == sales
+            assert abs(before["report"]["total_revenue"] - after["report"]["total_revenue"]) < 1e-6 * sales
+
+            print(f"продаж={sales:<8} в Python: {before['ms']:9.1f} мс {before['peak_kb']:10.0f} КБ "
+                  f"{before['statements']:3} запр. | в базе: {after['ms']:7.1f} мс {after['peak_kb']:6.0f} КБ "
+                  f"{after['statements']:3} запр. | быстрее в {before['ms'] / after['ms']:.0f} раз | "
+                  f"финансы: {financial['ms']:7.1f} мс {financial['statements']:3} запр.")
+
+            for report, measured in (("sales", after), ("financial", financial)):
+                if measured["statements"] != EXPECTED_STATEMENTS[report]:
+                    failures.append(f"{report} при {sales} продажах: {measured['statements']} запросов, "
+                                    f"ожидается {EXPECTED_STATEMENTS[report]}")
+    finally:
+        async with db.engine.begin() as conn:
+            await cleanup(conn)
+        await db.dispose()
+        if path:
+            os.remove(path)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print(f"OK   число запросов не зависит от числа продаж: {EXPECTED_STATEMENTS}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Отчет по продажам: Python против SQL-агрегатов")
+    parser.add_argument("--database-url", default=None, help="по умолчанию — временный SQLite")
+    parser.add_argument("--sales", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--period", type=int, default=30)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.database_url, args.sales, args.products, args.period)))
@@ -0,0 +1,87 @@
+import re
+import zlib
+from typing import List
+
+# Грубая оценка без токенизатора: в русском тексте ~3 символа на токен, в английском ~4
+CHARS_PER_TOKEN = 3
+
+# Начало раздела договора: "1.", "2.3.", "Статья 5", "Раздел II", "ГЛАВА 1", "§ 4"
+SECTION_RE = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+\S|(?:статья|раздел|глава|приложение)\s+[\dIVXLC]+|§\s*\d+)",
+    re.IGNORECASE
+)
+SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+
+# В среднем каждый ANCHOR_EVERY-й раздел (по хэшу его текста) всегда начинает новый кусок
+ANCHOR_EVERY = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_sections(text: str) -> List[str]:
+    """Разбить текст на разделы по строкам-заголовкам; текст до первого заголовка — отдельный раздел"""
+    sections, current = [], []
+    for line in text.splitlines():
+        if SECTION_RE.match(line) and current:
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip())
+    return [section for section in sections if section]
+
+
+def _split_oversized(section: str, max_tokens: int) -> List[str]:
+    """Раздел длиннее лимита: режем по абзацам, затем по предложениям, в крайнем случае — по символам"""
+    for separator in ("\n\n", "\n", None):
+        parts = section.split(separator) if separator else SENTENCE_RE.split(section)
+        if len(parts) > 1:
+            return _pack(parts, max_tokens, separator or " ")
+    limit = max_tokens * CHARS_PER_TOKEN
+    return [section[i:i + limit] for i in range(0, len(section), limit)]
+
+
+def _is_anchor(part: str) -> bool:
+    return zlib.crc32(part.encode("utf-8")) % ANCHOR_EVERY == 0
+
+
+def _pack(parts: List[str], max_tokens: int, separator: str, anchors: bool = False) -> List[str]:
+    """Жадно склеить соседние части в куски не длиннее max_tokens"""
+    chunks, current, current_tokens = [], [], 0
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if anchors and current and _is_anchor(part):
+            chunks.append(separator.join(current))
+            current, current_tokens = [], 0
+        tokens = estimate_tokens(part)
+        if tokens > max_tokens:
+            if current:
+                chunks.append(separator.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_split_oversized(part, max_tokens))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Куски текста не длиннее max_tokens (по оценке), по возможности по границам разделов.
+
+    Жадная склейка сама по себе сдвигала бы все последующие границы после правки
+    одного раздела. Поэтому разделы-якоря (выбранные по хэшу содержимого) всегда
+    начинают кусок: правка затрагивает только куски до ближайшего якоря, остальные
+    совпадают с прошлым разбором и не анализируются повторно.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text.strip()] if text.strip() else []
+    return _pack(split_sections(text), max_tokens, "\n\n", anchors=True)